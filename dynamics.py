@@ -1,7 +1,7 @@
 from typing import Type
 from sympy import (Symbol, symbols, Matrix, sin, cos, diff, sqrt, S, diag, Eq,
                    hessian, Function, flatten, Tuple, im, pi, latex,dsolve,solve,
-                   fraction,factorial,Derivative, Integral,Expr,Subs, Mul, Add)
+                   fraction,factorial,Derivative, Integral,Expr,Subs, Mul, Add, ImmutableMatrix, lambdify)
 
 from sympy.physics.mechanics import dynamicsymbols
 from sympy.physics.vector.printing import vpprint, vlatex
@@ -10,6 +10,9 @@ from sympy.utilities.autowrap import autowrap, ufuncify
 import numpy as np
 import itertools as itools
 import scipy.integrate as solver
+from scipy.optimize import linear_sum_assignment
+import scipy.linalg
+import pandas as pd
 from .utilities.timeseries import TimeSeries, TimeDataFrame
 
 from collections import ChainMap
@@ -21,9 +24,9 @@ import sympy.physics.mechanics as me
 
 from sympy.simplify.fu import TR8, TR10, TR7, TR3
 
-from .solvers.numerical import OdeComputationalCase
+from .solvers.numerical import OdeComputationalCase, structural_fingerprint
 
-from .solvers.linear import (LinearODESolution, FirstOrderODE,MultivariableTaylorSeries,FirstOrderODESystem,ODESystem,
+from .solvers.linear import (LinearODESolution, FirstOrderODE,MultivariableTaylorSeries,taylor_derivatives,FirstOrderODESystem,ODESystem,
                             cached_property,FirstOrderLinearODESystemWithHarmonics)
 
 from .solvers.nonlinear import WeakNonlinearProblemSolution, MultiTimeScaleMethod
@@ -40,9 +43,10 @@ from .utilities.templates import tikz
 from .utilities.components.mech import en as mech_comp
 
 
-from .utilities.adaptable import AutoMarker
+from .utilities.adaptable import AutoMarker, SpectrumFrame
 import inspect
 import copy
+import warnings
 
 from pylatex import TikZ,TikZNode
 import matplotlib.pyplot as plt
@@ -51,7 +55,7 @@ import matplotlib.pyplot as plt
 base_frame=me.ReferenceFrame('N')
 base_origin=me.Point('O')
 
-from functools import cached_property, lru_cache
+from functools import cached_property, lru_cache, wraps
 
 from .solvers.linear import SystemParameter
 import os
@@ -156,16 +160,44 @@ def multivariable_taylor_series(expr, args, n=2, x0=None):
 
     # print(diff_orders_list)
 
+    derivatives = taylor_derivatives(expr, args, n=order_max, op_point=op_point)
+
     return (sum([
-        expr.diff(*args_tmp).subs(op_point).doit() * poly
+        derivatives[args_tmp].doit() * poly
         for args_tmp, poly in diff_orders_dict.items()
-    ]) + expr.subs(op_point)).doit()
+    ]) + derivatives[()]).doit()
 
 
 
     
 
 
+def _broadcasted_lambdify(args, exprs):
+    '''
+    Returns the lambdified function of the list of expressions which output is the array with shape (len(exprs), *broadcast_shape). The constant entries are broadcasted to the shape of the remaining ones (or to the given shape).
+    '''
+    exprs_function = lambdify(args, exprs, [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy'])
+
+    def broadcasted_function(*values, shape=()):
+        results = [np.asarray(value, dtype=float) for value in exprs_function(*values)]
+        shape = np.broadcast_shapes(shape, *[value.shape for value in results])
+
+        return np.array([np.broadcast_to(value, shape) for value in results])
+
+    return broadcasted_function
+
+
+def modal_assurance_criterion(modes_a, modes_b):
+    '''
+    Returns the matrix of Modal Assurance Criterion values MAC[i, j] = |a_i^H b_j|^2 / ((a_i^H a_i) (b_j^H b_j)) for the modes stored in the columns of modes_a and modes_b.
+    '''
+    cross = np.abs(modes_a.conj().T @ modes_b)**2
+    norms_a = np.real(np.sum(modes_a.conj() * modes_a, axis=0))
+    norms_b = np.real(np.sum(modes_b.conj() * modes_b, axis=0))
+
+    return cross / np.outer(norms_a, norms_b)
+
+
 def scalar_fun_quadratic_form(expr, coordinates, op_point):
     '''Vector of deformation '''
     u = (Matrix(coordinates) -
@@ -234,7 +266,7 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
         Independent variable
 
     evaluate=True (optional):
-        Evaluates the dinamic system
+        Evaluates the dinamic system. For evaluate='lazy' the equations of motion are formed on the first access to governing_equations (or to the quantities derived from them), what is used for the sums of systems and the composed systems.
 
     Example
     =======
@@ -281,9 +313,56 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
     
     _default_doctype = ExampleTemplate
     _components = None
+    _linearization_cache = {}
+    _fingerprint = None
     
     ivar = Symbol('t')
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        components = cls.__dict__.get('components')
+        if isinstance(components, property) and not hasattr(components.fget, '_cached_components'):
+            cls.components = property(cls._cached_components_getter(components.fget))
+
+    @staticmethod
+    def _cached_components_getter(fget):
+        '''
+        Wraps the getter of components property overridden in the subclass. The elements are instantiated once per instance and the cached graph is reused until _invalidate_components is called (subs and copy return the systems with their own graphs). The cache is keyed by the name of the getter and is not pickled or copied (see __getstate__), so the copies build their own graphs. The original getter is available as the __wrapped__ attribute.
+        '''
+        key = fget.__qualname__
+
+        @wraps(fget)
+        def components(self):
+            cache = self.__dict__.get('_components_cache')
+            if cache is None:
+                cache = self._components_cache = {}
+
+            if key not in cache:
+                cache[key] = fget(self)
+
+            return dict(cache[key])
+
+        components._cached_components = True
+
+        return components
+
+    def _invalidate_components(self):
+        '''
+        Removes the cached graph of components, so the elements are instantiated again on the next access.
+        '''
+        self._components_cache = None
+        self.__dict__.pop('components', None) # value stored by cached_property
+
+        return self
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        state.pop('_components_cache', None)
+
+        return state
+
     
     @classmethod
     def _module_abs_path(cls):
@@ -608,6 +687,8 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
             
         self.L = self._L
 
+        self._evaluate = system._evaluate
+
         if system._evaluate == True:
             self.__governing_equations = self.form_lagranges_equations()
         else:
@@ -621,12 +702,42 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
             label = self._label
 
         self._label = label
-        self._evaluate = system._evaluate
         self._given_data={}
         
         self._nonlinear_base_system=None
 
-        
+    @property
+    def eom(self):
+        '''
+        Equations of motion formed with LagrangesMethod. For the lazy evaluation they are formed on the first access.
+        '''
+        if self._eom is None and getattr(self, '_evaluate', None) == 'lazy':
+            self.form_lagranges_equations()
+
+        return self._eom
+
+    @eom.setter
+    def eom(self, eom):
+        self._eom = eom
+
+    @property
+    def governing_equations(self):
+
+        if self._governing_equations is None and self._evaluate == 'lazy':
+            self._governing_equations = self.eom
+
+        return self._governing_equations
+
+    @governing_equations.setter
+    def governing_equations(self, equations):
+        self._governing_equations = equations
+
+    def to_linearizer(self, *args, **kwargs):
+        # the terms of deferred equations are required by the Linearizer
+        self.eom
+
+        return super().to_linearizer(*args, **kwargs)
+
     @property
     def readable_name(self):
 
@@ -778,7 +889,11 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
 
     
     def copy(self):
-        return type(self).from_system(self)
+
+        new_system = type(self).from_system(self)._invalidate_components()
+        new_system._fingerprint = self._fingerprint
+
+        return new_system
     
     @classmethod
     def from_default_data(cls):
@@ -885,8 +1000,9 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
 
         if not self_dict['frame']:
             self_dict['frame'] = other_dict['frame']
-            
-        systems_sum=LagrangesDynamicSystem(**self_dict)
+
+        # equations of the partial sums are not formed - only the final system (if used) requires them
+        systems_sum=LagrangesDynamicSystem(**self_dict, evaluate='lazy')
         systems_sum._given_data={**other._given_data,**self._given_data}
         
         systems_sum._kinetic_energy = sum([energy for energy in [self._kinetic_energy,other._kinetic_energy] if energy is not None])
@@ -1043,6 +1159,10 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
 
         new_sys._given_data=given_data
         new_sys._nonlinear_base_system = copy.copy(self._nonlinear_base_system)
+        new_sys._invalidate_components()
+        if self._fingerprint is not None:
+            # the fingerprint of the result is derived from the known one instead of hashing the new equations
+            new_sys._fingerprint = structural_fingerprint(self._fingerprint, 'subs', args, sorted(kwargs.items()))
 
 #         print(new_sys._kinetic_energy)
 #         print(new_sys._potential_energy)
@@ -1772,6 +1892,171 @@ class LagrangesDynamicSystem(me.LagrangesMethod):
         
         return lin_sys
 
+    @property
+    def fingerprint(self):
+        """
+        Structural fingerprint (see structural_fingerprint) of the governing equations and generalized coordinates. It is computed once for the instance (copy passes it on and subs derives it from the substitution) and used as the key of the caches of numerical functions.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = structural_fingerprint(ImmutableMatrix(self.governing_equations), tuple(self.q))
+
+        return self._fingerprint
+
+    def _numerical_linearization_functions(self):
+        """
+        Returns the parameters (ordered as the arguments of the matrices and of the residual) and the lambdified functions of equilibrium residual, its Jacobian and the matrices M, C, K for the numerical linearization. The functions have the form f(t, q, p) where q and p are the arrays of coordinates and parameter values (the trailing axes are broadcasted over the cases). They are generated once for the structure of the system.
+        """
+        cache_key = self.fingerprint
+
+        if cache_key not in self.__class__._linearization_cache:
+            eoms = Matrix(self.governing_equations).doit()
+            # the models may define the attribute u (e.g. the voltage), so the velocities are not taken from LagrangesMethod.u
+            velocities = [coord.diff(self.ivar) for coord in self.q]
+            accelerations = [vel.diff(self.ivar) for vel in velocities]
+
+            coords_syms = [Symbol(f'q_lin_{no}') for no in range(len(self.q))]
+            coords_subs = dict(zip(self.q, coords_syms))
+            zero_rates = {**{acc: 0 for acc in accelerations}, **{vel: 0 for vel in velocities}}
+
+            def static_form(expr):
+                return expr.subs(zero_rates).subs(coords_subs).doit()
+
+            # the equilibrium is found for the static part of governing equations - the terms depending explicitly on ivar (excitation) are removed
+            residual = static_form(eoms).applyfunc(lambda eq: eq.expand().as_independent(self.ivar, as_Add=True)[0])
+
+            matrices = {
+                'M': static_form(eoms.jacobian(accelerations)),
+                'C': static_form(eoms.jacobian(velocities)),
+                'K': static_form(eoms.jacobian(list(self.q))),
+            }
+
+            # only the parameters of the given expressions are required (e.g. the excitation frequency or the amplitude of the static force are not required for the matrices)
+            def params_of(*exprs):
+                return sorted(set().union(*[expr.free_symbols for expr in exprs]) - {self.ivar, *coords_syms}, key=str)
+
+            params = params_of(*matrices.values())
+            residual_params = params_of(residual)
+            args = [self.ivar, coords_syms, params]
+            residual_args = [self.ivar, coords_syms, residual_params]
+
+            self.__class__._linearization_cache[cache_key] = {
+                'params': params,
+                'residual_params': residual_params,
+                'residual': _broadcasted_lambdify(residual_args, list(residual)),
+                'residual_jacobian': _broadcasted_lambdify(residual_args, list(residual.jacobian(coords_syms))),
+                **{name: _broadcasted_lambdify(args, list(matrix)) for name, matrix in matrices.items()},
+            }
+
+        return self.__class__._linearization_cache[cache_key]
+
+    def _numerical_params_array(self, params, parameter_values):
+
+        missing_params = [par for par in params if par not in parameter_values]
+        if missing_params:
+            raise ValueError(f'Values of parameters {missing_params} are not given.')
+
+        values = [np.asarray(parameter_values[par], dtype=float) for par in params]
+        shape = np.broadcast_shapes(*[value.shape for value in values]) if values else ()
+
+        return np.array([np.broadcast_to(value, shape) for value in values]).reshape(len(params), *shape), shape
+
+    def numerical_op_points(self, parameter_values, x0=None, tol=1e-10, max_iter=50):
+        """
+        Finds the equilibrium (operating point) of the system with all parameters given numerically. The Newton method is applied to the lambdified governing equations with zero velocities and accelerations and without the terms depending explicitly on ivar (excitation), so no symbolic solving is performed.
+
+        Arguments:
+        =========
+            parameter_values - dictionary of parameter values, the values can be given as the arrays of N cases which are solved at once
+
+            x0=None (optional) - initial guess for the coordinates (dictionary or array), zeros by default
+
+            tol, max_iter (optional) - tolerance of the residual norm and the limit of iterations
+
+        Returns the array of coordinates with shape (len(q),) or (len(q), N). The cases which did not converge within max_iter iterations or have the singular Jacobian (e.g. zero stiffness) are filled with NaN and reported with the warning.
+        """
+        functions = self._numerical_linearization_functions()
+        params_array, cases_shape = self._numerical_params_array(functions['residual_params'], parameter_values)
+
+        if x0 is None:
+            x0 = np.zeros(len(self.q))
+        elif isinstance(x0, dict):
+            x0 = [x0.get(coord, 0.0) for coord in self.q]
+
+        q = np.array(np.broadcast_to(np.asarray(x0, dtype=float).reshape(len(self.q), *([1] * len(cases_shape))), (len(self.q), *cases_shape)))
+
+        failed = np.zeros(cases_shape, dtype=bool)
+        for iteration in range(max_iter + 1):
+            residual = functions['residual'](0.0, q, params_array, shape=cases_shape)
+            residual_norm = np.linalg.norm(residual, axis=0)
+
+            converged = residual_norm <= tol
+            failed |= ~np.isfinite(residual_norm)
+            active = ~(converged | failed)
+            if iteration == max_iter or not np.any(active):
+                break
+
+            jacobian = functions['residual_jacobian'](0.0, q, params_array, shape=cases_shape).reshape(len(self.q), len(self.q), *cases_shape)
+            step = np.moveaxis(self._batched_solve(np.moveaxis(jacobian, (0, 1), (-2, -1)), np.moveaxis(residual, 0, -1)), -1, 0)
+
+            # the cases with singular Jacobian are not continued
+            failed |= active & ~np.all(np.isfinite(step), axis=0)
+            q = q - np.where(active & ~failed, step, 0.0)
+
+        if not np.all(converged):
+            warnings.warn(f'Operating point was not found for {np.count_nonzero(~converged)} of {converged.size} cases '
+                          f'(singular Jacobian or no convergence in {max_iter} iterations), NaN is returned for them.')
+
+        return np.where(converged, q, np.nan)
+
+    @staticmethod
+    def _batched_solve(matrices, vectors):
+        '''
+        Solves the stack of linear systems matrices[..., :, :] x = vectors[..., :] at once. If any matrix is singular the systems are solved one by one and the solutions of the singular ones are filled with NaN.
+        '''
+        try:
+            return np.linalg.solve(matrices, vectors[..., np.newaxis])[..., 0]
+        except np.linalg.LinAlgError:
+            solutions = np.full(vectors.shape, np.nan)
+            for index in np.ndindex(vectors.shape[:-1]):
+                try:
+                    solutions[index] = np.linalg.solve(matrices[index], vectors[index])
+                except np.linalg.LinAlgError:
+                    pass
+
+            return solutions
+
+    def numerical_linearized(self, parameter_values, x0=None, op_point=False, t=0.0, tol=1e-10, max_iter=50):
+        """
+        Returns the numerical matrices M, C, K of the system linearized at the operating point for the parameters given numerically. The matrices are the Jacobians of the governing equations with respect to the accelerations, velocities and coordinates (lambdified once for the system) evaluated for the zero velocities and accelerations.
+
+        Arguments:
+        =========
+            parameter_values - dictionary of parameter values, the values can be given as the arrays of N cases
+
+            x0=None (optional) - operating point (dictionary or array), zeros by default. For op_point=True it is the initial guess of numerical_op_points.
+
+            op_point=False (optional) - if True the equilibrium is found with numerical_op_points
+
+            t=0.0 (optional) - time instant for the time-dependent coefficients
+
+        Returns the tuple (M, C, K) of arrays with shape (len(q), len(q)) or (len(q), len(q), N).
+        """
+        functions = self._numerical_linearization_functions()
+        params_array, cases_shape = self._numerical_params_array(functions['params'], parameter_values)
+
+        if op_point:
+            q = self.numerical_op_points(parameter_values, x0=x0, tol=tol, max_iter=max_iter)
+        else:
+            if x0 is None:
+                x0 = np.zeros(len(self.q))
+            elif isinstance(x0, dict):
+                x0 = [x0.get(coord, 0.0) for coord in self.q]
+            q = np.asarray(x0, dtype=float).reshape(len(self.q), *([1] * len(cases_shape)))
+
+        dofs = len(self.q)
+
+        return tuple(functions[name](t, q, params_array, shape=cases_shape).reshape(dofs, dofs, *cases_shape) for name in ('M', 'C', 'K'))
+
     @property
     def _eoms(self):
         """
@@ -2232,6 +2517,217 @@ class LinearDynamicSystem(LagrangesDynamicSystem):
 
         return (main_matrix).diagonalize()[0][len(self.q):, :]
 
+    @staticmethod
+    def _normalized_modes(modes, M, normalization='mass'):
+        '''
+        Normalizes the modes (columns) of every case: 'mass' - modal mass equal to 1, 'max' - the largest component equal to 1, None - no normalization.
+        '''
+        if normalization == 'mass':
+            modal_masses = np.einsum('kij,kil,klj->kj', modes.conj(), M, modes)
+            return modes / np.sqrt(modal_masses)[:, np.newaxis, :]
+        elif normalization == 'max':
+            max_ids = np.argmax(np.abs(modes), axis=1)
+            return modes / np.take_along_axis(modes, max_ids[:, np.newaxis, :], axis=1)
+        else:
+            return modes
+
+    @staticmethod
+    def _is_symmetric(matrices):
+
+        return np.allclose(matrices, np.swapaxes(matrices, -1, -2), rtol=1e-12, atol=1e-12 * np.abs(matrices).max(initial=1.0))
+
+    @staticmethod
+    def _tracked_modes(frequencies, modes):
+        '''
+        Reorders the modes of consecutive cases so that every column follows the mode of the highest MAC value with respect to the previous case.
+        '''
+        for no in range(1, len(frequencies)):
+            mac = modal_assurance_criterion(modes[no - 1], modes[no])
+            _, order = linear_sum_assignment(-mac)
+
+            frequencies[no] = frequencies[no][order]
+            modes[no] = modes[no][:, order]
+
+        return frequencies, modes
+
+    def numerical_modes(self, parameter_values, x0=None, op_point=False, damped=False, normalization='mass', track=True, as_frame=False):
+        '''
+        Solves the modal problem numerically for the matrices M, C, K of numerical_linearized (lambdified once for the system), so no characteristic polynomial is formed. The parameter values can be given as the arrays of N cases (e.g. points of the parameter grid) which are solved at once.
+
+        Arguments
+        =========
+        parameter_values: dict
+            Numerical values of the parameters (scalars or arrays of N cases)
+
+        damped=False (optional): bool
+            If False the generalized eigenproblem K phi = omega^2 M phi is solved (with Cholesky factor of M for all cases at once if M and K are symmetric and with scipy.linalg.eig for every case otherwise, e.g. for the circulatory terms). Otherwise the eigenvalues of the first order (state space) form are computed and the damped frequencies (imaginary parts) are returned with the complex modes of coordinates.
+
+        normalization='mass' (optional): str or None
+            'mass' (unit modal mass), 'max' (unit largest component) or None
+
+        track=True (optional): bool
+            If True the modes are tracked between consecutive cases with MAC (Modal Assurance Criterion), otherwise they are sorted by frequency.
+
+        as_frame=False (optional): bool
+            If True the frequencies (cases x modes) and the mode shapes (rows indexed by cases and coordinates, modes in columns) are returned as DataFrames instead of the arrays.
+
+        Returns the tuple of frequencies with shape (N, len(q)) and modes with shape (N, len(q), len(q)) (modes in columns) or the tuple of DataFrames. The case axis of arrays is skipped for the scalar parameter values.
+        '''
+        M, C, K = self.numerical_linearized(parameter_values, x0=x0, op_point=op_point)
+
+        dofs = len(self.q)
+        cases_shape = M.shape[2:]
+        M, C, K = [np.moveaxis(matrix.reshape(dofs, dofs, -1), -1, 0) for matrix in (M, C, K)]
+
+        if not damped and self._is_symmetric(M) and self._is_symmetric(K):
+            # Cholesky factor reduces the generalized problem to the symmetric one solved for all cases at once
+            L = np.linalg.cholesky(M)
+            L_inv = np.linalg.inv(L)
+            eigenvalues, eigenvectors = np.linalg.eigh(L_inv @ K @ np.swapaxes(L_inv, -1, -2))
+
+            frequencies = np.sqrt(np.abs(eigenvalues))
+            modes = np.swapaxes(L_inv, -1, -2) @ eigenvectors
+        elif not damped:
+            # the circulatory terms make K non-symmetric, so the general eigenproblem is solved for every case
+            eigenvalues, eigenvectors = zip(*[scipy.linalg.eig(K_case, M_case) for K_case, M_case in zip(K, M)])
+
+            frequencies = np.abs(np.sqrt(np.array(eigenvalues, dtype=complex)).real)
+            modes = np.real_if_close(np.array(eigenvectors))
+        else:
+            M_inv = np.linalg.inv(M)
+            zeros, eye = np.zeros_like(M), np.broadcast_to(np.eye(dofs), M.shape)
+            state_matrix = np.block([[zeros, eye], [-M_inv @ K, -M_inv @ C]])
+
+            eigenvalues, eigenvectors = np.linalg.eig(state_matrix)
+
+            # the complex conjugated pairs are represented by the eigenvalues with the positive imaginary part
+            order = np.argsort(-eigenvalues.imag, axis=-1)[:, :dofs]
+            eigenvalues = np.take_along_axis(eigenvalues, order, axis=-1)
+            eigenvectors = np.take_along_axis(eigenvectors, order[:, np.newaxis, :], axis=-1)[:, :dofs, :]
+
+            frequencies = np.abs(eigenvalues.imag)
+            modes = eigenvectors
+
+        order = np.argsort(frequencies, axis=-1)
+        frequencies = np.take_along_axis(frequencies, order, axis=-1)
+        modes = np.take_along_axis(modes, order[:, np.newaxis, :], axis=-1)
+
+        modes = self._normalized_modes(modes, M, normalization)
+
+        if track:
+            frequencies, modes = self._tracked_modes(frequencies, modes)
+
+        if as_frame:
+            modes_index = pd.Index(range(1, dofs + 1), name='mode')
+            coords_index = pd.Index(list(self.q), dtype=object, name='coordinate', tupleize_cols=False)
+
+            frequencies_frame = pd.DataFrame(frequencies, columns=modes_index).rename_axis('case')
+            modes_frame = pd.concat({no: pd.DataFrame(case_modes, index=coords_index, columns=modes_index) for no, case_modes in enumerate(modes)}, names=['case'])
+
+            return frequencies_frame, modes_frame
+
+        if cases_shape == ():
+            return frequencies[0], modes[0]
+
+        return frequencies, modes
+
+    def _harmonic_force_functions(self, excitation_freq=Symbol('Omega', positive=True)):
+        '''
+        Returns the parameters and the lambdified amplitudes of the harmonic components (cos and sin of excitation_freq*ivar) of external forces. They are generated once for the system.
+        '''
+        cache_key = (self.fingerprint, 'harmonic_forces', excitation_freq)
+
+        if cache_key not in self.__class__._linearization_cache:
+            forces = self.external_forces().expand()
+
+            comp_cos = forces.applyfunc(lambda comp: comp.coeff(cos(excitation_freq * self.ivar)))
+            comp_sin = forces.applyfunc(lambda comp: comp.coeff(sin(excitation_freq * self.ivar)))
+
+            params = sorted((comp_cos.free_symbols | comp_sin.free_symbols) - {self.ivar}, key=str)
+
+            self.__class__._linearization_cache[cache_key] = {
+                'params': params,
+                'amplitudes': _broadcasted_lambdify([params], list(comp_cos) + list(comp_sin)),
+            }
+
+        return self.__class__._linearization_cache[cache_key]
+
+    def numerical_frf(self, parameter_values, frequencies, forces='external', output='receptance', excitation_freq=Symbol('Omega', positive=True), x0=None, op_point=False, as_frame=True):
+        '''
+        Computes the Frequency Response Function H(omega) = (K - omega^2 M + i omega C)^-1 F for the whole vector of frequencies (and for the batch of parameter values) with batched linear solves of the numeric matrices from numerical_linearized.
+
+        Arguments
+        =========
+        parameter_values: dict
+            Numerical values of the parameters, the values can be given as the arrays of N cases. Only the parameters of the matrices M, C, K and of the used force amplitudes are required (the static forces only for op_point=True).
+
+        frequencies: array
+            Frequencies of excitation (the values of excitation_freq)
+
+        forces='external' (optional): str, dict, array or None
+            'external' - complex amplitudes of the harmonic terms cos(excitation_freq*ivar) and sin(excitation_freq*ivar) of external forces (they may depend on the frequency), dict or array - numeric amplitudes of forces acting on the coordinates, None - unit forces acting on every coordinate (the result is the full matrix H)
+
+        output='receptance' (optional): str
+            'receptance' (displacement), 'mobility' (velocity) or 'accelerance' (acceleration)
+
+        as_frame=True (optional): bool
+            If True the result is SpectrumFrame indexed by frequencies, otherwise the array with shape (len(frequencies), [N,] len(q)[, len(q)])
+        '''
+        frequencies = np.asarray(frequencies, dtype=float)
+        dofs = len(self.q)
+
+        cases_shape = np.broadcast_shapes(*[np.shape(value) for value in parameter_values.values()])
+        if len(cases_shape) > 1:
+            raise ValueError('Parameter values should be given as scalars or 1D arrays.')
+
+        # frequencies are broadcasted along the first axis, the cases along the second one
+        freqs_grid = frequencies.reshape(-1, *([1] * len(cases_shape)))
+        values = {par: np.asarray(value, dtype=float)[np.newaxis, ...] for par, value in parameter_values.items()}
+        values[excitation_freq] = freqs_grid
+        grid_shape = (len(frequencies), *cases_shape)
+
+        M, C, K = [np.broadcast_to(matrix.reshape(dofs, dofs, *matrix.shape[2:]), (dofs, dofs, *grid_shape))
+                   for matrix in self.numerical_linearized(values, x0=x0, op_point=op_point)]
+
+        omega = freqs_grid[..., np.newaxis, np.newaxis]
+        dynamic_matrix = np.moveaxis(K, (0, 1), (-2, -1)) - omega**2 * np.moveaxis(M, (0, 1), (-2, -1)) + 1j * omega * np.moveaxis(C, (0, 1), (-2, -1))
+
+        if forces is None:
+            response = np.linalg.inv(dynamic_matrix)
+        else:
+            if isinstance(forces, str):
+                force_functions = self._harmonic_force_functions(excitation_freq)
+                params_array, _ = self._numerical_params_array(force_functions['params'], values)
+                amplitudes = force_functions['amplitudes'](params_array, shape=grid_shape)
+                forces_array = amplitudes[:dofs] - 1j * amplitudes[dofs:]
+            else:
+                if isinstance(forces, dict):
+                    forces = [forces.get(coord, 0.0) for coord in self.q]
+                forces_array = np.broadcast_to(np.asarray(forces, dtype=complex).reshape(dofs, *([1] * len(grid_shape))), (dofs, *grid_shape))
+
+            response = np.linalg.solve(dynamic_matrix, np.moveaxis(forces_array, 0, -1)[..., np.newaxis])[..., 0]
+
+        omega = frequencies.reshape(-1, *([1] * (response.ndim - 1)))
+        if output == 'mobility':
+            response = 1j * omega * response
+        elif output == 'accelerance':
+            response = -omega**2 * response
+        elif output != 'receptance':
+            raise ValueError(f'Unknown output {output}, use receptance, mobility or accelerance.')
+
+        if not as_frame:
+            return response
+
+        columns = [list(self.q)] if forces is not None else [list(self.q), list(self.q)]
+        if cases_shape:
+            columns = [range(cases_shape[0])] + columns
+
+        spectrum = SpectrumFrame(data=response.reshape(len(frequencies), -1),
+                                 index=pd.Index(frequencies, name=excitation_freq),
+                                 columns=pd.MultiIndex.from_product(columns) if len(columns) > 1 else columns[0])
+
+        return spectrum
+
 
 class HarmonicOscillator(LinearDynamicSystem):
     """
@@ -19,6 +19,7 @@ import random
 import IPython as IP
 import numpy as np
 import inspect
+from scipy.signal import lfilter
 
 
 from ..mechanics.trolley import ComposedSystem, NonlinearComposedSystem, base_frame, base_origin
@@ -136,79 +137,79 @@ class BatteryCell(ComposedSystem):
     def uth_simulation(self,data_dict1,celldata, step_time,step_current):
         
         t = self.ivar
-        U_th = self.U_th
-        R_th = self.R_th
-        C_th = self.C_th
-        I_li = self.I_li
-        U_li = self.U_li
-        U_oc = self.U_oc
-        R_0 = self.R_0
-        t_0 = self.t_0
-        SOC = self.SOC
-        C_rated = self.C_rated
-        SOC_init = self.SOC_init
-        ode_th = self.voltage_ode()
-        
-        
-
-     
-        #wzor na napiecie
-        napiecie_eq=Eq(U_li,U_oc-R_0*I_li-U_th)
-
-        
-        #wzor na soc
-        calka=integrate(I_li, (t, t_0, t))
-        SOC_eq_bezcalki = Eq(SOC,((1)/(C_rated)))
-        SOC_eq = Eq(SOC,SOC_init+((1)/(C_rated))*calka)
-        
         
         #dane symulacji
         n_points=step_time[-1]*4 #rozdzielczosc symulacji probki na sekunde
         t_array=np.linspace(0,step_time[-1]*1,n_points)#czas symulacji i prad symulacji
-
-        #tworzenie pustych list
-        prad_list=[]
-        u0_list=[]
-        u_array=[]
-        soc_array=[]
         
         #tworzenie wymuszenia
         exprI=0*Heaviside(t-0)
         for i in range(len(step_time)):
             exprI=exprI + step_current[i]*Heaviside(t-step_time[i])
         funcI = lambdify(t, exprI)
-        #exprI=step_current[0]*Heaviside(t-step_time[0])+step_current[1]*Heaviside(t-step_time[1])+step_current[2]*Heaviside(t-step_time[2])+step_current[3]*Heaviside(t-step_time[3])
-        #funcI = lambdify(t, exprI)
         
+        prad_array = np.broadcast_to(np.asarray(funcI(t_array), dtype=float), t_array.shape)
 
-        #tworzenie dataframe z wynikami rownania rozniczkowego+tworzenie z tego listy
-        tabelka=ode_th.subs(I_li,exprI).subs(data_dict1).numerized(backend='numpy').compute_solution(t_array,[0])
-        
-        #display(ode_th)
-        #display(tabelka)
+        results = self.cycle_simulation(data_dict1, celldata, t_array, prad_array)
+
+        wartosci = [results[self.U_li].to_numpy(), results[self.I_li].to_numpy(), results[self.SOC].to_numpy(), t_array]
         
-        U_th_list = list(tabelka.iloc[:,1])
+        return wartosci
 
+    def _cell_table(self, celldata, column, soc_array, default=None):
 
+        if column not in celldata.columns:
+            return np.full_like(soc_array, float(default))
 
+        table = celldata[column].sort_index()
 
-        for i in range(n_points):
-            prad_list.append(funcI(t_array[i]))
-            soc_array.append(float((SOC_eq_bezcalki.rhs.subs(data_dict1)*(-1)*(np.trapz(prad_list[0:i], x=t_array[0:i]))/3600+SOC_init.subs(data_dict1))))
+        return np.interp(soc_array*100, table.index.to_numpy(dtype=float), table.to_numpy(dtype=float))
 
-            #tutaj jest dopasowanie ocv w zaleznosci od soc, zamiast ifow
-            soc_calk = int(soc_array[i]*100)
-            #soc_calk = soc_calk*100
-            data_dict1[self.U_oc]= celldata.at[soc_calk, 'OCV']
-            data_dict1[self.R_0]=celldata.at[soc_calk, 'R0']
+    def cycle_simulation(self, data_dict, celldata, time_array, current, U_th_init=0.0):
+        '''
+        Simulates the cell for the sampled current (drive cycle) and returns the DataFrame of terminal voltage, current, SOC, U_th, U_oc and R_0 indexed by time. The SOC is obtained by the cumulative (trapezoidal) integration of current, the OCV and R0 (and R_th, C_th if the celldata contains such columns) are interpolated from celldata (indexed with SOC in percents) and the U_th of RC branch is integrated exactly for the current linear between samples with the parameters of every step taken for its SOC.
+        '''
+        t_array = np.atleast_1d(np.asarray(time_array, dtype=float))
+        current_array = np.broadcast_to(np.asarray(current, dtype=float), t_array.shape)
 
-            u0_list.append( prad_list[-1] * data_dict1[self.R_0])
-            u_array.append(data_dict1[self.U_oc]-U_th_list[i]-u0_list[i])
+        C_rated = float(self.C_rated.subs(data_dict))
+        SOC_init = float(self.SOC_init.subs(data_dict))
 
+        charge = np.concatenate([[0.0], np.cumsum(np.diff(t_array)*(current_array[1:] + current_array[:-1])/2)])
+        soc_array = SOC_init - charge/3600/C_rated
 
-        wartosci = [u_array,prad_list,soc_array,t_array]
-        
-        return wartosci
+        U_oc_array = self._cell_table(celldata, 'OCV', soc_array)
+        R_0_array = self._cell_table(celldata, 'R0', soc_array)
+        R_th_array = self._cell_table(celldata, 'R_th', soc_array, self.R_th.subs(data_dict))
+        C_th_array = self._cell_table(celldata, 'C_th', soc_array, self.C_th.subs(data_dict))
+
+        # exact step of dU_th/dt = -U_th/(R_th*C_th) - I/C_th for the current linear within the step
+        dt = np.diff(t_array)
+        tau = (R_th_array*C_th_array)[:-1]
+        decay = np.exp(-dt/tau)
+        ramp = 1 - tau*(1 - decay)/dt
+        forcing = -R_th_array[:-1]*(current_array[:-1]*(1 - decay) + (current_array[1:] - current_array[:-1])*ramp)
+
+        if len(t_array) < 2:
+            # the single sample is the initial state
+            U_th_array = np.full(t_array.shape, float(U_th_init))
+        elif np.all(decay == decay[0]):
+            U_th_array = lfilter([0, 1], [1, -decay[0]], np.append(forcing, 0.0)) + U_th_init*decay[0]**np.arange(len(t_array))
+        else:
+            U_th_list = [float(U_th_init)]
+            for decay_step, forcing_step in zip(decay.tolist(), forcing.tolist()):
+                U_th_list.append(decay_step*U_th_list[-1] + forcing_step)
+            U_th_array = np.array(U_th_list)
+
+        results = pd.DataFrame({self.ivar: t_array}).set_index(self.ivar)
+        results[self.U_li] = U_oc_array - R_0_array*current_array - U_th_array
+        results[self.I_li] = current_array
+        results[self.SOC] = soc_array
+        results[self.U_th] = U_th_array
+        results[self.U_oc] = U_oc_array
+        results[self.R_0] = R_0_array
+
+        return results
     
 
     def _voltage_response(self,data_dict1,celldata,step_time,step_current):
@@ -104,7 +104,7 @@ class ComposedSystem(HarmonicOscillator):
 
         return path
 
-    def _init_from_components(self, *args, system=None, **kwargs):
+    def _init_from_components(self, *args, system=None, evaluate='lazy', **kwargs):
 
         if system is None:
             composed_system = self._elements_sum
@@ -112,7 +112,7 @@ class ComposedSystem(HarmonicOscillator):
             composed_system = system
 
         #print('CS',composed_system._components)
-        super(HarmonicOscillator,self).__init__(None, system=composed_system)
+        super(HarmonicOscillator,self).__init__(None, system=composed_system, evaluate=evaluate)
 
         #print('self',self._components)
         if self._components is None:
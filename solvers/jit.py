@@ -0,0 +1,144 @@
+"""
+This module provides the JIT-compiled (numba) right-hand sides and integration loops used by the 'numba' backend of OdeComputationalCase
+"""
+
+from sympy import Symbol, Matrix, cse, numbered_symbols
+from sympy.printing.numpy import NumPyPrinter
+import numpy as np
+
+try:
+    import numba
+except ImportError as error:
+    raise ImportError("The 'numba' backend of OdeComputationalCase requires the numba package") from error
+
+
+def rhs_source(odes, ivar, dvars, params, func_name='_numba_rhs'):
+    '''
+    Returns the source of the function f(t, y, p) computing the right-hand sides, where y and p are 1D arrays of states and parameters. The common subexpressions are eliminated and stored in temporaries.
+    '''
+    subs_dict = {ivar: Symbol('t_ivar')}
+    subs_dict.update({var: Symbol(f'state_{no}') for no, var in enumerate(dvars)})
+    subs_dict.update({par: Symbol(f'param_{no}') for no, par in enumerate(params)})
+
+    odes_temp = [expr.subs(subs_dict, simultaneous=True) for expr in Matrix(odes).doit().n()]
+    replacements, reduced = cse(odes_temp, symbols=numbered_symbols('cse_tmp_'), optimizations='basic')
+
+    printer = NumPyPrinter({'fully_qualified_modules': True, 'inline': True, 'allow_unknown_functions': False})
+
+    lines = [f'def {func_name}(t_ivar, y, p):']
+    lines += [f'    state_{no} = y[{no}]' for no in range(len(dvars))]
+    lines += [f'    param_{no} = p[{no}]' for no in range(len(params))]
+    lines += [f'    {tmp} = {printer.doprint(expr)}' for tmp, expr in replacements]
+    lines += [f'    out = numpy.empty({len(reduced)})']
+    lines += [f'    out[{no}] = {printer.doprint(expr)}' for no, expr in enumerate(reduced)]
+    lines += ['    return out', '']
+
+    return '\n'.join(lines)
+
+
+def jit_rhs(source, func_name='_numba_rhs'):
+    '''
+    Executes the source generated by rhs_source and returns the nopython-compiled function.
+    '''
+    namespace = {'numpy': np}
+    exec(compile(source, f'<{func_name}>', 'exec'), namespace)
+
+    return numba.njit(namespace[func_name])
+
+
+@numba.njit
+def rk4_integration(rhs, t_span, y0, p, max_step):
+    '''
+    Classical fixed-step Runge-Kutta integration with the samples returned for every point of t_span. The interval between the samples is divided into substeps not longer than max_step.
+    '''
+    solution = np.empty((len(y0), len(t_span)))
+    y = y0.copy()
+    solution[:, 0] = y
+
+    for no in range(len(t_span) - 1):
+        t_start = t_span[no]
+        interval = t_span[no + 1] - t_start
+
+        steps_no = max(int(np.ceil(interval / max_step)), 1)
+        h = interval / steps_no
+
+        for step in range(steps_no):
+            t = t_start + step * h
+
+            k1 = rhs(t, y, p)
+            k2 = rhs(t + h / 2, y + h / 2 * k1, p)
+            k3 = rhs(t + h / 2, y + h / 2 * k2, p)
+            k4 = rhs(t + h, y + h * k3, p)
+
+            y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+        solution[:, no + 1] = y
+
+    return solution
+
+
+@numba.njit
+def dopri45_integration(rhs, t_span, y0, p, atol, rtol, max_step):
+    '''
+    Adaptive Dormand-Prince 5(4) integration (the scheme of RK45 method of solve_ivp). The steps are shortened to hit every point of t_span exactly.
+
+    Returns the tuple (solution, status, t) where status is 0 for the successful integration and -1 if the step size dropped below the spacing of numbers at t (e.g. the solution blows up or the right-hand side is not finite). In the latter case the samples after t are filled with NaN.
+    '''
+    c2, c3, c4, c5 = 1 / 5, 3 / 10, 4 / 5, 8 / 9
+    a21 = 1 / 5
+    a31, a32 = 3 / 40, 9 / 40
+    a41, a42, a43 = 44 / 45, -56 / 15, 32 / 9
+    a51, a52, a53, a54 = 19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729
+    a61, a62, a63, a64, a65 = 9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656
+    b1, b3, b4, b5, b6 = 35 / 384, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84
+    e1, e3, e4, e5, e6, e7 = 71 / 57600, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40
+
+    solution = np.empty((len(y0), len(t_span)))
+    y = y0.copy()
+    solution[:, 0] = y
+
+    t = t_span[0]
+    h = min(max_step, (t_span[-1] - t_span[0]) / 100)
+    k1 = rhs(t, y, p)
+
+    for no in range(len(t_span) - 1):
+        t_end = t_span[no + 1]
+
+        while t < t_end:
+            h_step = min(h, t_end - t, max_step)
+            last_step = h_step >= t_end - t
+
+            k2 = rhs(t + c2 * h_step, y + h_step * a21 * k1, p)
+            k3 = rhs(t + c3 * h_step, y + h_step * (a31 * k1 + a32 * k2), p)
+            k4 = rhs(t + c4 * h_step, y + h_step * (a41 * k1 + a42 * k2 + a43 * k3), p)
+            k5 = rhs(t + c5 * h_step, y + h_step * (a51 * k1 + a52 * k2 + a53 * k3 + a54 * k4), p)
+            k6 = rhs(t + h_step, y + h_step * (a61 * k1 + a62 * k2 + a63 * k3 + a64 * k4 + a65 * k5), p)
+
+            y_new = y + h_step * (b1 * k1 + b3 * k3 + b4 * k4 + b5 * k5 + b6 * k6)
+            k7 = rhs(t + h_step, y_new, p)
+
+            error = h_step * (e1 * k1 + e3 * k3 + e4 * k4 + e5 * k5 + e6 * k6 + e7 * k7)
+            scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+            error_norm = np.sqrt(np.mean((error / scale)**2))
+
+            if not np.isfinite(error_norm):
+                # the rejected step is shortened with the largest factor until the minimal step is reached
+                h = 0.2 * h_step
+            elif error_norm <= 1.0:
+                t = t_end if last_step else t + h_step
+                y = y_new
+                k1 = k7
+
+                factor = 10.0 if error_norm == 0.0 else min(10.0, 0.9 * error_norm**(-0.2))
+                # the step shortened to reach the sample does not limit the next one
+                h = max(h, h_step * factor) if last_step else h_step * factor
+            else:
+                h = h_step * max(0.2, 0.9 * error_norm**(-0.2))
+
+            if t < t_end and h < 1e-14 * max(abs(t), abs(t_end)):
+                solution[:, no + 1:] = np.nan
+                return solution, -1, t
+
+        solution[:, no + 1] = y
+
+    return solution, 0, t
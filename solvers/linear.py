@@ -2,11 +2,13 @@ from sympy import (Symbol, symbols, Matrix, sin, cos, diff, sqrt, S, diag, Eq,
                    hessian, Function, flatten, Tuple, im, re, pi, latex,
                    dsolve, solve, fraction, factorial, Add, Mul, exp, zeros, shape,
                    numbered_symbols, integrate, ImmutableMatrix,Expr,Dict,Subs,Derivative,Dummy,
-                   lambdify, Pow, Integral, init_printing, I, N,eye, zeros, det, Integer,separatevars,Heaviside,simplify)
+                   lambdify, Pow, Integral, init_printing, I, N,eye, zeros, det, Integer,separatevars,Heaviside,simplify, srepr)
 
 from sympy.matrices.matrices import MatrixBase
 from sympy.solvers.ode.systems import matrix_exp, matrix_exp_jordan_form
 from sympy.solvers.deutils import ode_order
+from sympy.printing.repr import ReprPrinter
+from sympy.core.function import AppliedUndef
 from sympy import classify_ode
 
 from numbers import Number
@@ -19,6 +21,9 @@ from sympy.utilities.autowrap import autowrap, ufuncify
 import numpy as np
 import itertools as itools
 import scipy.integrate as solver
+from scipy.linalg import expm
+from scipy.sparse import csc_matrix, bmat as sparse_bmat
+from scipy.sparse.linalg import expm as sparse_expm
 from ..utilities.adaptable import TimeSeries, TimeDataFrame, NumericalAnalysisDataFrame
 
 from collections import ChainMap
@@ -30,13 +35,32 @@ import sympy.physics.mechanics as me
 from sympy.simplify.fu import TR8, TR10, TR7,TR6, TR5, TR3
 from collections.abc import Iterable
 from sympy.solvers.ode.systems import linodesolve
-from functools import cached_property, lru_cache
+from functools import cached_property, lru_cache, wraps
 cached_property = property
 
-from .numerical import OdeComputationalCase
+
+def fingerprint_cached_property(method):
+    '''
+    Returns the property computed once for the fingerprint of the object (unlike cached_property of this module which is an alias of property). The value is computed again only if the fingerprint has changed, e.g. after ivar was set.
+    '''
+    @wraps(method)
+    def getter(self):
+        cache = self.__dict__.setdefault('_fingerprint_cache', {})
+        fingerprint = self.fingerprint
+
+        if cache.get(method.__name__, (None,))[0] != fingerprint:
+            cache[method.__name__] = (fingerprint, method(self))
+
+        return cache[method.__name__][1]
+
+    return property(getter)
+
+from .numerical import OdeComputationalCase, structural_fingerprint
 
 import time
 import pandas as pd
+import os
+import ast
 
 from ..utilities.report import (SystemDynamicsAnalyzer,DMath,ReportText,SympyFormula, AutoBreak, PyVerbatim)
 from ..utilities.templates.document import *
@@ -50,6 +74,210 @@ import copy
 
 from .tools import CommonFactorDetector, ODE_COMPONENTS_LIST, CodeFlowLogger
 
+
+def taylor_derivatives(expr, args, n=2, op_point=None):
+    '''
+    Returns the dictionary of partial derivatives of expr (up to the order n) evaluated at op_point. The keys are the tuples of variables from itertools.combinations_with_replacement (the empty tuple stands for expr itself). Every derivative of the order k is obtained by differentiation of the cached derivative of the order k-1, and the op_point is substituted once per derivative.
+    '''
+    if op_point is None:
+        op_point = {arg: 0 for arg in args}
+
+    derivatives = {(): expr}
+    for order in range(1, n + 1):
+        for args_tmp in itools.combinations_with_replacement(args, order):
+            derivatives[args_tmp] = derivatives[args_tmp[:-1]].diff(args_tmp[-1])
+
+    return {args_tmp: derivative.subs(op_point) for args_tmp, derivative in derivatives.items()}
+
+
+class _AssumptionsReprPrinter(ReprPrinter):
+    '''
+    The srepr printer which keeps the assumptions of the undefined functions (e.g. real time scales), so the evaluated output is equal to the printed expression.
+    '''
+
+    def _print_FunctionClass(self, expr):
+
+        if issubclass(expr, AppliedUndef) and expr._kwargs:
+            assumptions = ', '.join(f'{name}={value}' for name, value in sorted(expr._kwargs.items()))
+            return f'Function({expr.__name__!r}, {assumptions})'
+
+        return super()._print_FunctionClass(expr)
+
+
+class SymbolicSolutionCache:
+    '''
+    Storage of the analytical (general and steady) solutions of linear ODE systems shared by all instances. Every entry is addressed with the hash of the canonical (srepr) form of the system, so the copies and the results of subs or from_dynamic_system with the same equations reuse the solution derived once. The entries can be persisted (in the srepr form) to the directory limited by its size - the least recently used files are removed first.
+
+    The persistence is disabled until the directory is set:
+
+        >>>SymbolicSolutionCache.set_directory('./.dynpy_cache/solutions')
+    '''
+
+    _entries = {}
+    _directory = None
+    _max_size = 64 * 2**20
+    _version = 2
+
+    @classmethod
+    def set_directory(cls, path='./.dynpy_cache/solutions'):
+        cls._directory = path
+        return cls
+
+    @classmethod
+    def set_max_size(cls, max_size=64 * 2**20):
+        cls._max_size = max_size
+        return cls
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._directory is not None
+
+    @classmethod
+    def clear(cls):
+        cls._entries = {}
+        return cls
+
+    @classmethod
+    def key(cls, kind, system):
+        '''
+        Returns the hash of the structural fingerprint of the system (its type, equations, dvars and ivar) and the dependencies used for simplification which is stable between the processes.
+        '''
+        simp_deps = [sorted(deps.items(), key=str) if isinstance(deps, dict) else str(deps)
+                     for deps in (system._simp_dict, system._callback_dict)]
+
+        return structural_fingerprint(kind, system.fingerprint, str(system._default_detector), *simp_deps, cls._version)
+
+    # the only constructors which take the strings (names of symbols and functions or digits of floats)
+    _named_constructors = ('Symbol', 'Dummy', 'Function', 'Float')
+
+    @classmethod
+    def _repr(cls, obj):
+        return _AssumptionsReprPrinter().doprint(obj)
+
+    @classmethod
+    def _parse(cls, source):
+        '''
+        Returns the object of the srepr source evaluated without eval - the syntax tree is walked and only the constructors of sympy objects (classes of expressions and matrices from the sympy namespace), their constant arguments, tuples and lists are allowed. ValueError is raised for any other element, so the files of the cache directory cannot execute the code.
+        '''
+        namespace = {name: obj for name, obj in vars(sym).items()
+                     if (isinstance(obj, type) and issubclass(obj, (sym.Basic, MatrixBase))) or isinstance(obj, sym.Basic)}
+
+        def evaluated(node, strings_allowed=False):
+
+            if isinstance(node, ast.Constant) and (strings_allowed or not isinstance(node.value, (str, bytes))):
+                return node.value
+            elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+                return -evaluated(node.operand)
+            elif isinstance(node, ast.Tuple):
+                return tuple(evaluated(elem) for elem in node.elts)
+            elif isinstance(node, ast.List):
+                return [evaluated(elem) for elem in node.elts]
+            elif isinstance(node, ast.Name) and node.id in namespace:
+                return namespace[node.id]
+            elif isinstance(node, ast.Call):
+                func = evaluated(node.func)
+                if not (isinstance(func, type) and issubclass(func, (sym.Basic, MatrixBase))):
+                    raise ValueError(f'{func} is not a constructor of sympy objects.')
+
+                strings_allowed = isinstance(node.func, ast.Name) and node.func.id in cls._named_constructors
+                args = [evaluated(arg, strings_allowed) for arg in node.args]
+                kwargs = {keyword.arg: evaluated(keyword.value) for keyword in node.keywords if keyword.arg is not None}
+                if len(kwargs) != len(node.keywords):
+                    raise ValueError('Unpacking of keyword arguments is not allowed.')
+
+                return func(*args, **kwargs)
+
+            raise ValueError(f'Unsupported element of srepr source: {ast.dump(node)}')
+
+        return evaluated(ast.parse(source, mode='eval').body)
+
+    @classmethod
+    def _dumps(cls, solution, const_list):
+
+        consts = solution._integration_consts
+        if consts is not None:
+            consts = tuple(consts)
+
+        return cls._repr((ImmutableMatrix(solution.vars), ImmutableMatrix(solution.rhs), solution.ivar, consts, tuple(const_list)))
+
+    @classmethod
+    def _loads(cls, source):
+
+        vars_mat, rhs_mat, ivar, consts, const_list = cls._parse(source)
+
+        solution = ODESolution.from_vars_and_rhs(Matrix(vars_mat), Matrix(rhs_mat))
+        solution.ivar = ivar
+        if consts is not None:
+            solution.append_integration_consts(list(consts))
+
+        return solution, list(const_list)
+
+    @classmethod
+    def _copy(cls, solution):
+
+        obj = solution._assign_properties(solution._constructor(solution.lhs, solution._vars, solution._rhs))
+        if solution._integration_consts is not None:
+            obj._integration_consts = list(solution._integration_consts)
+
+        return obj
+
+    @classmethod
+    def _copy_entry(cls, entry):
+
+        solution, const_list = entry
+
+        return cls._copy(solution), list(const_list)
+
+    @classmethod
+    def load(cls, key):
+        '''
+        Returns the tuple (solution, const_list) or None if the entry does not exist. The const_list holds the integration constants introduced by the solution. The returned solution is a copy of the stored one.
+        '''
+        if key not in cls._entries and cls.is_enabled():
+
+            path = os.path.join(cls._directory, key + '.srepr')
+            if os.path.isfile(path):
+                with open(path, 'r') as file:
+                    cls._entries[key] = cls._loads(file.read())
+                os.utime(path)
+
+        if key not in cls._entries:
+            return None
+
+        return cls._copy_entry(cls._entries[key])
+
+    @classmethod
+    def store(cls, key, *entry):
+
+        cls._entries[key] = cls._copy_entry(entry)
+
+        if not cls.is_enabled():
+            return None
+
+        os.makedirs(cls._directory, exist_ok=True)
+        with open(os.path.join(cls._directory, key + '.srepr'), 'w') as file:
+            file.write(cls._dumps(*entry))
+
+        cls._evict()
+
+    @classmethod
+    def _evict(cls):
+        '''
+        Removes the least recently used entries until the size of the storage is lower than the limit.
+        '''
+        entries = [os.path.join(cls._directory, name) for name in os.listdir(cls._directory)]
+        entries = sorted([path for path in entries if path.endswith('.srepr')], key=os.path.getmtime)
+
+        sizes = {path: os.path.getsize(path) for path in entries}
+        total_size = sum(sizes.values())
+
+        for path in entries[:-1]:
+            if total_size <= cls._max_size:
+                break
+            os.remove(path)
+            total_size -= sizes[path]
+
+
 class MultivariableTaylorSeries(Expr):
     """_summary_
 
@@ -82,6 +310,7 @@ class MultivariableTaylorSeries(Expr):
         obj._op_point = x0
         
         obj._expr_symbol = None
+        obj._derivatives = None
         
         return obj
 
@@ -144,36 +373,43 @@ class MultivariableTaylorSeries(Expr):
         return {S.Zero:Subs(expr,list(op_point.keys()),list(op_point.values())),**{args_tmp:Subs(Derivative(expr,*args_tmp,evaluate=False),list(op_point.keys()),list(op_point.values())) 
             for args_tmp, poly in diff_orders_dict.items()}}
 
+    def _derivatives_dict(self):
+        '''
+        Returns the derivatives evaluated at op_point (see taylor_derivatives). They are computed once per instance.
+        '''
+        if self._derivatives is None:
+            self._set_default_op_point()
+            self._derivatives = taylor_derivatives(self.args[0], self._vars, n=self._order, op_point=self._op_point)
+
+        return self._derivatives
+
     def _diff_expr_dict(self):
 
         diff_orders_dict=self._diff_orders_dict()
-        expr=self.args[0]
-        op_point=self._op_point
+        derivatives=self._derivatives_dict()
 
-        return {S.Zero:expr.subs(op_point),**{args_tmp:expr.diff(*args_tmp).subs(op_point)
+        return {S.Zero:derivatives[()],**{args_tmp:derivatives[args_tmp]
             for args_tmp, poly in diff_orders_dict.items()}}
 
     def _components_dict(self):
 
         diff_orders_dict=self._diff_orders_dict()
         derivatives_dict=self._diff_symbols_dict()
+        derivatives=self._derivatives_dict()
 
         expr=self.args[0]
         op_point=self._op_point
 
         return {
-                Subs(expr,list(op_point.keys()),list(op_point.values())):expr.subs(op_point),
-                **{derivatives_dict[args_tmp] : expr.diff(*args_tmp).subs(op_point) for args_tmp, poly in diff_orders_dict.items()}
+                Subs(expr,list(op_point.keys()),list(op_point.values())):derivatives[()],
+                **{derivatives_dict[args_tmp] : derivatives[args_tmp] for args_tmp, poly in diff_orders_dict.items()}
         }
         
     def _series(self):
         diff_orders_dict=self._diff_orders_dict()
-        diff_dict=self._diff_symbols_dict()
+        derivatives=self._derivatives_dict()
         
-        expr=self.args[0]
-        op_point=self._op_point
-        
-        return expr.subs(op_point).doit()+Add(*[expr.diff(*args_tmp).subs(op_point).doit() * poly for args_tmp, poly in diff_orders_dict.items()],evaluate=False)
+        return derivatives[()].doit()+Add(*[derivatives[args_tmp].doit() * poly for args_tmp, poly in diff_orders_dict.items()],evaluate=False)
     
     def _symbolic_sum(self):
         diff_orders_dict=self._diff_orders_dict()
@@ -230,6 +466,7 @@ class AnalyticalSolution(ImmutableMatrix):
 
     _numerical_expand = False
     _default_doctype = ExampleTemplate
+    _fingerprint = None
 
     def __new__(cls, elements, vars = None, rhs=None, evaluate=True, **options):
 
@@ -369,9 +606,41 @@ class AnalyticalSolution(ImmutableMatrix):
         
         obj=self._constructor(list(self),self._vars, self._rhs)
         obj = self._assign_properties(obj)
-        
+        obj._fingerprint = self._fingerprint
         
         return obj.set_simp_deps(self._simp_dict,self._callback_dict,inplace=True)
+
+    def _fingerprint_state(self):
+        '''
+        Returns the attributes of the object which can be changed after the construction (e.g. with setters or class defaults) and are covered by the fingerprint.
+        '''
+        return (self._vars,)
+
+    def _fingerprint_items(self):
+
+        return (type(self).__name__, ImmutableMatrix(self.lhs), ImmutableMatrix(self.rhs), *self._fingerprint_state())
+
+    @property
+    def fingerprint(self):
+        '''
+        Structural fingerprint (see structural_fingerprint) of the object used explicitly as the key of the caches instead of the whole matrix of expressions. It is stored with the attributes of _fingerprint_state and recomputed if any of them has changed since (the elements of the matrix are immutable), so it is never stale.
+        '''
+        state = self._fingerprint_state()
+
+        if self._fingerprint is None or self._fingerprint[0] != state:
+            self._fingerprint = (state, structural_fingerprint(*self._fingerprint_items()))
+
+        return self._fingerprint[1]
+
+    def _derived_fingerprint(self, obj, *items):
+        '''
+        Stores in obj (e.g. the result of subs) the fingerprint derived from the fingerprint of the object, the items describing the operation and the state of obj, so it is not computed from the expressions of obj again. Nothing is stored if the fingerprint of the object is not known yet.
+        '''
+        if self._fingerprint is not None:
+            state = obj._fingerprint_state()
+            obj._fingerprint = (state, structural_fingerprint(self.fingerprint, type(obj).__name__, *items, *state))
+
+        return obj
     
     
     def _assign_properties(self,obj):
@@ -392,8 +661,9 @@ class AnalyticalSolution(ImmutableMatrix):
         
         
         #obj = self._assign_properties(obj)
+        obj = type(self).from_vars_and_rhs(self.lhs,result)
         
-        return type(self).from_vars_and_rhs(self.lhs,result)
+        return self._derived_fingerprint(obj, 'subs', args, sorted(kwargs.items()))
 
     @cached_property 
     def _is_rhs_form(self):
@@ -975,6 +1245,10 @@ class ODESolution(AnalyticalSolution):
                 
         return obj
 
+    def _fingerprint_state(self):
+
+        return (*super()._fingerprint_state(), self.ivar)
+
     def expand(self,deep=True, modulus=None, power_base=True, power_exp=True,mul=True, log=True, multinomial=True, basic=True, **hints):
         
 
@@ -993,6 +1267,7 @@ class ODESolution(AnalyticalSolution):
     def ivar(self,ivar):
         if ivar is not None:
             self._ivar = ivar
+            self._fingerprint = None
         
         return self._ivar
 
@@ -1223,6 +1498,8 @@ class ODESystem(AnalyticalSolution):
     
     _profcheck = False
 
+    _numerized_cases = {}
+
     @classmethod
     def from_ode_system(cls,ode_system):
 
@@ -1605,6 +1882,10 @@ class ODESystem(AnalyticalSolution):
         #if self._ode_order is None:
         
         return self._ode_order
+
+    def _fingerprint_state(self):
+
+        return (*super()._fingerprint_state(), self._dvars, self._ivar, self._ode_order, self._parameters)
     
     @cached_property
     def odes(self):
@@ -1771,6 +2052,7 @@ class ODESystem(AnalyticalSolution):
         obj._dvars=self._dvars
         obj._ivar = self.ivar
         obj._ode_order = self.ode_order
+        obj = self._derived_fingerprint(obj, 'subs', args, sorted(kwargs.items()))
         
         return obj.set_simp_deps(self._simp_dict,self._callback_dict,inplace=True)
     
@@ -1857,6 +2139,7 @@ class ODESystem(AnalyticalSolution):
         obj._ivar = self.ivar
         obj._ode_order = self.ode_order
         obj._const_list = self._const_list
+        obj._fingerprint = self._fingerprint
         
         return obj.set_simp_deps(self._simp_dict,self._callback_dict,inplace=True)
     
@@ -1902,6 +2185,7 @@ class ODESystem(AnalyticalSolution):
     def numerized(self,parameter_values=None,ic_list=None,backend='numpy',expand=False,**kwrags):
         '''
         Takes values of parameters, substitute it into the sympy Dict. Redirects the numerizing to exectution method _numerized which has lru cache.
+        The parameters are kept symbolic in the numerized system and the values are only bound to the returned case, so the right-hand side is compiled once for any values.
         '''
 
         if parameter_values is None: parameters_sympy_dict = Dict({})
@@ -1914,22 +2198,31 @@ class ODESystem(AnalyticalSolution):
         elif isinstance(ic_list, tuple): ic_tuple = ic_list
         else: print("Podano zły typ danych - podaj list lub tuple na ic_list")
 
-        return self._numerized(parameters=parameters_sympy_dict, ic_tuple=ic_tuple, backend=backend,expand=expand)
+        return self._numerized(ic_tuple=ic_tuple, backend=backend,expand=expand).with_params_values(parameters_sympy_dict)
 
-    @lru_cache
-    def _numerized(self,parameters=Dict(),ic_tuple=(),backend='numpy',expand=None,**kwrags):
+    def _numerized(self,ic_tuple=(),backend='numpy',expand=None,**kwrags):
         '''
-        Execution method that assumes all Args are hashable due to application of lru cache. Takes values of parameters and returns instance of class OdeComputationalCase.
+        Execution method that assumes all Args are hashable - the cases are stored in _numerized_cases with the fingerprint of the system. Returns instance of class OdeComputationalCase with all the system parameters left as arguments of the right-hand side.
         '''
         
         if expand is None:
             expand = ODESystem._numerical_expand
+
+        cache_key = (self.fingerprint, ic_tuple, backend, expand)
+        if cache_key not in ODESystem._numerized_cases:
+            ODESystem._numerized_cases[cache_key] = self._numerized_case(backend=backend, expand=expand)
+
+        return ODESystem._numerized_cases[cache_key]
+
+    def _numerized_case(self, backend='numpy', expand=False):
         
         if expand is True:
             ode=self.expand().as_first_ode_linear_system()._to_rhs_ode()
         else:
             ode=self.as_first_ode_linear_system()._to_rhs_ode()
 
+        parameters = sorted(ode.rhs.free_symbols - {ode.ivar}, key=str)
+
         return OdeComputationalCase(odes_system=ode.rhs,ivar=ode.ivar,dvars=ode.dvars,params= parameters,backend=backend)
     
     
@@ -2414,6 +2707,8 @@ class FirstOrderODESystem(ODESystem):
     
 class FirstOrderLinearODESystem(FirstOrderODESystem):
     #_const_list = []
+
+    _state_space_cache = {}
     
     @classmethod
     def from_odes(cls,odes_system,dvars,ivar=None,ode_order=1,parameters=None):
@@ -2465,6 +2760,168 @@ class FirstOrderLinearODESystem(FirstOrderODESystem):
 #         return self._to_rhs_ode().odes_rhs.subs({coord:0 for coord in self.dvars})
         return self.odes_rhs.subs({coord:0 for coord in self.dvars})
 
+    @fingerprint_cached_property
+    def _state_space_params(self):
+
+        return sorted(Matrix(self.odes_rhs).free_symbols - {self.ivar}, key=str)
+
+    def _state_space_functions(self, inputs=(), outputs=()):
+        '''
+        Returns the functions of _lambdified_state_space stored with the fingerprint of the system.
+        '''
+        cache_key = (self.fingerprint, inputs, outputs)
+        if cache_key not in FirstOrderLinearODESystem._state_space_cache:
+            FirstOrderLinearODESystem._state_space_cache[cache_key] = self._lambdified_state_space(inputs, outputs)
+
+        return FirstOrderLinearODESystem._state_space_cache[cache_key]
+
+    def _lambdified_state_space(self, inputs=(), outputs=()):
+        '''
+        Returns the lambdified functions of the matrices A, B, C, D (arguments are the values of parameters ordered as _state_space_params) and of the input vector u(t). For the empty inputs the free terms of the system are the inputs (B is the identity matrix), otherwise the free terms have to be linear combinations of the given inputs.
+        '''
+        params = self._state_space_params
+        modules = [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy']
+
+        odes_rhs = Matrix(self.odes_rhs).doit()
+        A = odes_rhs.jacobian(self.dvars)
+        free_terms = odes_rhs.subs({coord: 0 for coord in self.dvars})
+
+        # inputs can be given as any expressions (e.g. functions of ivar), so they are replaced with dummies
+        inputs_subs = {inp: Dummy() for inp in inputs}
+
+        if inputs:
+            B = free_terms.subs(inputs_subs).jacobian(list(inputs_subs.values()))
+
+            uncovered_terms = free_terms.subs(inputs_subs).subs({dummy: 0 for dummy in inputs_subs.values()})
+            if any(term != 0 for term in uncovered_terms.applyfunc(simplify)) or B.has(*inputs_subs.values()):
+                raise ValueError(f'The free terms {list(free_terms)} are not linear combinations of the inputs {list(inputs)}.')
+        else:
+            B = eye(len(self.dvars))
+
+        if outputs:
+            C = Matrix(outputs).jacobian(self.dvars)
+            D = Matrix(outputs).subs(inputs_subs).jacobian(list(inputs_subs.values())) if inputs else zeros(len(outputs), B.shape[1])
+        else:
+            C = eye(len(self.dvars))
+            D = zeros(len(self.dvars), B.shape[1])
+
+        if any(matrix.has(self.ivar) for matrix in (A, B, C, D)):
+            raise ValueError('The state-space matrices depend on the independent variable - the system with the given inputs is not time invariant.')
+
+        matrices = {name: lambdify([params], matrix, modules) for name, matrix in zip('ABCD', (A, B, C, D))}
+        matrices['u'] = lambdify([self.ivar, params], list(free_terms), modules) if not inputs else None
+
+        return matrices
+
+    def _state_space_params_values(self, parameter_values=None):
+        '''
+        Returns the list of values of parameters ordered as _state_space_params. ValueError is raised if any of them is not given.
+        '''
+        if parameter_values is None:
+            parameter_values = {}
+
+        params = self._state_space_params
+        missing_params = [par for par in params if par not in parameter_values]
+        if missing_params:
+            raise ValueError(f'Values of parameters {missing_params} are not given.')
+
+        return [float(parameter_values[par]) for par in params]
+
+    def state_space(self, parameter_values=None, inputs=None, outputs=None, sparse=False):
+        '''
+        Returns the numerical matrices (A, B, C, D) of the state-space form dx/dt = A x + B u, y = C x + D u.
+
+        Arguments
+        =========
+        parameter_values=None (optional): dict
+            Numerical values of all the parameters of the system
+
+        inputs=None (optional): list
+            Symbols (or functions of ivar) acting as the inputs u. If not given the free terms of the equations are the inputs and B is the identity matrix.
+
+        outputs=None (optional): list
+            Expressions linear in dvars (and inputs) considered as the outputs y. The states are the outputs by default.
+
+        sparse=False (optional): bool
+            If True the matrices are returned as scipy.sparse.csc_matrix
+        '''
+        params_values = self._state_space_params_values(parameter_values)
+        functions = self._state_space_functions(tuple(inputs) if inputs else (), tuple(outputs) if outputs else ())
+
+        matrices = [np.array(functions[name](params_values), dtype=float) for name in 'ABCD']
+
+        if sparse:
+            return tuple(csc_matrix(matrix) for matrix in matrices)
+
+        return tuple(matrices)
+
+    def discretized(self, dt, parameter_values=None, inputs=None, sparse=False):
+        '''
+        Returns the matrices (Ad, Bd) of the exact zero-order-hold discretization x[k+1] = Ad x[k] + Bd u[k] for the time step dt. Both are computed with a single matrix exponential of the augmented matrix [[A, B], [0, 0]]*dt.
+        '''
+        A, B, C, D = self.state_space(parameter_values, inputs=inputs, sparse=sparse)
+        states_no, inputs_no = B.shape
+
+        if sparse:
+            augmented = sparse_bmat([[A, B], [None, csc_matrix((inputs_no, inputs_no))]], format='csc')
+            exponential = sparse_expm(augmented * dt)
+        else:
+            augmented = np.block([[A, B], [np.zeros((inputs_no, states_no + inputs_no))]])
+            exponential = expm(augmented * dt)
+
+        return exponential[:states_no, :states_no], exponential[:states_no, states_no:]
+
+    def lti_solution(self, t_span, ic_list=None, parameter_values=None, sparse=False, derivatives=True):
+        '''
+        Returns the time response (TimeDataFrame) computed by stepping of the exact zero-order-hold discretization (see discretized) instead of the numerical integration. The t_span has to be uniformly distributed, the free terms (inputs) are sampled at the midpoints of steps and held constant within every step.
+        '''
+        t_span = np.atleast_1d(np.asarray(t_span, dtype=float))
+        steps = np.diff(t_span)
+
+        if len(t_span) == 0:
+            raise ValueError('The t_span has to contain at least one time instant.')
+
+        if not np.allclose(steps, steps[:1], rtol=1e-9, atol=0):
+            raise ValueError('The t_span has to be uniformly distributed.')
+
+        if ic_list is None:
+            ic_list = [0.0] * len(self.dvars)
+        elif isinstance(ic_list, dict):
+            ic_list = [ic_list.get(coord, 0.0) for coord in self.dvars]
+
+        params_values = self._state_space_params_values(parameter_values)
+
+        A = self.state_space(parameter_values, sparse=sparse)[0]
+
+        inputs_fun = self._state_space_functions()['u']
+        sampled_inputs = lambda t_values: np.array([np.broadcast_to(np.asarray(value, dtype=float), t_values.shape)
+                                                    for value in inputs_fun(t_values, params_values)])
+
+        solution = np.empty((len(self.dvars), len(t_span)))
+        solution[:, 0] = ic_list
+
+        # the single time instant gives the initial state only
+        if len(steps) > 0:
+            dt = steps[0]
+            Ad, Bd = self.discretized(dt, parameter_values, sparse=sparse)
+
+            # the contribution of inputs (held at the midpoints of steps) is computed for all the steps at once
+            forced_part = Bd @ sampled_inputs(t_span[:-1] + dt / 2)
+
+            for no in range(len(t_span) - 1):
+                solution[:, no + 1] = Ad @ solution[:, no] + forced_part[:, no]
+
+        solution_tdf = TimeDataFrame(data={coord: solution[no] for no, coord in enumerate(self.dvars)}, index=t_span)
+
+        if derivatives:
+            derivatives_array = A @ solution + sampled_inputs(t_span)
+            for no, coord in enumerate(self.dvars):
+                solution_tdf[coord.diff(self.ivar)] = derivatives_array[no]
+
+        solution_tdf.index.name = self.ivar
+
+        return solution_tdf
+
 
 
     @cached_property
@@ -2971,6 +3428,11 @@ class FirstOrderLinearODESystemWithHarmonics(FirstOrderLinearODESystem):
 
     @cached_property
     def _general_solution(self):
+
+        return self._cached_solution('general')
+
+    @cached_property
+    def _analytical_general_solution(self):
         matrix = self._fundamental_matrix
     
         shape = matrix.shape
@@ -3517,8 +3979,39 @@ class FirstOrderLinearODESystemWithHarmonics(FirstOrderLinearODESystem):
         #display(rest)
         return components+[(S.One,rest)]
 
+    def _cached_solution(self, kind):
+        '''
+        Returns the solution of the given kind ('general' or 'steady') from SymbolicSolutionCache. The solution is derived (and stored) only if the system with the same canonical form has not been solved before.
+        '''
+        key = SymbolicSolutionCache.key(kind, self)
+        solutions = self.__dict__.setdefault('_cached_solutions', {})
+
+        # the solution is derived (or loaded) once for the instance and the key (fingerprint and simplification dependencies)
+        entry = solutions.get(key) or SymbolicSolutionCache.load(key)
+
+        consts_before = list(self._const_list)
+
+        if entry is None:
+            solution = getattr(self, f'_analytical_{kind}_solution')
+            kind_consts = [const for const in self._const_list if const not in consts_before]
+            SymbolicSolutionCache.store(key, solution, kind_consts)
+        else:
+            solution, kind_consts = entry
+
+        solutions[key] = (solution, kind_consts)
+
+        # every kind stores only the constants it introduces, so the merged list does not depend on the order of loading
+        self._const_list = consts_before + [const for const in kind_consts if const not in consts_before]
+
+        return solution
+
     @cached_property
     def _steady_solution(self):
+
+        return self._cached_solution('steady')
+
+    @cached_property
+    def _analytical_steady_solution(self):
         '''
         It applies generic form solution for the following differential equation
         \dot Y + A Y = F \cos(\Omega t)
@@ -4319,6 +4812,7 @@ class LinearODESolution:
 
     _const_list = set()
     _cache={}
+    _fingerprint = None
     
 
     def __init__(self,
@@ -4523,12 +5017,24 @@ class LinearODESolution:
 
         return sum(solution, Matrix([0] * len(Y_mat)))
 
+    @property
+    def fingerprint(self):
+        '''
+        Structural fingerprint of the equations, dvars and ivar computed once for the solver. It is the key of the cached solutions.
+        '''
+        if self._fingerprint is None:
+            self._fingerprint = structural_fingerprint(tuple(self.dvars), ImmutableMatrix(self.governing_equations), self.ivar)
+
+        return self._fingerprint
+
     def steady_solution(self, initial_conditions=None):
-        if (tuple(self.dvars),ImmutableMatrix(self.governing_equations)) in self.__class__._cache:
+        cache_key = self.fingerprint
+
+        if cache_key in self.__class__._cache:
 
 
             #print('cache for Linear ODE')
-            steady_sol=self.__class__._cache[(tuple(self.dvars),ImmutableMatrix(self.governing_equations))]
+            steady_sol=self.__class__._cache[cache_key]
             
         else:
             #print('new solution')
@@ -4614,7 +5120,7 @@ class LinearODESolution:
                 else:
                     steady_sol += sym.dsolve(eqns_res, self.dvars)
                     
-            self.__class__._cache[(tuple(self.dvars),ImmutableMatrix(self.governing_equations))] = steady_sol
+            self.__class__._cache[cache_key] = steady_sol
 
                 
         return -steady_sol
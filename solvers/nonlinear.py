@@ -1409,12 +1409,12 @@ class MultiTimeScaleMethod(LinearODESolution):
         if params_values:
             self.params_values = params_values
 
-        solution = self.nth_order_solution(order).rhs
+        if isinstance(ivar, Symbol):
 
-        solution = solution.applyfunc(
-            lambda x: x.subs(self.extra_params).subs(self.params_values))
+            solution = self.nth_order_solution(order).rhs
 
-        if isinstance(ivar, Symbol):
+            solution = solution.applyfunc(
+                lambda x: x.subs(self.extra_params).subs(self.params_values))
 
             ics_dict = self._ic_from_sol(order=order, formula=True)
             display(ics_dict)
@@ -1423,17 +1423,7 @@ class MultiTimeScaleMethod(LinearODESolution):
                 self.ivar, ivar)
         else:
 
-            ics_dict = self._ic_from_sol(order=order, formula=False)
-
-            ics_symbols_dict = {
-                sym: val
-                for sym, val in zip(self.ics_symbols, self.ics)
-            }
-
-            ######################### old #############
-
-            #nth_order_solution_fun = lambdify(self.ivar, (solution.subs(ics_dict).subs(self.extra_params).subs(ics_symbols_dict)).subs(self.params_values).n(), 'numpy')
-            ######################### old #############
+            t_0 = time()
 
             notnumbers_dict = {
                 **self._notnumbers_dict(self.extra_params),
@@ -1444,63 +1434,68 @@ class MultiTimeScaleMethod(LinearODESolution):
                 **self._numbers_dict(self.params_values)
             }
 
-            nth_order_solution_expr = solution.subs(ics_dict).subs(
-                notnumbers_dict)
-
-            if (tuple(nth_order_solution_expr)
-                ) not in self.__class__._saved_numerized:
-                self.__class__._saved_numerized[tuple(
-                    nth_order_solution_expr)] = lambdify(
-                        [self.ivar] + list(numbers_dict.keys()) +
-                        list(ics_symbols_dict.keys()),
-                        nth_order_solution_expr.n())
-
-            t_0 = time.time()
-
-            nth_order_solution_fun = self.__class__._saved_numerized[tuple(nth_order_solution_expr)]
-
-            #return nth_order_solution_fun(ivar)
-            solution = TimeDataFrame(
-                data={
-                    dvar: data[0]
-                    for dvar, data in zip(
-                        self.dvars,
-                        nth_order_solution_fun(
-                            ivar, **{
-                                str(key): val
-                                for key, val in numbers_dict.items()
-                            }, **{
-                                str(key): val
-                                for key, val in ics_symbols_dict.items()
-                            }))
-                    #for dvar, data in zip(self.dvars, nth_order_solution_fun(ivar))
-                },
-                index=ivar)
-
-            for dvar in self.dvars:
-                solution[dvar.diff(self.ivar,
-                                   1)] = solution[dvar].gradient()
-
-            for dvar in self.dvars:
-                solution[dvar.diff(self.ivar,
-                                   2)] = solution[dvar.diff(self.ivar,
-                                                            1)].gradient()
-            t_e = time.time()
-            
-            t_d = t_e-t_0
-            
-            solution.index.name = self.ivar
+            compiled_sol = self._compiled_solution(order=order, notnumbers_dict=notnumbers_dict)
 
-            print('A_time' * 20, t_d)
+            missing_params = [par for par in compiled_sol['params'] if par not in numbers_dict]
+            if missing_params:
+                raise ValueError(f'Values of parameters {missing_params} are not given.')
+            params_args = [numbers_dict[par] for par in compiled_sol['params']]
 
-            solution = solution.apply(np.real)
+            ics_matrix = np.asarray(compiled_sol['ics_matrix'](*params_args), dtype=complex)
+            ics_free = np.asarray(compiled_sol['ics_free'](*params_args), dtype=complex).flatten()
+            consts = np.linalg.solve(ics_matrix, np.asarray(self.ics, dtype=complex) - ics_free)
 
-            solution._set_comp_time(t_d)
+            time_array = np.asarray(ivar, dtype=float)
+            response = np.array([np.broadcast_to(value, time_array.shape) for value in compiled_sol['response'](time_array, *params_args, *consts)])
+
+            dvars_list = list(self.dvars)
+            columns = dvars_list + [dvar.diff(self.ivar, 1) for dvar in dvars_list] + [dvar.diff(self.ivar, 2) for dvar in dvars_list]
+
+            solution = TimeDataFrame(data={column: np.real(data) for column, data in zip(columns, response)}, index=time_array)
+            solution.index.name = self.ivar
 
-            print('B_time' * 20, solution._get_comp_time(t_d))
+            solution._set_comp_time(time() - t_0)
 
             return solution
 
+    def _compiled_solution(self, order=1, notnumbers_dict={}):
+        '''
+        Returns the functions compiled once for the order and the structure of the system (the class cache is keyed with the structural fingerprint of the system, order and symbolic data). The parameters with numerical values are the arguments, so new values or time grid require single vectorized call:
+
+        response(t, *params, *consts) - the solution with its analytical first and second time derivatives,
+        ics_matrix(*params), ics_free(*params) - the linear equations for the integration constants (the solution and its derivative at t=0).
+        '''
+        symbolic_data = {**self.extra_params, **notnumbers_dict}
+        key = (self.fingerprint, order, tuple(sorted(symbolic_data.items(), key=str)))
+
+        if key not in self.__class__._saved_numerized:
+
+            solution = self.nth_order_solution(order).rhs.applyfunc(
+                lambda expr: expr.subs(self.extra_params).subs(notnumbers_dict))
+
+            ics_eqns = Matrix(list(solution.subs({self.ivar: 0})) + list(solution.diff(self.ivar).subs({self.ivar: 0}))).applyfunc(
+                lambda eq: eq.expand())
+
+            consts_list = [var for var in list(ics_eqns.atoms(Symbol, Function)) if var in FirstOrderODE._const_list]
+            consts_dict = {const: Dummy(f'C_{no}') for no, const in enumerate(consts_list)}
+
+            ics_matrix = ics_eqns.jacobian(consts_list).subs({const: 0 for const in consts_list})
+            ics_free = ics_eqns.subs({const: 0 for const in consts_list})
+
+            velocity = solution.diff(self.ivar)
+            response = Matrix([*solution, *velocity, *velocity.diff(self.ivar)]).subs(consts_dict).doit()
+
+            params = sorted((response.free_symbols | ics_matrix.free_symbols | ics_free.free_symbols) - {self.ivar} - set(consts_dict.values()), key=str)
+
+            self.__class__._saved_numerized[key] = {
+                'params': params,
+                'response': lambdify([self.ivar] + params + list(consts_dict.values()), list(response.n())),
+                'ics_matrix': lambdify(params, ics_matrix.n()),
+                'ics_free': lambdify(params, ics_free.n()),
+            }
+
+        return self.__class__._saved_numerized[key]
+
     def _format_solution(self, dvars, solution, dict=False, equation=False):
 
         if equation:
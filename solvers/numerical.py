@@ -7,6 +7,7 @@ from sympy.utilities.autowrap import autowrap, ufuncify
 import numpy as np
 import itertools as itools
 import scipy.integrate as solver
+from scipy.sparse import csc_matrix
 from sympy.utilities.lambdify import lambdify
 from ..utilities.adaptable import TimeSeries, TimeDataFrame,NumericalAnalysisDataFrame
 from scipy.misc import derivative
@@ -19,6 +20,342 @@ import sympy.physics.mechanics as me
 from sympy.simplify.fu import TR8, TR10, TR7, TR3
 import time
 import pandas as pd
+import copy
+import os
+import glob
+import shutil
+import hashlib
+import hmac
+import inspect
+import importlib.util
+from importlib.machinery import EXTENSION_SUFFIXES
+from sympy import srepr, cse, numbered_symbols
+
+
+def structural_fingerprint(*items):
+    '''
+    Returns the hash (sha256) of the canonical (srepr) form of the items. The arguments of sympy expressions are stored in the canonical order, so the fingerprint does not depend on the order of terms in which the expressions were built and it is stable between the processes. It is used as the key of solver and numerization caches instead of the expressions themselves.
+    '''
+    return hashlib.sha256('|'.join(srepr(item) for item in items).encode()).hexdigest()
+
+
+class NumericalRhsCache:
+    '''
+    Persistent storage of the generated right-hand sides of ODEs. Every entry is a directory named with the hash of the canonical form of the system (odes, dvars, parameters and backend) and contains the python source generated by lambdify (numpy backend) or the binary module generated by autowrap (fortran backend). The storage is limited by its size and the least recently used entries are removed first.
+
+The stored files are executed (source) or imported (binary module) when the entry is loaded. Every file is stored with the hash of its content and the key of the entry (file `<name>.sha256`) and the files whose content does not match the hash are ignored and generated again - it protects against the corrupted or swapped entries, but not against a user who can rewrite both files. The directory has to be trusted (writable only by the owner of the process), in the same way as the directories of imported python modules.
+
+    The cache is disabled until the directory is set:
+
+        >>>NumericalRhsCache.set_directory('./.dynpy_cache')
+    '''
+
+    _directory = None
+    _max_size = 512 * 2**20
+    _version = 2
+
+    @classmethod
+    def set_directory(cls, path='./.dynpy_cache'):
+        cls._directory = path
+        return cls
+
+    @classmethod
+    def set_max_size(cls, max_size=512 * 2**20):
+        cls._max_size = max_size
+        return cls
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._directory is not None
+
+    @classmethod
+    def key(cls, fingerprint, dvars, params, backend):
+        '''
+        Returns the hash of the structural fingerprint of odes (see structural_fingerprint), dvars, parameters and backend which is stable between the processes.
+        '''
+        return structural_fingerprint(fingerprint, tuple(dvars), tuple(params), str(backend), cls._version)
+
+    @classmethod
+    def entry_directory(cls, key):
+
+        path = os.path.join(cls._directory, key)
+        os.makedirs(path, exist_ok=True)
+
+        return path
+
+    @classmethod
+    def _touch(cls, path):
+        os.utime(path)
+
+    @classmethod
+    def _content_hash(cls, key, content):
+        return hashlib.sha256(key.encode() + b'|' + content).hexdigest()
+
+    @classmethod
+    def _seal(cls, key, path):
+        '''
+        Stores the hash of the content of the file (with the key of the entry) next to the file.
+        '''
+        with open(path, 'rb') as file:
+            content_hash = cls._content_hash(key, file.read())
+
+        with open(path + '.sha256', 'w') as file:
+            file.write(content_hash)
+
+    @classmethod
+    def _read_verified(cls, key, path):
+        '''
+        Returns the content of the file or None if the file or its hash does not exist or the content does not match the hash.
+        '''
+        if not (os.path.isfile(path) and os.path.isfile(path + '.sha256')):
+            return None
+
+        with open(path, 'rb') as file:
+            content = file.read()
+        with open(path + '.sha256', 'r') as file:
+            content_hash = file.read().strip()
+
+        if not hmac.compare_digest(content_hash, cls._content_hash(key, content)):
+            return None
+
+        return content
+
+    @classmethod
+    def load_source(cls, key, namespace, func_name='_lambdifygenerated'):
+        '''
+        Returns the function executed from the stored source or None if the entry does not exist or the source does not match its hash.
+        '''
+        if not cls.is_enabled():
+            return None
+
+        path = os.path.join(cls._directory, key, 'rhs.py')
+        source = cls._read_verified(key, path)
+        if source is None:
+            return None
+
+        func_namespace = dict(namespace)
+        exec(compile(source.decode(), path, 'exec'), func_namespace)
+        cls._touch(os.path.dirname(path))
+
+        return func_namespace[func_name]
+
+    @classmethod
+    def store_source(cls, key, source):
+
+        if not cls.is_enabled():
+            return None
+
+        path = os.path.join(cls.entry_directory(key), 'rhs.py')
+        with open(path, 'w') as file:
+            file.write(source)
+        cls._seal(key, path)
+
+        cls._evict()
+
+    @classmethod
+    def store_binary(cls, key):
+        '''
+        Stores the hashes of the modules compiled by autowrap in the directory of the entry.
+        '''
+        if not cls.is_enabled():
+            return None
+
+        for path in cls._binary_modules(key):
+            cls._seal(key, path)
+
+        cls._evict()
+
+    @classmethod
+    def _binary_modules(cls, key):
+
+        entry_path = os.path.join(cls._directory, key)
+
+        return [path for suffix in EXTENSION_SUFFIXES
+                for path in glob.glob(os.path.join(entry_path, 'wrapper_module_*' + suffix))]
+
+    @classmethod
+    def load_binary(cls, key, func_name='autofunc'):
+        '''
+        Returns the function from the compiled module stored in the entry or None if the module does not exist or does not match its hash.
+        '''
+        if not cls.is_enabled():
+            return None
+
+        entry_path = os.path.join(cls._directory, key)
+        modules_list = [path for path in cls._binary_modules(key) if cls._read_verified(key, path) is not None]
+        if not modules_list:
+            return None
+
+        module_path = modules_list[0]
+        module_name = os.path.basename(module_path).split('.')[0]
+
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        cls._touch(entry_path)
+
+        return getattr(module, func_name)
+
+    @classmethod
+    def _entry_size(cls, path):
+        return sum(os.path.getsize(os.path.join(root, file_name))
+                   for root, dirs, files in os.walk(path)
+                   for file_name in files)
+
+    @classmethod
+    def _evict(cls):
+        '''
+        Removes the least recently used entries until the size of the cache is lower than the limit.
+        '''
+        entries = [os.path.join(cls._directory, name) for name in os.listdir(cls._directory)]
+        entries = sorted([path for path in entries if os.path.isdir(path)], key=os.path.getmtime)
+
+        sizes = {path: cls._entry_size(path) for path in entries}
+        total_size = sum(sizes.values())
+
+        for path in entries[:-1]:
+            if total_size <= cls._max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= sizes[path]
+
+
+class SolvePlan:
+    '''
+    Numerical input of OdeComputationalCase resolved once for the structure of the system - the order of parameters (arguments of the compiled right-hand side) and of the states. The vectors of parameter values and initial conditions are built by array indexing without any symbolic operations.
+
+    Arguments
+    =========
+    params: list
+        Parameters in the order of arguments of the right-hand side
+
+    dvars: list
+        States (dependent variables)
+    '''
+
+    def __init__(self, params, dvars):
+
+        self.params = list(params)
+        self.dvars = list(dvars)
+        self.params_index = {par: no for no, par in enumerate(self.params)}
+
+    def params_vector(self, *values_dicts):
+        '''
+        Returns the array of parameter values ordered as params. The values from the latter dictionaries override the former ones, the keys which are not parameters of the system are skipped.
+        '''
+        vector = np.full(len(self.params), np.nan)
+
+        for values in values_dicts:
+            for par, value in values.items():
+                no = self.params_index.get(par)
+                if no is not None:
+                    vector[no] = value
+
+        if np.isnan(vector).any():
+            missing_params = [par for par, value in zip(self.params, vector) if np.isnan(value)]
+            raise ValueError(f'Values of parameters {missing_params} are not given.')
+
+        return vector
+
+    def ics_vector(self, ics):
+        '''
+        Returns the array of initial conditions ordered as dvars. The conditions can be given as the list or the dictionary (missing coordinates are set to 0).
+        '''
+        if isinstance(ics, (dict, Dict)):
+            ics = [ics.get(coord, 0.0) for coord in self.dvars]
+
+        ics_array = np.asarray(ics, dtype=float)
+
+        if len(ics_array) != len(self.dvars):
+            raise IndexError('Number of initial conditions is not correct.')
+
+        return ics_array
+
+
+class DenseSolution:
+    '''
+    Lightweight result of OdeComputationalCase.compute_dense_solution. It stores the continuous (dense output) interpolant of solve_ivp and the records of events instead of the samples, so the TimeDataFrame can be materialized at any resolution when needed.
+
+    Arguments
+    =========
+    case: OdeComputationalCase
+        Computational case which was integrated
+
+    ode_solution: OdeSolution
+        Interpolant returned by solve_ivp (attribute sol)
+
+    params_array: array
+        Values of parameters ordered as the arguments of the compiled right-hand side
+
+    events: list
+        Event expressions (or functions) in the order of t_events and y_events
+
+    t_events, y_events: list
+        Times and states of the detected events (attributes of solve_ivp result)
+    '''
+
+    def __init__(self, case, ode_solution, params_array, events=(), t_events=None, y_events=None, status=0, message=None, comp_time=None):
+
+        self.case = case
+        self.ivar = case.ivar
+        self.dvars = list(case.dvars)
+        self.ode_solution = ode_solution
+        self.params_array = np.asarray(params_array, dtype=float)
+        self.events = list(events)
+        self.t_events = t_events if t_events is not None else []
+        self.y_events = y_events if y_events is not None else []
+        self.status = status
+        self.message = message
+        self.comp_time = comp_time
+
+    @property
+    def t_min(self):
+        return self.ode_solution.t_min
+
+    @property
+    def t_max(self):
+        return self.ode_solution.t_max
+
+    @property
+    def terminated(self):
+        '''
+        True if the integration was stopped by the terminal event.
+        '''
+        return self.status == 1
+
+    def __call__(self, t):
+        '''
+        Returns the states interpolated for the time instant (1D array) or for the array of time instants (array with shape (len(dvars), len(t))).
+        '''
+        return self.ode_solution(t)
+
+    def event_records(self):
+        '''
+        Returns DataFrame with the time and the states for every detected event.
+        '''
+        records = [
+            {'event': event, self.ivar: t_event, **dict(zip(self.dvars, y_event))}
+            for event, t_list, y_list in zip(self.events, self.t_events, self.y_events)
+            for t_event, y_event in zip(t_list, y_list)
+        ]
+
+        return pd.DataFrame(records, columns=['event', self.ivar] + self.dvars).sort_values(self.ivar, ignore_index=True)
+
+    def to_tdf(self, t_span=None, points=1000, derivatives=True):
+        '''
+        Materializes the TimeDataFrame of the solution for the given t_span or for the number of points evenly distributed over the integrated interval. The derivatives flag has the same meaning as for compute_solution.
+        '''
+        if t_span is None:
+            t_span = np.linspace(self.t_min, self.t_max, points)
+        t_span = np.asarray(t_span, dtype=float)
+
+        solution_tdf = self.case._solution_frame(self(t_span), t_span, derivatives=derivatives, params_array=self.params_array)
+
+        if self.comp_time is not None:
+            solution_tdf._set_comp_time(self.comp_time)
+        solution_tdf.index.name = self.ivar
+
+        return solution_tdf
 
 
 class OdeComputationalCase:
@@ -50,9 +387,16 @@ class OdeComputationalCase:
 
     label=None (optional): string
         Labels the instance. The default label is: '{Class name} with {length of dvars} equations'
+
+    backend='numpy' (optional): string
+        Code generator of right-hand sides: 'numpy' (lambdify), 'fortran' (autowrap), 'cse' (lambdify with the common subexpressions eliminated) or 'numba' (nopython JIT-compiled function integrated with the JIT-compiled 'RK4' or 'RK45' loop, requires numba package)
     '''
     
     _cached_odes = {}
+    _implicit_methods = ('Radau', 'BDF', 'LSODA')
+    _jit_methods = ('RK4', 'RK45')
+    _instrumentation = None
+    _stiffness_threshold = 1e3
     
     
     def __init__(self,
@@ -73,6 +417,7 @@ class OdeComputationalCase:
         self._backend = backend
 
         self.odes_system = odes_system
+        self._fingerprint = None
         self._default_ics = None
         self.ivar = ivar
         self.dvars = dvars
@@ -108,6 +453,9 @@ class OdeComputationalCase:
             self.__numerical_odes = None
             self._evaluated=False
 
+        self.__batch_odes = None
+        self._batch_params = None
+
         if label == None:
             label = self._label = self.__class__.__name__ + ' with ' + str(
                 len(self.dvars)) + ' equations'
@@ -116,6 +464,16 @@ class OdeComputationalCase:
     @property
     def parameters(self):
         return self.odes_system.free_symbols-{self.ivar}
+
+    @property
+    def fingerprint(self):
+        '''
+        Structural fingerprint of the symbolic system (odes and ivar) computed once for the case and shared with its copies. It is the key of the cached right-hand sides, Jacobians and events.
+        '''
+        if self._fingerprint is None:
+            self._fingerprint = structural_fingerprint(ImmutableMatrix(self.odes_system), self.ivar)
+
+        return self._fingerprint
         
     def default_ics(self,critical_point=False):
         
@@ -185,9 +543,23 @@ class OdeComputationalCase:
 
 #         display(self.odes_system.subs(subs_dict, simultaneous=True))
 
+        cache_key = NumericalRhsCache.key(self.fingerprint, self.dvars, self.params, 'fortran')
+        odes_rhs = NumericalRhsCache.load_binary(cache_key)
+        if odes_rhs is not None:
+            return odes_rhs
+
+        if NumericalRhsCache.is_enabled():
+            tempdir = NumericalRhsCache.entry_directory(cache_key)
+        else:
+            tempdir = None
+
         #Zmiana Franek
-        return autowrap(((self.odes_system).subs({self.ivar:ivar_temp,**subs_dict}, simultaneous=True)),
-                        args=args_list)
+        odes_rhs = autowrap(((self.odes_system).subs({self.ivar:ivar_temp,**subs_dict}, simultaneous=True)),
+                        args=args_list, tempdir=tempdir)
+
+        NumericalRhsCache.store_binary(cache_key)
+
+        return odes_rhs
 #         return autowrap(((self.odes_system).subs({self.ivar[0]:ivar_temp,**subs_dict}, simultaneous=True)),
 #                         args=args_list)
         
@@ -204,33 +576,325 @@ class OdeComputationalCase:
         args_list = [self.ivar] + list(subs_dict.values()) + self.params
         #args_list = list(self.ivar) + list(subs_dict.values()) + list(self.params)
 
-        return lambdify( args_list ,
+        cache_key = NumericalRhsCache.key(self.fingerprint, self.dvars, self.params, 'numpy')
+        odes_rhs = NumericalRhsCache.load_source(cache_key, self._numpy_namespace())
+        if odes_rhs is not None:
+            return odes_rhs
+
+        odes_rhs = lambdify( args_list ,
                          ((self.odes_system).subs(subs_dict, simultaneous=True)).doit().n(),
                          [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy']
                         )
+
+        NumericalRhsCache.store_source(cache_key, inspect.getsource(odes_rhs))
+
+        return odes_rhs
+
+    @staticmethod
+    def _numpy_namespace():
+        '''
+        Returns the namespace equivalent to the one used by lambdify for the numpy code of right-hand sides.
+        '''
+        namespace = {'I': 1j}
+        exec('from numpy import *', namespace)
+        namespace.update({'sin':np.sin,'cos':np.cos,'atan':np.arctan})
+
+        return namespace
     
         # return autowrap(  (msubs(self.odes_system,subs_dict)),args=args_list)
 
+    def _rhs_args_and_odes(self, params=None):
+        '''
+        Returns the list of arguments of the generated functions and the right-hand sides with dvars replaced by temporary symbols.
+        '''
+        if params is None:
+            params = self.params
+
+        subs_dict = {
+            var: Symbol('temp_sym_' + str(i))
+            for i, var in enumerate(self.dvars)
+        }
+        args_list = [self.ivar] + list(subs_dict.values()) + list(params)
+
+        return args_list, Matrix(self.odes_system).subs(subs_dict, simultaneous=True).doit()
+
+    @staticmethod
+    def _cse_optimizer(exprs):
+        '''
+        Common subexpressions elimination used by lambdify for the 'cse' backend.
+        '''
+        return cse(exprs, symbols=numbered_symbols('cse_tmp_'), optimizations='basic')
+
+    def _cse_jacobian(self, odes, states):
+        '''
+        Returns the replacements and the Jacobian of odes with respect to states expressed with them. The derivatives are propagated through the temporaries of common subexpressions (chain rule), so the expanded right-hand sides are never differentiated.
+        '''
+        replacements, reduced = self._cse_optimizer(list(odes))
+        temporaries = {tmp for tmp, expr in replacements}
+
+        diff_symbols = numbered_symbols('cse_diff_')
+        diff_replacements = []
+        derivatives = {}
+
+        def total_diff(expr, state):
+            result = expr.diff(state)
+            for tmp in expr.free_symbols & temporaries:
+                if (tmp, state) in derivatives:
+                    result += expr.diff(tmp) * derivatives[(tmp, state)]
+            return result
+
+        for tmp, expr in replacements:
+            for state in states:
+                tmp_diff = total_diff(expr, state)
+                if tmp_diff != 0:
+                    diff_symbol = next(diff_symbols)
+                    diff_replacements.append((diff_symbol, tmp_diff))
+                    derivatives[(tmp, state)] = diff_symbol
+
+        jac_matrix = Matrix([[total_diff(expr, state) for state in states] for expr in reduced])
+
+        return replacements + diff_replacements, jac_matrix
+
+    def __cse_odes_rhs(self):
+        '''
+        Generates the numpy code of right-hand sides as the flat function where the common subexpressions (trigonometric terms, entries of mass matrix etc.) are computed once and stored in temporaries.
+        '''
+        args_list, odes_temp = self._rhs_args_and_odes()
+
+        cache_key = NumericalRhsCache.key(self.fingerprint, self.dvars, self.params, 'cse')
+        odes_rhs = NumericalRhsCache.load_source(cache_key, self._numpy_namespace())
+        if odes_rhs is not None:
+            return odes_rhs
+
+        odes_rhs = lambdify( args_list ,
+                         odes_temp.n(),
+                         [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy'],
+                         cse=self._cse_optimizer
+                        )
+
+        NumericalRhsCache.store_source(cache_key, inspect.getsource(odes_rhs))
+
+        return odes_rhs
+
+    def __numba_odes_rhs(self):
+        '''
+        Generates the nopython (numba) function of right-hand sides in the form f(t, y, p) where y and p are 1D arrays of states and parameters.
+        '''
+        from . import jit
+
+        cache_key = NumericalRhsCache.key(self.fingerprint, self.dvars, self.params, 'numba')
+        odes_rhs = NumericalRhsCache.load_source(cache_key, {'numpy': np}, func_name='_numba_rhs')
+
+        if odes_rhs is None:
+            source = jit.rhs_source(self.odes_system, self.ivar, self.dvars, self.params)
+            NumericalRhsCache.store_source(cache_key, source)
+
+            return jit.jit_rhs(source)
+
+        return jit.numba.njit(odes_rhs)
+
+    def _jit_solution(self, ivp_input, atol=1e-6, rtol=1e-3, max_step=0.1):
+        '''
+        Integrates the system with the JIT-compiled loop of 'numba' backend ('RK4' or 'RK45' method) and returns the array of states for every point of t_eval. RuntimeError is raised if the adaptive integration fails (as for the status -1 of solve_ivp).
+        '''
+        from . import jit
+
+        t_span = np.asarray(ivp_input['t_eval'], dtype=float)
+        y0 = np.asarray(ivp_input['y0'], dtype=float)
+        params_array = np.asarray(ivp_input['args'], dtype=float)
+
+        if ivp_input['method'] == 'RK4':
+            return jit.rk4_integration(self.__jit_odes, t_span, y0, params_array, float(max_step))
+
+        solution_y, status, t_fail = jit.dopri45_integration(self.__jit_odes, t_span, y0, params_array, atol, rtol, float(max_step))
+        if status != 0:
+            raise RuntimeError(f'Integration failed at {self.ivar}={t_fail}: required step size is less than spacing between numbers.')
+
+        return solution_y
+
+    def __numpy_odes_batch_rhs(self):
+        '''
+        Generates the numpy code for the batch (vectorized) evaluation of right-hand sides. Each equation is returned as a separate element of the list, so constant entries can be broadcasted over the number of cases.
+        '''
+        subs_dict = {
+            var: Symbol('temp_sym_' + str(i))
+            for i, var in enumerate(self.dvars)
+        }
+        args_list = [self.ivar] + list(subs_dict.values()) + list(self._batch_params)
+
+        return lambdify( args_list ,
+                         list(((self.odes_system).subs(subs_dict, simultaneous=True)).doit().n()),
+                         [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy'],
+                         cse=self._cse_optimizer if self._backend == 'cse' else False
+                        )
+
+    def form_batch_rhs(self, params=None):
+        '''
+        Generates and returns the vectorized right-hand side in the form f(t, Y, P), where Y is the array of stacked states with shape (len(dvars), N_cases) and P is the array of parameters with shape (len(params), N_cases).
+        '''
+        if params is None:
+            params = self.params
+        self._batch_params = list(params)
+
+        # the batch function is the numpy code for every backend, so it is shared between them (except the 'cse' one)
+        batch_backend = 'cse' if self._backend == 'cse' else 'numpy'
+        batch_key = (self.fingerprint,tuple(self.dvars),tuple(self._batch_params),batch_backend,'batch')
+        if batch_key not in self.__class__._cached_odes:
+            self.__class__._cached_odes[batch_key] = self.__numpy_odes_batch_rhs()
+        odes_rhs = self.__class__._cached_odes[batch_key]
+
+        def batch_rhs(t, Y, P):
+
+            rhs_list = odes_rhs(t, *Y, *P)
+
+            return np.array([np.broadcast_to(value, Y.shape[1:]) for value in rhs_list],dtype=float)
+
+        self.__batch_odes = batch_rhs
+
+        return self.__batch_odes
+
     def form_numerical_rhs(self):
         '''
         Generates and returns the bininary code related to symbolical expresions declered in the __init__ method. Ready-to-use function object in the compact form f(t,y,params).
         '''
         
-        odes_key = (ImmutableMatrix(self.odes_system),tuple(self.dvars))
+        self._rhs_params = list(self.params)
+        self._solve_plan = SolvePlan(self._rhs_params, self.dvars)
+        
+        odes_key = (self.fingerprint,tuple(self.dvars),tuple(self._rhs_params),self._backend)
         if odes_key in self.__class__._cached_odes:
             odes_rhs = self.__class__._cached_odes[odes_key]
         else:
             if self._backend == 'fortran':
                 odes_rhs = self.__fortran_odes_rhs()
+            elif self._backend == 'cse':
+                odes_rhs = self.__cse_odes_rhs()
+            elif self._backend == 'numba':
+                odes_rhs = self.__numba_odes_rhs()
             else:
 
                 odes_rhs = self.__numpy_odes_rhs()    
 
-        self.__numerical_odes = lambda t, y, *args, **kwargs: np.asarray(
-            (odes_rhs(t, *y, *args, **kwargs))).reshape(y.shape)
+            self.__class__._cached_odes[odes_key] = odes_rhs
+
+        if self._backend == 'numba':
+            self.__jit_odes = odes_rhs
+            self.__numerical_odes = lambda t, y, *args, **kwargs: odes_rhs(t, np.asarray(y, dtype=float), np.asarray(args, dtype=float))
+        else:
+            self.__numerical_odes = lambda t, y, *args, **kwargs: np.asarray(
+                (odes_rhs(t, *y, *args, **kwargs))).reshape(y.shape)
         
         return self.__numerical_odes
 
+    def __numpy_odes_jacobian(self, sparse=False):
+        '''
+        Generates the numpy code of the Jacobian of the right-hand sides with respect to dvars. For the sparse form only the nonzero entries are generated and the function returns them with their row and column indices.
+        '''
+        args_list, odes_temp = self._rhs_args_and_odes(self._rhs_params)
+        states = args_list[1:len(self.dvars)+1]
+
+        if self._backend == 'cse':
+            jac_replacements, jac_matrix = self._cse_jacobian(odes_temp.n(), states)
+            cse_optimizer = lambda exprs: (jac_replacements, exprs)
+        else:
+            jac_matrix = odes_temp.jacobian(states).n()
+            cse_optimizer = False
+
+        modules = [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy']
+
+        if not sparse:
+            return lambdify(args_list, jac_matrix, modules, cse=cse_optimizer)
+
+        nonzero_entries = [(row, col) for row in range(jac_matrix.rows)
+                           for col in range(jac_matrix.cols) if jac_matrix[row, col] != 0]
+        rows = np.array([row for row, col in nonzero_entries], dtype=int)
+        cols = np.array([col for row, col in nonzero_entries], dtype=int)
+
+        entries_func = lambdify(args_list, [jac_matrix[row, col] for row, col in nonzero_entries], modules, cse=cse_optimizer)
+
+        return lambda *args: (entries_func(*args), rows, cols)
+
+    def form_numerical_jacobian(self, sparse=False):
+        '''
+        Generates and returns the Jacobian of the right-hand sides in the form jac(t,y,params) accepted by solve_ivp. The sparse form returns the scipy.sparse.csc_matrix.
+        '''
+        if not self._evaluated:
+            self.form_numerical_rhs()
+            self._evaluated=True
+
+        jac_key = (self.fingerprint,tuple(self.dvars),tuple(self._rhs_params),self._backend,'jacobian',sparse)
+        if jac_key in self.__class__._cached_odes:
+            jac_func = self.__class__._cached_odes[jac_key]
+        else:
+            jac_func = self.__numpy_odes_jacobian(sparse=sparse)
+            self.__class__._cached_odes[jac_key] = jac_func
+
+        shape = (len(self.dvars), len(self.dvars))
+
+        if sparse:
+            def numerical_jac(t, y, *args):
+                data, rows, cols = jac_func(t, *y, *args)
+                return csc_matrix((np.asarray(data, dtype=float), (rows, cols)), shape=shape)
+        else:
+            numerical_jac = lambda t, y, *args: np.asarray(jac_func(t, *y, *args), dtype=float).reshape(shape)
+
+        return numerical_jac
+
+    def stiffness_ratio(self, t=0.0, y=None, params_values=()):
+        '''
+        Returns the cheap stiffness estimate - the ratio of the largest and the smallest absolute real parts of eigenvalues of the Jacobian evaluated at the given state.
+        '''
+        if y is None:
+            y = [0.0]*len(self.dvars)
+
+        jac = self.form_numerical_jacobian()(t, np.asarray(y, dtype=float), *params_values)
+        eigvals_re = np.abs(np.linalg.eigvals(jac).real)
+        eigvals_re = eigvals_re[eigvals_re > np.finfo(float).eps * max(eigvals_re.max(initial=0.0), 1.0)]
+
+        if len(eigvals_re) == 0:
+            return 1.0
+
+        return eigvals_re.max() / eigvals_re.min()
+
+    def select_method(self, ivp_input):
+        '''
+        Returns the name of the integration method for the given solve_ivp input. The implicit Radau method is chosen if the stiffness ratio at the initial point exceeds the _stiffness_threshold, otherwise the explicit RK45.
+        '''
+        ratio = self.stiffness_ratio(ivp_input['t_span'][0], ivp_input['y0'], ivp_input['args'])
+
+        if ratio > self._stiffness_threshold:
+            return 'Radau'
+        else:
+            return 'RK45'
+
+    @property
+    def solve_plan(self):
+        '''
+        Returns the SolvePlan of the case - the order of parameters and states of the compiled right-hand side resolved once.
+        '''
+        if not self._evaluated:
+            self.form_numerical_rhs()
+            self._evaluated=True
+
+        return self._solve_plan
+
+    @classmethod
+    def set_instrumentation(cls, hook=None):
+        '''
+        Sets the function called with the name of the event and its data (e.g. computing time) instead of printing them. The default None disables the instrumentation.
+
+            >>>OdeComputationalCase.set_instrumentation(lambda event, case, **data: print(event, data))
+        '''
+        cls._instrumentation = hook
+        return cls
+
+    def _instrument(self, event, **data):
+
+        hook = type(self)._instrumentation
+
+        if hook is not None:
+            hook(event, case=self, **data)
+
     def solve_ivp_input(self,
                         t_span=None,
                         ic_list=None,
@@ -240,17 +904,11 @@ class OdeComputationalCase:
         '''
         Returns the dictionary containing the necessary argument of solve_ivp integrator from scipy.integrate module.
         '''
-#         print('input parames')
-#         display(params_values)
+        plan = self.solve_plan
 
-        #Zmiana Franek
         if ic_list is None:
-        #if ic_list is None:
-            #Zmiana Franek
-            ic_list = list(Matrix(self.dvars).subs(self.ic_point))
-            #ic_list = self.ic_point
-        if len(ic_list) != len(self.dvars):
-            raise IndexError('Number of initial conditions is not correct.')
+            ic_list = self.ic_point
+        ic_list = plan.ics_vector(ic_list)
         
         if type(t_span) == type(None):
             t_span = self.t_span
@@ -259,45 +917,17 @@ class OdeComputationalCase:
             t_eval = t_span
             
         if type(params_values) == type(None):
+            params_values = self.params_values
             
-            #Zmiana Franek
-            self.params = list(self.odes_system.free_symbols - {self.ivar,Symbol('t')})
-            # self.params = list(self.odes_system.free_symbols - {self.ivar[0],Symbol('t')})
-            
-            print(self.params)
-            print(self.params_values)
-            
-            params_values = tuple(Matrix(self.params).subs(self.params_values))
-            
-        if isinstance(params_values,dict):
-            self.params_values = params_values
-            self.params = list(self.params_values.keys())
-            
-            self.params = self.odes_system.free_symbols - {self.ivar,Symbol('t')}
-            
-            
-            self.params=list(self.params)
-            
-            
-#             print('check')
-#             display(Matrix(self.params))
-#             print(*self.params)
-#             print(*map(type,(self.params)))
-#             display(params_values)
-#             display(Tuple(*self.params).subs(params_values))
-            
-#             print([ par in  params_values  for par in self.params ])
-            
-#             print(*params_values.keys())
-            
-            params_values = tuple(Matrix(self.params).subs(params_values))
-            
+        if isinstance(params_values,(dict,Dict)):
+            # values are ordered as the arguments of the compiled right-hand side
+            params_values = tuple(plan.params_vector(self.params_values, params_values))
+        else:
+            params_values = tuple(np.asarray(params_values, dtype=float))
 
         case_odes = self.__numerical_odes
         
-        print('params case')
-        display(self.params)
-        display(params_values)
+        self._instrument('solve_ivp_input', params=plan.params, params_values=params_values, ic_list=ic_list)
 
         return {
             'fun': case_odes,
@@ -313,6 +943,18 @@ class OdeComputationalCase:
         self._default_ics = ics
        
         return self
+
+    def with_params_values(self, params_values=None):
+        '''
+        Returns the copy of the case with the given parameter values bound. The copy shares the symbolic system and reuses the compiled right-hand side, so no new compilation is required.
+        '''
+        new_case = copy.copy(self)
+
+        if params_values is None:
+            params_values = {}
+        new_case.params_values = {**self.params_values, **params_values}
+
+        return new_case
         
     def compute_solution(self,
                          t_span=None,
@@ -320,10 +962,24 @@ class OdeComputationalCase:
                          t_eval=None,
                          params_values=None,
                          method='RK45',
-                         derivatives=False,atol=1e-6,rtol=1e-3,max_step=0.1):
+                         derivatives=True,atol=1e-6,rtol=1e-3,max_step=0.1,jac_sparse=False):
         '''
         Returns the result of the computations of solve_ivp integrator from scipy.integrate module.
+
+        The derivatives of states are appended as additional columns. For derivatives=True they are computed by the evaluation of right-hand sides on the whole solution array (exact up to the accuracy of the states), derivatives='gradient' uses the finite differences of samples (np.gradient) and derivatives=False skips these columns.
+
+        For the implicit methods (Radau, BDF, LSODA) the analytical Jacobian of the system is supplied to the integrator (as scipy.sparse matrix if jac_sparse is True). The method='auto' selects the integrator on the basis of the stiffness estimate (see select_method).
+
+        If params_values is given as an (N_cases x N_params) array or as a dictionary of parameter spans, all the cases are integrated at once (see compute_batch_solution).
         '''
+        if self._is_batch_input(params_values):
+            return self.compute_batch_solution(t_span=t_span,
+                                               ic_list=ic_list,
+                                               params_values=params_values,
+                                               method=method,
+                                               derivatives=derivatives,
+                                               atol=atol,rtol=rtol,max_step=max_step)
+
         if ic_list is None:
             ic_list=self._default_ics
 
@@ -336,41 +992,451 @@ class OdeComputationalCase:
 
         velocities = self.dvars
         if len(t_span)>1:
-            solution = solver.solve_ivp(
-                **self.solve_ivp_input(t_span=t_span,
+            ivp_input = self.solve_ivp_input(t_span=t_span,
                                     ic_list=ic_list,
                                     t_eval=t_eval,
                                     params_values=params_values,
-                                    method=method),atol=atol,rtol=rtol,max_step=max_step)
+                                    method=method)
 
-            solution_tdf = TimeDataFrame(
-                data={key: solution.y[no, :]
-                    for no, key in enumerate(self.dvars)}, index=t_span)
+            if ivp_input['method'] == 'auto':
+                ivp_input['method'] = self.select_method(ivp_input)
 
+            if ivp_input['method'] in self._implicit_methods:
+                ivp_input['jac'] = self.form_numerical_jacobian(sparse=jac_sparse and ivp_input['method'] != 'LSODA')
 
+            if self._backend == 'numba' and ivp_input['method'] in self._jit_methods:
+                solution_y = self._jit_solution(ivp_input,atol=atol,rtol=rtol,max_step=max_step)
+            else:
+                solution_y = solver.solve_ivp(**ivp_input,atol=atol,rtol=rtol,max_step=max_step).y
 
-            
-            for vel in velocities:
-                solution_tdf[vel].to_numpy()
-                gradient = np.gradient(solution_tdf[vel].to_numpy(),t_span)
-                solution_tdf[vel.diff(self.ivar)] = gradient
-                
+            solution_tdf = self._solution_frame(solution_y, ivp_input['t_eval'], derivatives=derivatives, params_array=ivp_input['args'])
         
         else:
             solution_tdf = TimeDataFrame(
                 data={key: ic_list[no]
                     for no, key in enumerate(self.dvars)}, index=t_span)
-            for vel in velocities:
+            if derivatives:
+                for vel in velocities:
 
-                solution_tdf[vel.diff(self.ivar)] = 0.0
+                    solution_tdf[vel.diff(self.ivar)] = 0.0
           
         t_e = time.time()
         t_d = t_e-t_0
-        print('_'*100,t_d)
         comp_time=t_d
+        self._instrument('compute_solution', comp_time=comp_time, method=method)
+
+        solution_tdf._set_comp_time(comp_time)
+        solution_tdf.index.name = self.ivar
+        return solution_tdf
+
+    def _rhs_derivatives(self, t_span, states_array, params_array):
+        '''
+        Returns the derivatives of states computed with a single vectorized call of right-hand sides for all the samples. The states_array has the shape (len(dvars), N_samples) and params_array stores the values ordered as params of the compiled right-hand side (one column per sample or a 1D array common for all samples).
+        '''
+        rhs_params = self.solve_plan.params
+
+        if self.__batch_odes is None or self._batch_params != rhs_params:
+            self.form_batch_rhs(rhs_params)
+
+        params_array = np.asarray(params_array, dtype=float)
+        if params_array.ndim == 1:
+            params_array = params_array[:, np.newaxis]
+
+        return self.__batch_odes(np.asarray(t_span, dtype=float), np.asarray(states_array, dtype=float), params_array)
+
+    def _solution_frame(self, solution_y, t_span, derivatives=True, params_array=None):
+        '''
+        Returns TimeDataFrame of the integrated states (array with shape (len(dvars), len(t_span))) supplemented with their derivatives (see compute_solution for the meaning of derivatives flag).
+        '''
+        t_span = np.asarray(t_span)
+
+        solution_tdf = TimeDataFrame(
+            data={key: solution_y[no, :]
+                for no, key in enumerate(self.dvars)}, index=t_span)
+
+        if not derivatives:
+            return solution_tdf
+
+        if derivatives == 'gradient':
+            derivatives_y = np.gradient(solution_y, t_span, axis=1)
+        else:
+            if params_array is None:
+                params_array = self.solve_plan.params_vector(self.params_values)
+            derivatives_y = self._rhs_derivatives(t_span, solution_y, params_array)
+
+        for no, vel in enumerate(self.dvars):
+            solution_tdf[vel.diff(self.ivar)] = derivatives_y[no]
+
+        return solution_tdf
+
+    def _event_function(self, event, terminal=False, direction=0, params_values=None):
+        '''
+        Returns the event function of solve_ivp in the form f(t, y, *params). The event can be given as the symbolic expression of ivar, dvars and parameters (the event occurs when it crosses zero) or as the ready-to-use function. The parameters which are not the arguments of right-hand side are substituted with params_values.
+        '''
+        if not hasattr(event, 'free_symbols'):
+            return event
+
+        rhs_params = self.solve_plan.params
+
+        values_dict = dict(self.params_values)
+        if isinstance(params_values, (dict, Dict)):
+            values_dict.update(params_values)
+        event = event.subs({par: value for par, value in values_dict.items() if par not in rhs_params})
+        event_key = (self.fingerprint,tuple(self.dvars),tuple(rhs_params),'event',event)
+
+        if event_key not in self.__class__._cached_odes:
+            subs_dict = {var: Symbol('temp_sym_' + str(i)) for i, var in enumerate(self.dvars)}
+            args_list = [self.ivar] + list(subs_dict.values()) + rhs_params
+
+            self.__class__._cached_odes[event_key] = lambdify(args_list,
+                                                              event.subs(subs_dict, simultaneous=True).doit().n(),
+                                                              [{'sin':np.sin,'cos':np.cos,'atan':np.arctan},'numpy'])
+
+        event_expr = self.__class__._cached_odes[event_key]
+
+        def event_function(t, y, *args):
+            return event_expr(t, *y, *args)
+
+        event_function.terminal = terminal
+        event_function.direction = direction
+
+        return event_function
+
+    def compute_dense_solution(self,
+                               t_span=None,
+                               ic_list=None,
+                               params_values=None,
+                               method='RK45',
+                               events=None,
+                               terminal=False,
+                               direction=0,
+                               atol=1e-6,rtol=1e-3,max_step=np.inf,jac_sparse=False):
+        '''
+        Integrates the system with the dense output of solve_ivp and returns DenseSolution (continuous interpolant and records of events) instead of TimeDataFrame. The samples are not stored, so only the first and the last element of t_span are relevant.
+
+        Arguments
+        =========
+        events=None (optional): list
+            Symbolic expressions of ivar, dvars and parameters or functions f(t, y, *params). The event is recorded when the expression crosses zero.
+
+        terminal=False (optional): bool
+            If True the integration is stopped on the first occurrence of any event given as expression.
+
+        direction=0 (optional): float
+            Direction of the zero crossing (positive, negative or both for 0) for the events given as expressions.
+        '''
+        if not self._evaluated:
+            self.form_numerical_rhs()
+            self._evaluated=True
+
+        t_0 = time.time()
+
+        if events is None:
+            events = []
+        elif not isinstance(events, (list, tuple)):
+            events = [events]
+
+        ivp_input = self.solve_ivp_input(t_span=t_span,
+                                         ic_list=ic_list,
+                                         params_values=params_values,
+                                         method=method)
+        ivp_input.pop('t_eval')
+
+        if ivp_input['method'] == 'auto':
+            ivp_input['method'] = self.select_method(ivp_input)
+
+        if ivp_input['method'] in self._implicit_methods:
+            ivp_input['jac'] = self.form_numerical_jacobian(sparse=jac_sparse and ivp_input['method'] != 'LSODA')
+
+        ivp_solution = solver.solve_ivp(**ivp_input,
+                                        dense_output=True,
+                                        events=[self._event_function(event, terminal, direction, params_values) for event in events] or None,
+                                        atol=atol,rtol=rtol,max_step=max_step)
+
+        comp_time = time.time() - t_0
+        self._instrument('compute_dense_solution', comp_time=comp_time, method=ivp_input['method'])
+
+        return DenseSolution(self,
+                             ivp_solution.sol,
+                             ivp_input['args'],
+                             events=events,
+                             t_events=ivp_solution.t_events,
+                             y_events=ivp_solution.y_events,
+                             status=ivp_solution.status,
+                             message=ivp_solution.message,
+                             comp_time=comp_time)
+
+    def _rhs_source(self):
+        '''
+        Returns the generated source of right-hand sides with the name of the function or None if the backend does not generate the python source (fortran).
+        '''
+        if not self._evaluated:
+            self.form_numerical_rhs()
+            self._evaluated=True
+
+        source_key = (self.fingerprint,tuple(self.dvars),tuple(self._rhs_params),self._backend,'source')
+
+        if source_key not in self.__class__._cached_odes:
+
+            if self._backend == 'numba':
+                from . import jit
+                source = jit.rhs_source(self.odes_system, self.ivar, self.dvars, self._rhs_params), '_numba_rhs'
+            elif self._backend in ('numpy', 'cse', None):
+                odes_key = (self.fingerprint,tuple(self.dvars),tuple(self._rhs_params),self._backend)
+                source = inspect.getsource(self.__class__._cached_odes[odes_key]), '_lambdifygenerated'
+            else:
+                source = None
+
+            self.__class__._cached_odes[source_key] = source
+
+        return self.__class__._cached_odes[source_key]
+
+    def _jacobian_source(self):
+        '''
+        Returns the generated source of the dense Jacobian of right-hand sides (see form_numerical_jacobian) with the name of the function.
+        '''
+        self.form_numerical_jacobian()
+
+        jac_key = (self.fingerprint,tuple(self.dvars),tuple(self._rhs_params),self._backend,'jacobian',False)
+
+        return inspect.getsource(self.__class__._cached_odes[jac_key]), '_lambdifygenerated'
+
+    def portable_input(self,
+                       t_span=None,
+                       ic_list=None,
+                       params_values=None,
+                       method='RK45',
+                       atol=1e-6,rtol=1e-3,max_step=0.1):
+        '''
+        Returns the picklable description of the computations (generated source of right-hand sides and the numerical input of the integrator) that can be sent to the worker process instead of the symbolic system. For the implicit methods the source of the analytical Jacobian is included as well. The case is integrated with solve_portable_case. Returns None if the backend does not generate the source.
+        '''
+        rhs_source = self._rhs_source()
+        if rhs_source is None:
+            return None
+
+        if ic_list is None:
+            ic_list=self._default_ics
+
+        ivp_input = self.solve_ivp_input(t_span=t_span,
+                                         ic_list=ic_list,
+                                         params_values=params_values,
+                                         method=method)
+        ivp_input.pop('fun')
+
+        if ivp_input['method'] == 'auto':
+            ivp_input['method'] = self.select_method(ivp_input)
+
+        ivp_input['y0'] = np.asarray(ivp_input['y0'], dtype=float)
+        ivp_input['t_eval'] = np.asarray(ivp_input['t_eval'], dtype=float)
 
+        source, func_name = rhs_source
+
+        if ivp_input['method'] in self._implicit_methods:
+            jac_source = self._jacobian_source()
+        else:
+            jac_source = None
+
+        return {'source': source,
+                'func_name': func_name,
+                'jac_source': jac_source,
+                'backend': self._backend,
+                'ivp_input': ivp_input,
+                'options': {'atol': atol, 'rtol': rtol, 'max_step': max_step}}
+
+    def solution_from_portable(self, portable_output, t_span, derivatives=True):
+        '''
+        Returns TimeDataFrame from the output of solve_portable_case.
+        '''
+        solution_y, comp_time = portable_output
+
+        solution_tdf = self._solution_frame(solution_y, np.asarray(t_span), derivatives=derivatives)
         solution_tdf._set_comp_time(comp_time)
         solution_tdf.index.name = self.ivar
+
+        return solution_tdf
+
+    @staticmethod
+    def _is_batch_input(params_values):
+
+        if isinstance(params_values, (dict, Dict)):
+            return any(np.ndim(value) > 0 for value in params_values.values())
+        elif params_values is not None and not isinstance(params_values, tuple):
+            return np.ndim(params_values) == 2
+        else:
+            return False
+
+    def _batch_params_array(self, params_values):
+        '''
+        Returns the list of parameters and the array of their values with shape (len(params), N_cases) for the batch computations. The parameters are ordered as params of the case (the order of arguments of the compiled right-hand side) for both dictionary and array input.
+        '''
+        batch_params = list(self.params)
+
+        if isinstance(params_values, (dict, Dict)):
+            values_dict = {**self.params_values, **params_values}
+
+            missing_params = [par for par in batch_params if par not in values_dict]
+            if missing_params:
+                raise KeyError(f'Values of parameters {missing_params} are not given.')
+
+            cases_no = max([np.size(values_dict[par]) for par in batch_params] + [1])
+            params_array = np.array([
+                np.broadcast_to(np.asarray(values_dict[par], dtype=float), (cases_no,))
+                for par in batch_params
+            ]).reshape(len(batch_params), cases_no)
+
+        else:
+            params_array = np.asarray(params_values, dtype=float).T
+
+            if params_array.shape[0] != len(batch_params):
+                raise IndexError('Number of parameters is not correct.')
+
+        return batch_params, params_array
+
+    def _batch_ics_array(self, ic_list, cases_no):
+        '''
+        Returns the array of initial conditions with shape (len(dvars), N_cases).
+        '''
+        if ic_list is None:
+            ic_list = self._default_ics
+
+        if ic_list is None:
+            ic_list = [0.0]*len(self.dvars)
+        elif isinstance(ic_list, dict):
+            ic_list = [ic_list.get(coord, 0.0) for coord in self.dvars]
+
+        ics_array = np.asarray(ic_list, dtype=float)
+
+        if ics_array.ndim == 1:
+            ics_array = np.repeat(ics_array[:, np.newaxis], cases_no, axis=1)
+        else:
+            ics_array = ics_array.T
+
+        if ics_array.shape != (len(self.dvars), cases_no):
+            raise IndexError('Number of initial conditions is not correct.')
+
+        return ics_array
+
+    @staticmethod
+    def _rk4_batch_integration(rhs, t_span, Y0, P, max_step=None):
+        '''
+        Integrates the stacked states with the classical fixed-step Runge-Kutta method. The samples are returned for every point of t_span, the interval between them is divided into substeps not longer than max_step.
+        '''
+        Y = np.array(Y0, dtype=float)
+        solution = np.empty((len(t_span), *Y.shape))
+        solution[0] = Y
+
+        for no, (t_start, t_end) in enumerate(zip(t_span[:-1], t_span[1:])):
+
+            steps_no = 1
+            if max_step is not None:
+                steps_no = max(int(np.ceil((t_end - t_start) / max_step)), 1)
+            h = (t_end - t_start) / steps_no
+
+            for step in range(steps_no):
+                t = t_start + step * h
+
+                k1 = rhs(t, Y, P)
+                k2 = rhs(t + h / 2, Y + h / 2 * k1, P)
+                k3 = rhs(t + h / 2, Y + h / 2 * k2, P)
+                k4 = rhs(t + h, Y + h * k3, P)
+
+                Y = Y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+            solution[no + 1] = Y
+
+        return solution
+
+    def compute_batch_solution(self,
+                               t_span=None,
+                               ic_list=None,
+                               params_values=None,
+                               method='RK4',
+                               derivatives=True,
+                               atol=1e-6,rtol=1e-3,max_step=0.1):
+        '''
+        Returns the solutions for the whole batch of parameter cases computed at once.
+
+        Arguments
+        =========
+        params_values: array or dict
+            (N_cases x N_params) array with columns ordered as params of the case or dictionary of parameter values where the values can be given as spans of length N_cases. In both cases the values are passed to the right-hand side in the order of params.
+
+        ic_list=None (optional): list or array
+            Initial conditions common for all cases or (N_cases x len(dvars)) array.
+
+        method='RK4' (optional): str
+            'RK4' runs the fixed-step integration of stacked states, other names are passed to solve_ivp which integrates all the cases as a single system with common adaptive step.
+
+        derivatives=True (optional): bool or str
+            The meaning is the same as for compute_solution, the right-hand sides are evaluated for all the cases and samples at once.
+
+        The result is TimeDataFrame with columns indexed by the number of case and the coordinate.
+        '''
+        t_0 = time.time()
+
+        if t_span is None:
+            t_span = self.t_span
+        t_span = np.asarray(t_span, dtype=float)
+
+        batch_params, params_array = self._batch_params_array(params_values)
+        cases_no = params_array.shape[1]
+        ics_array = self._batch_ics_array(ic_list, cases_no)
+
+        if self.__batch_odes is None or self._batch_params != batch_params:
+            self.form_batch_rhs(batch_params)
+        batch_rhs = self.__batch_odes
+
+        if method == 'RK4':
+            solution = self._rk4_batch_integration(batch_rhs, t_span, ics_array, params_array, max_step=max_step)
+        elif len(t_span) > 1:
+            states_shape = ics_array.shape
+            flat_rhs = lambda t, y: batch_rhs(t, y.reshape(states_shape), params_array).ravel()
+
+            ivp_solution = solver.solve_ivp(flat_rhs,
+                                            [t_span[0], t_span[-1]],
+                                            ics_array.ravel(),
+                                            t_eval=t_span,
+                                            method=method,
+                                            atol=atol,rtol=rtol,max_step=max_step)
+
+            if not ivp_solution.success:
+                raise RuntimeError(f'Integration of the batch of cases failed: {ivp_solution.message}')
+
+            solution = np.moveaxis(ivp_solution.y.reshape(*states_shape, len(t_span)), -1, 0)
+        else:
+            solution = ics_array[np.newaxis]
+
+        coords = list(self.dvars)
+
+        if derivatives:
+            if derivatives == 'gradient':
+                gradient = np.gradient(solution, t_span, axis=0) if len(t_span) > 1 else np.zeros_like(solution)
+            else:
+                # all samples of all cases are stacked along the second axis and evaluated with a single call
+                states_no = len(self.dvars)
+                gradient = batch_rhs(np.repeat(t_span, cases_no),
+                                     solution.transpose(1, 0, 2).reshape(states_no, -1),
+                                     np.tile(params_array, len(t_span)))
+                gradient = gradient.reshape(states_no, len(t_span), cases_no).transpose(1, 0, 2)
+
+            # the derivatives being the states (first order form) overwrite their columns as in _solution_frame
+            derivatives_coords = [vel.diff(self.ivar) for vel in self.dvars]
+            for no, coord in enumerate(derivatives_coords):
+                if coord in coords:
+                    solution[:, coords.index(coord)] = gradient[:, no]
+
+            new_columns = [no for no, coord in enumerate(derivatives_coords) if coord not in coords]
+            solution = np.concatenate([solution, gradient[:, new_columns]], axis=1)
+            coords += [derivatives_coords[no] for no in new_columns]
+
+        data = solution.transpose(0, 2, 1).reshape(len(t_span), -1)
+
+        solution_tdf = TimeDataFrame(data=data,
+                                     index=t_span,
+                                     columns=pd.MultiIndex.from_product([range(cases_no), coords]))
+
+        solution_tdf._set_comp_time(time.time() - t_0)
+        solution_tdf.index.name = self.ivar
         return solution_tdf
 
     def numerized(self,*args,**kwargs):
@@ -395,3 +1461,67 @@ class OdeComputationalCase:
                     columns=num_cases,
                     )
 
+
+_portable_functions = {}
+
+
+def solve_portable_case(portable_input):
+    '''
+    Integrates the case described by OdeComputationalCase.portable_input. It is executed in the worker processes, so only the generated source is compiled there and the compiled functions are reused between the cases of the same structure. Returns the array of states and the computing time.
+    '''
+    t_0 = time.time()
+
+    source = portable_input['source']
+    backend = portable_input['backend']
+    ivp_input = dict(portable_input['ivp_input'])
+    options = portable_input['options']
+
+    func_key = (source, backend)
+    if func_key not in _portable_functions:
+        if backend == 'numba':
+            from . import jit
+            _portable_functions[func_key] = jit.jit_rhs(source, portable_input['func_name'])
+        else:
+            namespace = OdeComputationalCase._numpy_namespace()
+            exec(compile(source, '<portable_rhs>', 'exec'), namespace)
+            _portable_functions[func_key] = namespace[portable_input['func_name']]
+
+    odes_rhs = _portable_functions[func_key]
+
+    jac_source = portable_input.get('jac_source')
+    if jac_source is not None:
+        jac_key = (jac_source, 'jacobian')
+        if jac_key not in _portable_functions:
+            namespace = OdeComputationalCase._numpy_namespace()
+            exec(compile(jac_source[0], '<portable_jacobian>', 'exec'), namespace)
+            _portable_functions[jac_key] = namespace[jac_source[1]]
+
+        jac_func = _portable_functions[jac_key]
+        shape = (len(ivp_input['y0']), len(ivp_input['y0']))
+        ivp_input['jac'] = lambda t, y, *args: np.asarray(jac_func(t, *y, *args), dtype=float).reshape(shape)
+
+    if backend == 'numba' and ivp_input['method'] in OdeComputationalCase._jit_methods:
+        from . import jit
+
+        params_array = np.asarray(ivp_input['args'], dtype=float)
+        if ivp_input['method'] == 'RK4':
+            solution_y = jit.rk4_integration(odes_rhs, ivp_input['t_eval'], ivp_input['y0'], params_array, float(options['max_step']))
+        else:
+            solution_y, status, t_fail = jit.dopri45_integration(odes_rhs, ivp_input['t_eval'], ivp_input['y0'], params_array, options['atol'], options['rtol'], float(options['max_step']))
+            if status != 0:
+                raise RuntimeError(f'Integration failed at t={t_fail}: required step size is less than spacing between numbers.')
+
+    else:
+        if backend == 'numba':
+            fun = lambda t, y, *args: odes_rhs(t, np.asarray(y, dtype=float), np.asarray(args, dtype=float))
+        else:
+            fun = lambda t, y, *args: np.asarray(odes_rhs(t, *y, *args)).reshape(y.shape)
+
+        ivp_solution = solver.solve_ivp(fun, **ivp_input, **options)
+        if not ivp_solution.success:
+            raise RuntimeError(f'Integration failed: {ivp_solution.message}')
+
+        solution_y = ivp_solution.y
+
+    return solution_y, time.time() - t_0
+
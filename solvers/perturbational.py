@@ -1,6 +1,7 @@
 from sympy import (Symbol, symbols, Matrix, sin, cos, diff, sqrt, S, diag, Eq,
                    Function, lambdify, factorial, solve, Dict, Number, N, Add,
-                   Mul, expand,zoo,exp,Dummy, det)
+                   Mul, expand,zoo,exp,Dummy, det, ImmutableMatrix, Pow, binomial)
+from sympy.core.function import AppliedUndef
 
 from sympy.physics.mechanics import dynamicsymbols
 from sympy.physics.vector.printing import vpprint, vlatex
@@ -18,13 +19,15 @@ import sympy.physics.mechanics as me
 
 from sympy.simplify.fu import TR8, TR10, TR7, TR3, TR0
 
-from .linear import LinearODESolution, FirstOrderODE, AnalyticalSolution, FirstOrderLinearODESystem, FirstOrderODESystem, ODESystem, ODESolution,FirstOrderLinearODESystemWithHarmonics
+from .linear import LinearODESolution, FirstOrderODE, AnalyticalSolution, FirstOrderLinearODESystem, FirstOrderODESystem, ODESystem, ODESolution,FirstOrderLinearODESystemWithHarmonics, SymbolicSolutionCache
+from .numerical import structural_fingerprint
 from ..utilities.components.ode import en as ode_comp
 
 #from timer import timer
 from time import time
 from collections.abc import Iterable
 from functools import cached_property,lru_cache
+from concurrent.futures import ProcessPoolExecutor
 
 from .tools import CommonFactorDetector, ODE_COMPONENTS_LIST, CodeFlowLogger
 
@@ -34,6 +37,120 @@ def const_no_gen():
         yield num
         num += 1
 
+
+def _harmonics_expand(obj):
+    '''
+    Expands the products and powers of the harmonic functions into the sums of harmonics. Every component of the sum is processed separately.
+    '''
+    oper_expr = lambda obj: (TR10(
+        TR8(TR10(TR0(obj.expand())).expand())).expand().doit().expand())
+
+    if isinstance(obj, Add):
+        return sum(oper_expr(elem) for elem in obj.args)
+    else:
+        return oper_expr(obj)
+
+
+def _approximation_entry(expr, sol_subs_dict):
+    '''
+    Returns the entry of the approximated equation with the zeroth order solution substituted (the task of the worker processes of MultiTimeScaleSolution).
+    '''
+    return _harmonics_expand(_harmonics_expand(expr).subs(sol_subs_dict))
+
+
+def _secular_form(lhs, rhs, dvars, ivar, ode_order, parameters):
+    '''
+    Returns the equations, dependent variables and independent variable of the secular terms of the approximation given with its components (the task of the worker processes of MultiTimeScaleSolution).
+    '''
+    approx = NthOrderODEsApproximation._constructor(Matrix(lhs), Matrix(dvars), Matrix(rhs), ivar, ode_order=ode_order, parameters=list(parameters))
+    sec_odes = approx.secular_terms
+
+    return ImmutableMatrix(sec_odes.lhs), ImmutableMatrix(sec_odes.dvars), sec_odes.ivar
+
+def _series_mul(first, second, max_order):
+    '''
+    Returns the product of the truncated series given with the lists of coefficients (the terms of the order higher than max_order are not formed).
+    '''
+    return [sum((first[no] * second[order - no] for no in range(order + 1) if first[no] != 0 and second[order - no] != 0), S.Zero)
+            for order in range(max_order + 1)]
+
+
+def _series_pow(coeffs, exponent, max_order):
+    '''
+    Returns the truncated series raised to the non-negative integer power (the exponentiation by squaring).
+    '''
+    result = [S.One] + [S.Zero] * max_order
+
+    while exponent > 0:
+        if exponent % 2:
+            result = _series_mul(result, coeffs, max_order)
+        exponent //= 2
+        if exponent > 0:
+            coeffs = _series_mul(coeffs, coeffs, max_order)
+
+    return result
+
+
+def _series_compose(derivatives, coeffs, max_order):
+    '''
+    Returns the truncated series of the function given with the list of its Taylor coefficients at coeffs[0] (f^(k)(c_0)/k!) composed with the series coeffs.
+    '''
+    rest = [S.Zero] + list(coeffs[1:])
+    rest_power = [S.One] + [S.Zero] * max_order
+
+    result = [S.Zero] * (max_order + 1)
+    for order in range(max_order + 1):
+        result = [res + derivatives[order] * elem for res, elem in zip(result, rest_power)]
+        rest_power = _series_mul(rest_power, rest, max_order)
+
+    return result
+
+
+def eps_series_coefficients(expr, eps, max_order):
+    '''
+    Returns the list of coefficients of the expansion of expr in powers of eps (up to max_order). The expression is not expanded as a whole - the sums and products are computed on the lists of coefficients and the terms of the order higher than max_order are dropped as they are formed. The powers and the functions of one argument are expanded with the Taylor series around the zeroth coefficient. The derivatives of the other terms with respect to eps are used as a fallback.
+    '''
+    if not expr.has(eps):
+        return [expr] + [S.Zero] * max_order
+
+    if expr == eps:
+        return [S.Zero, S.One] + [S.Zero] * (max_order - 1) if max_order > 0 else [S.Zero]
+
+    if isinstance(expr, Add):
+        terms = [eps_series_coefficients(arg, eps, max_order) for arg in expr.args]
+        return [Add(*coeffs) for coeffs in zip(*terms)]
+
+    if isinstance(expr, Mul):
+        const = Mul(*[arg for arg in expr.args if not arg.has(eps)])
+        result = [const] + [S.Zero] * max_order
+        for arg in expr.args:
+            if arg.has(eps):
+                result = _series_mul(result, eps_series_coefficients(arg, eps, max_order), max_order)
+        return result
+
+    if isinstance(expr, Pow) and not expr.exp.has(eps):
+        base = eps_series_coefficients(expr.base, eps, max_order)
+
+        if expr.exp.is_Integer and expr.exp >= 0:
+            return _series_pow(base, int(expr.exp), max_order)
+        if base[0] != 0:
+            derivatives = [binomial(expr.exp, order) * base[0]**(expr.exp - order) for order in range(max_order + 1)]
+            return _series_compose(derivatives, base, max_order)
+
+    elif isinstance(expr, Function) and not isinstance(expr, AppliedUndef) and len(expr.args) == 1:
+        arg = eps_series_coefficients(expr.args[0], eps, max_order)
+        var = Dummy('x')
+
+        fun, derivatives = expr.func(var), []
+        for order in range(max_order + 1):
+            derivatives += [fun.subs(var, arg[0]) / factorial(order)]
+            fun = fun.diff(var)
+
+        return _series_compose(derivatives, arg, max_order)
+
+    return [(expr.diff(eps, order) / factorial(order)).subs(eps, 0) for order in range(max_order + 1)]
+
+
 class SimplifiedExpr:
     
     """
@@ -327,6 +444,77 @@ class NthOrderODEsApproximation(ODESystem):
 #         return {order:}
 
 
+class PerturbationOrderCache(SymbolicSolutionCache):
+    '''
+    Storage of the results of MultiTimeScaleSolution derived for the consecutive orders of the approximation - the approximated equation with the zeroth order solution substituted, its secular terms and the solution. The functions of all (or all slow) time scales are stored with the marker argument, so the entries do not depend on the number of time scales and the solution of the higher order reuses the orders derived before.
+
+    The persistence is disabled until the directory is set:
+
+        >>>PerturbationOrderCache.set_directory('./.dynpy_cache/perturbation')
+    '''
+
+    _entries = {}
+    _directory = None
+    _version = 1
+
+    _all_scales = Symbol('_all_scales')
+    _slow_scales = Symbol('_slow_scales')
+
+    @classmethod
+    def set_directory(cls, path='./.dynpy_cache/perturbation'):
+        cls._directory = path
+        return cls
+
+    @classmethod
+    def key(cls, system, order):
+        '''
+        Returns the hash of the structural fingerprint of the system, its small parameter and frequency for the given order of the approximation.
+        '''
+        return structural_fingerprint(system.fingerprint, system.eps, system.omega, order, cls._version)
+
+    @classmethod
+    def _scales_args(cls, t_list):
+
+        # the slow scales are ordered as the arguments of the integration constants
+        return {tuple(t_list): cls._all_scales, tuple({*t_list} - {t_list[0]}): cls._slow_scales}
+
+    @classmethod
+    def canonical(cls, exprs, t_list):
+        '''
+        Returns the tuple of expressions with the arguments of the functions of time scales replaced with the markers.
+        '''
+        scales_args = cls._scales_args(t_list)
+
+        def canonical_expr(expr):
+            funcs = [fun for fun in expr.atoms(AppliedUndef) if fun.args in scales_args]
+            return expr.xreplace({fun: fun.func(scales_args[fun.args]) for fun in funcs})
+
+        return tuple(canonical_expr(expr) for expr in exprs)
+
+    @classmethod
+    def restored(cls, exprs, t_list):
+        '''
+        Returns the tuple of expressions with the markers replaced with the time scales from t_list.
+        '''
+        markers_args = {marker: args for args, marker in cls._scales_args(t_list).items()}
+
+        def restored_expr(expr):
+            funcs = [fun for fun in expr.atoms(AppliedUndef) if fun.args[0] in markers_args]
+            return expr.xreplace({fun: fun.func(*markers_args[fun.args[0]]) for fun in funcs})
+
+        return tuple(restored_expr(expr) for expr in exprs)
+
+    @classmethod
+    def _dumps(cls, *entry):
+        return cls._repr(tuple(entry))
+
+    @classmethod
+    def _loads(cls, source):
+        return tuple(cls._parse(source))
+
+    @classmethod
+    def _copy_entry(cls, entry):
+        return tuple(entry)
 
 
 class MultiTimeScaleSolution(ODESystem):
@@ -337,6 +525,7 @@ class MultiTimeScaleSolution(ODESystem):
     _saved_numerized = {}
     _order = 2
     _scales_no = None
+    _processes = None
 
     def __new__(cls,
                 odes_system,
@@ -465,6 +654,22 @@ class MultiTimeScaleSolution(ODESystem):
 
         self._order = order
 
+    @classmethod
+    def set_processes(cls, processes=None):
+        '''
+        Sets the number of worker processes rewriting the approximated equations and extracting their secular terms (None - the computations are sequential, -1 - all the cores are used).
+        '''
+        cls._processes = processes
+        return cls
+
+    def _pool_map(self, func, *iterables):
+
+        if self._processes in (None, 1):
+            return list(map(func, *iterables))
+
+        with ProcessPoolExecutor(max_workers=None if self._processes == -1 else self._processes) as executor:
+            return list(executor.map(func, *iterables))
+
     @property
     def _report_components(self):
         
@@ -782,17 +987,17 @@ class MultiTimeScaleSolution(ODESystem):
                                 odes_system=None):
 
         eoms_approximated = self.eoms_approximation(
-            order=max_order, odes_system=odes_system).expand()
+            order=max_order, odes_system=odes_system)
 
-        order_get = lambda obj, order: (obj.diff(self.eps, order) / factorial(
-            order)).subs(self.eps, 0).doit()
+        # the coefficients of eps powers are read from the series truncated at max_order
+        eoms_coeffs = [eps_series_coefficients(row, self.eps, max_order) for row in eoms_approximated]
 
         #NthOrderODEsApproximation
         
         
         approx_list=[
             NthOrderODEsApproximation(
-                eoms_approximated.applyfunc(lambda obj: order_get(obj, order)),
+                Matrix([coeffs[order].expand().doit() for coeffs in eoms_coeffs]),
                 dvars=self.approximation_function(order),
                 ivar=self.t_list[0],
                 ode_order=2,
@@ -820,110 +1025,92 @@ class MultiTimeScaleSolution(ODESystem):
         # print('spot_const')
         # display(sol._spot_constant())
         
-        #### !!!! 
-        sol_list = [sol]
-        
-        
-        sol_subs_list = [sol.applyfunc(lambda row: SimplifiedExpr(row,ivar=self._t_list[0],parameters=self._t_list[1:]).full_expr).doit() for sol in sol_list]
-        sol_subs_dict  = {  dvar:eqn     for  sol   in sol_subs_list  for dvar, eqn in sol.as_explicit_dict().items()}
+        sol_subs_dict  = sol.as_explicit_dict()
 
+        # the equations of the orders derived before are taken from PerturbationOrderCache, the rest is rewritten (in parallel if the processes are set)
+        cached = {no: PerturbationOrderCache.load(PerturbationOrderCache.key(self, no)) for no in range(1, len(approx_eoms_list))}
         
-        # print('_gen_sol')
-        # display(sol_list)
-        # display(sol_subs_dict)
-        
-        # display(approx_eoms_list[0]._const_list)
-        approx_with_const = [approx_eoms_list[0]]
+        exprs_to_rewrite = [expr for no, entry in cached.items() if entry is None for expr in (*approx_eoms_list[no].lhs, *approx_eoms_list[no].rhs)]
+        rewritten = iter(self._pool_map(_approximation_entry, exprs_to_rewrite, itools.repeat(sol_subs_dict)))
 
-        for order, approx in enumerate(approx_eoms_list[1:]):
+        approx_with_const = [approx_eoms_list[0]]
 
-            approx._parameters = self._t_list[1:]
-            #approx = approx.as_first_ode_linear_system()
+        for no, approx in enumerate(approx_eoms_list[1:], start=1):
 
-            eqns_map = lambda obj: (TR10(TR8(TR10(obj.expand()).expand())).
-                                    expand().doit().expand())
+            if cached[no] is None:
+                lhs = [next(rewritten) for row in approx.lhs]
+                rhs = [next(rewritten) for row in approx.rhs]
+            else:
+                lhs, rhs = PerturbationOrderCache.restored(cached[no][:2], self.t_list)
 
-            def eqns_map(obj):
+            approx_subs = NthOrderODEsApproximation._constructor(Matrix(lhs), approx.dvars, Matrix(rhs), approx.ivar, ode_order=approx.ode_order, parameters=self.t_list[1:])
+            
+            approx_with_const += [approx_subs.set_simp_deps(approx._simp_dict, approx._callback_dict, inplace=True)]
+            
+        return approx_with_const
 
-                oper_expr = lambda obj: (TR10(
-                    TR8(TR10(TR0(obj.expand())).expand())).expand().doit().expand())
 
-                #oper_expr = lambda obj: TR8(obj).expand()
+    def _general_sol(self, order=1):
 
-                #oper_expr = lambda obj: obj.doit().expand()
+        self.secular_eq = {}
 
-                if isinstance(obj, Add):
-                    elems = obj.args
-                    return sum(oper_expr(elem) for elem in elems)
-                else:
-                    return oper_expr(obj)
-            
-            # print('approx eqn')
-            # display(approx)
-            
-            sol_subs_list = [sol.applyfunc(lambda row: SimplifiedExpr(row,ivar=self._t_list[0],parameters=self._t_list[1:]).full_expr).doit() for sol in sol_list]
-            sol_subs_dict  = {  dvar:eqn     for  sol   in sol_subs_list  for dvar, eqn in sol.as_explicit_dict().items()}
-            
-            sol_subs_dict  = sol.as_explicit_dict()
+        keys = [PerturbationOrderCache.key(self, no) for no in range(self.order + 1)]
+        cached = [PerturbationOrderCache.load(key) for key in keys]
         
-            approx_subs = approx.applyfunc(eqns_map).subs(
-                sol_subs_dict).applyfunc(eqns_map)
-            
-            # display(approx_subs)
+        missing = [no for no, entry in enumerate(cached) if entry is None]
 
-            approx_subs = NthOrderODEsApproximation.from_ode_system(approx_subs)
-            approx_subs._parameters = self.t_list[1:]
-            
-            approx_with_const += [approx_subs]
+        if missing:
+            approx_with_const = self.eoms_approx_with_const(order)
+
+            # secular terms of every order depend only on its equation
+            secular_orders = [no for no in missing if no > 0]
+            approx_comps = [(ImmutableMatrix(approx.lhs), ImmutableMatrix(approx.rhs), ImmutableMatrix(approx.dvars), approx.ivar, approx.ode_order, tuple(approx._parameters))
+                            for approx in (approx_with_const[no] for no in secular_orders)]
+            secular_forms = dict(zip(secular_orders, self._pool_map(_secular_form, *zip(*approx_comps)))) if secular_orders else {}
             
-        return approx_with_const
+        sol_list = []
 
+        for no, (key, entry) in enumerate(zip(keys, cached)):
 
-    def _general_sol(self, order=1):
+            if entry is not None:
+                entry = PerturbationOrderCache.restored(entry, self.t_list)
 
-        self.secular_eq = {}
+                sol = ODESolution.from_vars_and_rhs(Matrix(entry[-2]), Matrix(entry[-1]))
+                sol.ivar = self.t_list[0]
+                sol_list += [sol]
 
-        
-        approx_with_const = self.eoms_approx_with_const(order)
+                if no > 0:
+                    sec_lhs, sec_dvars, sec_ivar = entry[2:5]
+                    self.secular_eq[self.eps**no] = ODESystem(Matrix(sec_lhs), dvars=Matrix(sec_dvars), ivar=sec_ivar, ode_order=None)
 
-        sol = approx_with_const[0].solution
-        sol_list = [sol]
+                continue
 
-        for order, approx in enumerate(approx_with_const[1:]):
+            if no == 0:
+                sol = approx_with_const[0].solution
+                sol_list += [sol]
+                
+                PerturbationOrderCache.store(key, *PerturbationOrderCache.canonical((ImmutableMatrix(sol.lhs), ImmutableMatrix(sol.rhs)), self.t_list))
+                continue
 
-            approx_subs = approx
-            self.secular_eq[self.eps**(order +1)] = approx_subs.secular_terms#.as_type(FirstOrderLinearODESystem)
+            approx_subs = approx_with_const[no]
+            sec_lhs, sec_dvars, sec_ivar = secular_forms[no]
+            self.secular_eq[self.eps**no] = ODESystem(Matrix(sec_lhs), dvars=Matrix(sec_dvars), ivar=sec_ivar, ode_order=None)#.as_type(FirstOrderLinearODESystem)
             
             #nonlin_ode.eoms_approx_with_const()[0].remove_secular_terms().steady_solution.rhs
-            approx_subs = approx_subs#.steady_solution.rhs
-            
-            #aux_mat=approx_subs.jacobian(approx_subs.dvars)
-            # if det(aux_mat)==0:
-
-            #     SolverClass = FirstOrderLinearODESystem
-            # else:
-            #     SolverClass = FirstOrderLinearODESystemWithHarmonics
-
-            # SolverClass = FirstOrderLinearODESystemWithHarmonics
-            # #SolverClass = FirstOrderLinearODESystem
             
-            if len(sol) > 0:
+            if len(sol_list[-1]) > 0:
                 ode_2_solve = approx_subs.subs(sol_list[-1].as_explicit_dict()).remove_secular_terms()
             else:
                 ode_2_solve = approx_subs.remove_secular_terms()
             
-            # ode_2_solve._ivar = self.t_list[0]
-            
-            # ode_2_solve = SolverClass.from_ode_system(ode_2_solve)
-
-            
-
             sol = ode_2_solve.steady_solution.applyfunc(
-                lambda obj: obj.expand())#.applyfunc(eqns_map)#.applyfunc(lambda row: SimplifiedExpr(row,ivar=self._t_list[0],parameters=self._t_list[1:]).sum_expr)
+                lambda obj: obj.expand())#.applyfunc(lambda row: SimplifiedExpr(row,ivar=self._t_list[0],parameters=self._t_list[1:]).sum_expr)
 
+            sol = sol.applyfunc(lambda row: SimplifiedExpr(row,ivar=self._t_list[0],parameters=self._t_list[1:]).full_expr).doit()
+            sol_list += [sol]
 
-            sol_list += [sol.applyfunc(lambda row: SimplifiedExpr(row,ivar=self._t_list[0],parameters=self._t_list[1:]).full_expr).doit()]
-            #sol_list += [sol]
+            entry = (ImmutableMatrix(approx_subs.lhs), ImmutableMatrix(approx_subs.rhs), sec_lhs, sec_dvars, sec_ivar, ImmutableMatrix(sol.lhs), ImmutableMatrix(sol.rhs))
+            PerturbationOrderCache.store(key, *PerturbationOrderCache.canonical(entry, self.t_list))
 
         CodeFlowLogger(sol_list,'sol list',self)
 
@@ -1,4 +1,16 @@
-from sympy import Symbol, symbols, Matrix, sin, cos, diff, sqrt, S, diag, Eq, Dict, ImmutableMatrix, latex, solve#, Tuple
+from sympy import Symbol, symbols, Matrix, sin, cos, diff, sqrt, S, diag, Eq, Dict, ImmutableMatrix, latex, solve, lambdify, hessian#, Tuple
+
+from functools import cached_property, partial
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from .numerical import structural_fingerprint
 
 
 
@@ -205,6 +217,16 @@ class Reliability():
 
         return eq
 
+    def to_numerical(self):
+        '''
+        Method returns the NumericalReliability with the same limit state function and parameters.
+        '''
+
+        return NumericalReliability(limit_state_function=self.limit_state_function,
+                mean_values_dict=self.mean_values_dict,
+                standard_deviations_dict=self.standard_deviations_dict,
+                parameters_list=self.parameters_list)
+
     def next_step(self):
 
         lsf=self.limit_state_function
@@ -720,3 +742,449 @@ class ReliabilityAlgorithm(InverseReliability):
     def toFORM(self):
 
         self.validate(n=1)
+
+
+class NumericalReliability():
+    '''
+    Class bases on First (and Second) Order Reliability Method computed numerically. The limit state function, its gradient and hessian are lambdified once and the HL-RF iterations are computed with NumPy for the batch of cases (e.g. the sets of design parameters, mean values or standard deviations given as arrays) at once. The parameters from parameters_list are independent and normally distributed, the other symbols of the limit state function are the design parameters.
+
+        >>>form = NumericalReliability(Eq(g, R - S), {R: 10, S: 5}, {R: 1, S: 1}, [R, S])
+        >>>form.compute(mean_values_dict={R: np.linspace(8, 12, 50)}, sorm=True)
+    '''
+
+    def __init__(self,
+                limit_state_function,
+                mean_values_dict,
+                standard_deviations_dict,
+                parameters_list,
+                design_parameters=None,
+                ):
+
+        if isinstance(limit_state_function, Eq):
+            limit_state_function = limit_state_function.rhs
+
+        self.limit_state_function = limit_state_function
+        self.mean_values_dict = mean_values_dict
+        self.standard_deviations_dict = standard_deviations_dict
+        self.parameters_list = list(parameters_list)
+
+        if design_parameters is None:
+            design_parameters = sorted(limit_state_function.free_symbols - set(self.parameters_list), key=str)
+
+        self.design_parameters = list(design_parameters)
+
+    def __getstate__(self):
+
+        # the lambdified functions are generated again after unpickling (e.g. in the worker processes)
+        return {key: value for key, value in self.__dict__.items() if not key.endswith('_numerized')}
+
+    @cached_property
+    def fingerprint(self):
+        '''
+        Structural fingerprint of the limit state function and its arguments - the key of the forms stored in the worker processes.
+        '''
+        return structural_fingerprint(self.limit_state_function, tuple(self.parameters_list), tuple(self.design_parameters))
+
+    @cached_property
+    def _args(self):
+        return [*self.parameters_list, *self.design_parameters]
+
+    @cached_property
+    def _limit_state_numerized(self):
+        return lambdify(self._args, self.limit_state_function, 'numpy')
+
+    @cached_property
+    def _gradient_numerized(self):
+        return lambdify(self._args, [self.limit_state_function.diff(param) for param in self.parameters_list], 'numpy')
+
+    @cached_property
+    def _hessian_numerized(self):
+        return lambdify(self._args, hessian(self.limit_state_function, self.parameters_list).tolist(), 'numpy')
+
+    def _batch(self, params_values=None, mean_values_dict=None, standard_deviations_dict=None):
+        '''
+        Method returns the arrays of mean values and standard deviations (cases x parameters) and the list of design parameter values broadcasted to the common number of cases.
+        '''
+
+        mean_values_dict = {**self.mean_values_dict, **(mean_values_dict or {})}
+        standard_deviations_dict = {**self.standard_deviations_dict, **(standard_deviations_dict or {})}
+        params_values = {**self.mean_values_dict, **(params_values or {})}
+
+        missing = [param for param in self.design_parameters if param not in params_values]
+        if missing:
+            raise ValueError(f'Values of the design parameters {missing} are not given')
+
+        values = [mean_values_dict[param] for param in self.parameters_list]
+        values += [standard_deviations_dict[param] for param in self.parameters_list]
+        values += [params_values[param] for param in self.design_parameters]
+
+        values = [np.ravel(value) for value in np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in values])]
+
+        params_no = len(self.parameters_list)
+        mean = np.stack(values[:params_no], axis=1)
+        deviation = np.stack(values[params_no:2 * params_no], axis=1)
+
+        return mean, deviation, values[2 * params_no:]
+
+    @staticmethod
+    def _evaluated(func, coords, design_values):
+        '''
+        Method evaluates the lambdified function (or nested lists of functions) for the cases given by rows of coords - the constant components are broadcasted to the number of cases which is the first axis of the result.
+        '''
+
+        cases_no = len(coords)
+
+        def broadcasted(elem):
+            if isinstance(elem, (list, tuple)):
+                return np.stack([broadcasted(sub_elem) for sub_elem in elem])
+            return np.broadcast_to(np.asarray(elem, dtype=float), (cases_no,))
+
+        return np.moveaxis(broadcasted(func(*coords.T, *design_values)), -1, 0)
+
+    def limit_state(self, coords, params_values=None):
+        '''
+        Method evaluates the limit state function for the points of the original space (rows of coords) with the design parameters given in params_values (scalars or arrays of the rows number).
+        '''
+
+        coords = np.atleast_2d(np.asarray(coords, dtype=float))
+        params_values = {**self.mean_values_dict, **(params_values or {})}
+        design_values = [np.broadcast_to(np.asarray(params_values[param], dtype=float), (len(coords),)) for param in self.design_parameters]
+
+        return self._evaluated(self._limit_state_numerized, coords, design_values)
+
+    def compute(self,
+                params_values=None,
+                mean_values_dict=None,
+                standard_deviations_dict=None,
+                initial_point=None,
+                sorm=False,
+                tol=1e-6,
+                max_iter=100):
+        '''
+        Method computes the design points and reliability indices for the batch of cases with HL-RF iterations. The values in params_values, mean_values_dict and standard_deviations_dict (updating the ones given to the constructor) can be arrays of the common length. The iterations of the converged cases are stopped. The curvatures of the limit state surface at the design point are used for the SORM (Breitung) estimation of the failure probability if sorm is True.
+        '''
+
+        mean, deviation, design_values = self._batch(params_values, mean_values_dict, standard_deviations_dict)
+        cases_no, params_no = mean.shape
+
+        if initial_point is None:
+            u = np.zeros_like(mean)
+        else:
+            u = (np.broadcast_to(np.asarray(initial_point, dtype=float), mean.shape) - mean) / deviation
+
+        iterations = np.zeros(cases_no, dtype=int)
+        active = np.ones(cases_no, dtype=bool)
+
+        for step in range(max_iter):
+
+            cases = np.flatnonzero(active)
+            if len(cases) == 0:
+                break
+
+            values = [value[cases] for value in design_values]
+            coords = mean[cases] + deviation[cases] * u[cases]
+
+            func = self._evaluated(self._limit_state_numerized, coords, values)
+            grad = self._evaluated(self._gradient_numerized, coords, values) * deviation[cases]
+            grad_norm = np.linalg.norm(grad, axis=1)
+
+            u_new = ((np.sum(grad * u[cases], axis=1) - func) / grad_norm**2)[:, None] * grad
+
+            step_length = np.linalg.norm(u_new - u[cases], axis=1)
+            u[cases] = u_new
+            iterations[cases] += 1
+
+            converged = (step_length <= tol * np.maximum(1.0, np.linalg.norm(u_new, axis=1))) & (np.abs(func) / grad_norm <= tol)
+            active[cases[converged]] = False
+
+        coords = mean + deviation * u
+        grad = self._evaluated(self._gradient_numerized, coords, design_values) * deviation
+        grad_norm = np.linalg.norm(grad, axis=1)
+
+        alpha = -grad / grad_norm[:, None]
+        beta = np.sum(alpha * u, axis=1)
+
+        result = pd.DataFrame(coords, columns=[str(param) for param in self.parameters_list])
+        for no, param in enumerate(self.parameters_list):
+            result[f'alpha_{param}'] = alpha[:, no]
+
+        result['beta'] = beta
+        result['pf_FORM'] = norm.cdf(-beta)
+
+        if sorm:
+            curvatures = self.curvatures(coords, deviation, grad, design_values)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result['pf_SORM'] = norm.cdf(-beta) * np.prod(1 / np.sqrt(1 + beta[:, None] * curvatures), axis=1)
+
+        result['iterations'] = iterations
+        result['converged'] = ~active
+
+        return result
+
+    def curvatures(self, coords, deviation, grad, design_values):
+        '''
+        Method returns the principal curvatures of the limit state surface in the reduced space at the points given by rows of coords (positive ones bend the surface away from the origin).
+        '''
+
+        hess = self._evaluated(self._hessian_numerized, coords, design_values) * deviation[:, :, None] * deviation[:, None, :]
+
+        grad_norm = np.linalg.norm(grad, axis=1)
+        alpha = -grad / grad_norm[:, None]
+
+        projection = np.eye(grad.shape[1]) - alpha[:, :, None] * alpha[:, None, :]
+        eigenvalues, eigenvectors = np.linalg.eigh(projection @ hess @ projection / grad_norm[:, None, None])
+
+        # the eigenvector parallel to the normal of the surface is removed
+        normal_no = np.argmax(np.abs(np.sum(eigenvectors * alpha[:, :, None], axis=1)), axis=1)
+        mask = np.arange(grad.shape[1])[None, :] != normal_no[:, None]
+
+        return eigenvalues[mask].reshape(len(coords), grad.shape[1] - 1)
+
+    def inverse(self,
+                assumed_reliability_index,
+                parameter,
+                initial_value=None,
+                deviation=False,
+                params_values=None,
+                mean_values_dict=None,
+                standard_deviations_dict=None,
+                tol=1e-6,
+                max_iter=50,
+                **form_options):
+        '''
+        Method estimates the values of the parameter which give the assumed reliability index - the mean value (or standard deviation if deviation is True) of the random parameter or the value of the design parameter. The secant iterations are computed for the batch of cases at once.
+        '''
+
+        inputs = {'params_values': params_values, 'mean_values_dict': mean_values_dict, 'standard_deviations_dict': standard_deviations_dict}
+        defaults = {'params_values': self.mean_values_dict, 'mean_values_dict': self.mean_values_dict, 'standard_deviations_dict': self.standard_deviations_dict}
+
+        if parameter in self.parameters_list:
+            key = 'standard_deviations_dict' if deviation else 'mean_values_dict'
+            label = ('sigma_' if deviation else 'mu_') + str(parameter)
+        else:
+            key = 'params_values'
+            label = str(parameter)
+
+        if initial_value is None:
+            initial_value = {**defaults[key], **(inputs[key] or {})}[parameter]
+
+        def form_for(value):
+            return self.compute(**{**inputs, key: {**(inputs[key] or {}), parameter: value}}, tol=tol, **form_options)
+
+        result = form_for(initial_value)
+        value_prev = np.broadcast_to(np.asarray(initial_value, dtype=float), (len(result),)).copy()
+        beta_prev = result['beta'].to_numpy()
+
+        value = value_prev * 1.05 + (value_prev == 0) * 0.05
+        result = form_for(value)
+        beta = result['beta'].to_numpy()
+
+        for step in range(max_iter):
+
+            if np.all(np.abs(beta - assumed_reliability_index) <= tol):
+                break
+
+            beta_diff = beta - beta_prev
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value_new = np.where(beta_diff != 0, value - (beta - assumed_reliability_index) * (value - value_prev) / beta_diff, value)
+
+            value_prev, beta_prev = value, beta
+            value = value_new
+
+            result = form_for(value)
+            beta = result['beta'].to_numpy()
+
+        result[label] = value
+        result['converged'] = result['converged'] & (np.abs(beta - assumed_reliability_index) <= tol)
+
+        return result
+
+
+# the forms (with their lambdified functions) stored in the worker process
+_worker_forms = {}
+
+
+def _install_worker_form(key, form):
+    '''
+    Function stores the form in the worker process (the initializer of the executor), so it is sent and lambdified once per worker.
+    '''
+    _worker_forms[key] = form
+
+
+class _WorkerLimitState():
+    '''
+    Picklable reference to the limit state function of NumericalReliability sent with the chunks instead of the form. The form is taken from the ones stored in the worker process. If it is not stored yet (e.g. the executor was created without the initializer) the form sent with the reference is stored, so it is lambdified at most once per worker.
+    '''
+
+    def __init__(self, key, params_values=None, form=None):
+
+        self.key = key
+        self.params_values = params_values
+        self.form = form
+
+    def __call__(self, coords):
+
+        if self.key not in _worker_forms:
+            if self.form is None:
+                raise ValueError('The form of the limit state function is not stored in the worker process')
+            _install_worker_form(self.key, self.form)
+
+        return _worker_forms[self.key].limit_state(coords, params_values=self.params_values)
+
+
+def _sampling_chunk(limit_state, mean, deviation, shift, samples_no, seed):
+    '''
+    Function draws the chunk of samples (normal in the reduced space, shifted to the sampling center) and returns the number of samples, mean and sum of squared deviations of the failure indicator weighted with the likelihood ratio, and the number of failures.
+    '''
+
+    rng = np.random.default_rng(seed)
+    u = rng.standard_normal((samples_no, len(mean))) + shift
+
+    failed = np.asarray(limit_state(mean + deviation * u)) < 0
+    weights = np.exp(-u @ shift + shift @ shift / 2)
+
+    values = failed * weights
+    chunk_mean = values.mean()
+
+    return samples_no, chunk_mean, np.sum((values - chunk_mean)**2), int(failed.sum())
+
+
+class MonteCarloReliability():
+    '''
+    Class estimates the failure probability with Monte Carlo simulation - crude or importance sampling around the design point of FORM. The parameters from parameters_list are independent and normally distributed. The limit state function can be given as the sympy expression (lambdified with NumericalReliability) or the vectorized function of the array of samples (rows of parameters values), e.g. the peak response of the numerized model exceeding the threshold. The samples are evaluated in chunks (in parallel if n_jobs is set) and the statistics are accumulated in the streaming way. Every chunk has its own seed spawned from the given one, so the result does not depend on the number of processes. The limit state given as the sympy expression is lambdified at most once per worker process (see _WorkerLimitState).
+
+        >>>mc = MonteCarloReliability(Eq(g, x1 * x2 - 10), {x1: 5, x2: 4}, {x1: 1, x2: 0.5}, [x1, x2])
+        >>>mc.compute(samples_no=10**6, importance_sampling=True, seed=0)
+    '''
+
+    def __init__(self,
+                limit_state_function,
+                mean_values_dict,
+                standard_deviations_dict,
+                parameters_list,
+                params_values=None,
+                ):
+
+        self.mean_values_dict = mean_values_dict
+        self.standard_deviations_dict = standard_deviations_dict
+        self.parameters_list = list(parameters_list)
+        self.params_values = params_values
+
+        if callable(limit_state_function):
+            self.form = None
+            self.limit_state = limit_state_function
+        else:
+            self.form = NumericalReliability(limit_state_function, mean_values_dict, standard_deviations_dict, parameters_list)
+            self.limit_state = partial(self.form.limit_state, params_values=params_values)
+
+    def design_point(self):
+        '''
+        Method returns the design point of FORM in the original space.
+        '''
+
+        if self.form is None:
+            raise ValueError('The design point has to be given for the limit state function which is not a sympy expression')
+
+        form_result = self.form.compute(params_values=self.params_values)
+
+        return form_result[[str(param) for param in self.parameters_list]].to_numpy()[0]
+
+    @staticmethod
+    def _bounded_outputs(executor, tasks):
+        '''
+        Yields the results of chunks in their order. At most max_workers of the executor (the number of CPUs if it is not known) chunks are submitted ahead, so the work stops soon after the consumer does (e.g. once the target_cov is reached) and the pending chunks are cancelled.
+        '''
+        ahead_no = getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+        tasks = iter(tasks)
+        pending = deque(executor.submit(_sampling_chunk, *task) for task in itertools.islice(tasks, ahead_no))
+
+        try:
+            while pending:
+                output = pending.popleft().result()
+
+                for task in itertools.islice(tasks, 1):
+                    pending.append(executor.submit(_sampling_chunk, *task))
+
+                yield output
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def compute(self,
+                samples_no=10**5,
+                chunk_size=10**4,
+                seed=None,
+                importance_sampling=False,
+                design_point=None,
+                confidence=0.95,
+                target_cov=None,
+                n_jobs=None,
+                executor=None):
+        '''
+        Method estimates the failure probability with its standard error, coefficient of variation and confidence bounds. The sampling density is shifted to the design point (the FORM one if not given) if importance_sampling is True. The sampling is stopped after the chunk which gives the coefficient of variation lower than target_cov.
+        '''
+
+        mean = np.array([float(self.mean_values_dict[param]) for param in self.parameters_list])
+        deviation = np.array([float(self.standard_deviations_dict[param]) for param in self.parameters_list])
+
+        if importance_sampling:
+            if design_point is None:
+                design_point = self.design_point()
+            shift = (np.asarray(design_point, dtype=float) - mean) / deviation
+        else:
+            shift = np.zeros_like(mean)
+
+        chunks = [chunk_size] * (samples_no // chunk_size) + ([samples_no % chunk_size] if samples_no % chunk_size else [])
+        seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+        own_executor = executor is None and n_jobs not in (None, 1)
+        limit_state = self.limit_state
+
+        if self.form is not None and own_executor:
+            # the form is sent once per worker with the initializer and the chunks refer to it with the fingerprint
+            limit_state = _WorkerLimitState(self.form.fingerprint, self.params_values)
+            executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs, initializer=_install_worker_form, initargs=(self.form.fingerprint, self.form))
+        elif own_executor:
+            executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs)
+        elif self.form is not None and executor is not None:
+            limit_state = _WorkerLimitState(self.form.fingerprint, self.params_values, self.form)
+
+        tasks = [(limit_state, mean, deviation, shift, chunk, chunk_seed) for chunk, chunk_seed in zip(chunks, seeds)]
+
+        if executor is None:
+            outputs = (_sampling_chunk(*task) for task in tasks)
+        else:
+            outputs = self._bounded_outputs(executor, tasks)
+
+        count, pf, sq_sum, failures_no = 0, 0.0, 0.0, 0
+
+        try:
+            for chunk_count, chunk_mean, chunk_sq_sum, chunk_failures in outputs:
+
+                # the statistics of the chunks are merged (Chan et al.) in the order of chunks
+                delta = chunk_mean - pf
+                total = count + chunk_count
+
+                pf += delta * chunk_count / total
+                sq_sum += chunk_sq_sum + delta**2 * count * chunk_count / total
+                count = total
+                failures_no += chunk_failures
+
+                if target_cov is not None and pf > 0 and np.sqrt(sq_sum / (count - 1) / count) / pf <= target_cov:
+                    break
+        finally:
+            outputs.close()
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+        std_error = np.sqrt(sq_sum / max(count - 1, 1) / count)
+        quantile = norm.ppf(0.5 + confidence / 2)
+
+        return pd.Series({'pf': pf,
+                          'std_error': std_error,
+                          'cov': std_error / pf if pf > 0 else np.inf,
+                          'lower': max(pf - quantile * std_error, 0.0),
+                          'upper': pf + quantile * std_error,
+                          'beta': -norm.ppf(pf),
+                          'samples_no': count,
+                          'failures_no': failures_no})
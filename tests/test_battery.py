@@ -0,0 +1,50 @@
+"""
+Regression tests of the cycle simulation of BatteryCell compared with the numerical integration of the RC branch
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.integrate import solve_ivp
+
+from dynpy.models.electric.battery import BatteryCell
+
+CELLDATA = pd.DataFrame({'OCV': [3.0, 3.6, 4.2], 'R0': [0.05, 0.04, 0.03]}, index=[0, 50, 100])
+R_TH, C_TH = 0.01, 200.0
+
+
+def cell_and_data():
+
+    cell = BatteryCell()
+    data_dict = {cell.C_rated: 2.5, cell.SOC_init: 0.9, cell.R_th: R_TH, cell.C_th: C_TH}
+
+    return cell, data_dict
+
+
+@pytest.mark.parametrize('time_array', [np.linspace(0, 20, 41), np.sort(np.random.default_rng(0).uniform(0, 20, 41))])
+def test_rc_branch_matches_numerical_integration(time_array):
+
+    cell, data_dict = cell_and_data()
+    current = 1.0 + np.sin(time_array / 3)
+
+    results = cell.cycle_simulation(data_dict, CELLDATA, time_array, current, U_th_init=0.02)
+
+    current_fun = lambda t: np.interp(t, time_array, current)
+    reference = solve_ivp(lambda t, u: -u / (R_TH * C_TH) - current_fun(t) / C_TH, (time_array[0], time_array[-1]), [0.02],
+                          t_eval=time_array, rtol=1e-10, atol=1e-12, max_step=np.diff(time_array).min() / 4)
+
+    np.testing.assert_allclose(results[cell.U_th].to_numpy(), reference.y[0], atol=1e-8)
+    np.testing.assert_allclose(results[cell.U_li].to_numpy(),
+                               results[cell.U_oc].to_numpy() - results[cell.R_0].to_numpy() * current - reference.y[0], atol=1e-8)
+
+
+@pytest.mark.parametrize('time_array, current', [([0.0], [1.0]), (5.0, 1.0)])
+def test_single_sample_is_the_initial_state(time_array, current):
+
+    cell, data_dict = cell_and_data()
+
+    results = cell.cycle_simulation(data_dict, CELLDATA, time_array, current, U_th_init=0.02)
+
+    assert len(results) == 1
+    assert results[cell.U_th].iloc[0] == 0.02
+    assert results[cell.SOC].iloc[0] == 0.9
@@ -0,0 +1,291 @@
+"""
+Regression tests of the dynamic systems composed from elements and of the numerical linearization paths of LagrangesDynamicSystem compared with the reference (eager or direct numerical) results
+"""
+
+import copy
+import pickle
+import warnings
+
+import numpy as np
+import pytest
+import scipy.linalg
+from scipy.optimize import root
+from sympy import Symbol, cos, lambdify, sin, symbols
+from sympy.physics.mechanics import Point, ReferenceFrame, dynamicsymbols
+
+import dynpy.dynamics as dynamics
+from dynpy.dynamics import LagrangesDynamicSystem, LinearDynamicSystem
+from dynpy.models.mechanics.trolley import SpringDamperMassSystem, TrolleyWithElasticPendulum
+
+t = Symbol('t')
+m, l, g, k, a = symbols('m l g k a', positive=True)
+F, F1, Omega, G = symbols('F F_1 Omega G', positive=True)
+
+
+def double_pendulum():
+    '''
+    Returns the double pendulum with the constant and the harmonic horizontal force acting on the second mass.
+    '''
+    phi1, phi2 = dynamicsymbols('varphi_1 varphi_2')
+
+    N = ReferenceFrame('N')
+    O = Point('O')
+    O.set_vel(N, 0)
+
+    P1 = O.locatenew('P1', l * sin(phi1) * N.x - l * cos(phi1) * N.y)
+    P1.set_vel(N, P1.pos_from(O).dt(N))
+    P2 = P1.locatenew('P2', l * sin(phi2) * N.x - l * cos(phi2) * N.y)
+    P2.set_vel(N, P2.pos_from(O).dt(N))
+
+    T = m / 2 * P1.vel(N).dot(P1.vel(N)) + m / 2 * P2.vel(N).dot(P2.vel(N))
+    V = -m * g * l * cos(phi1) - m * g * l * (cos(phi1) + cos(phi2))
+
+    return LagrangesDynamicSystem(T - V, qs=[phi1, phi2], forcelist=[(P2, (F + F1 * cos(Omega * t)) * N.x)], frame=N, ivar=t)
+
+
+def two_masses(forced=True, circulatory=False):
+    '''
+    Returns the chain of two masses and two springs with the harmonic and the static force acting on the second mass. The circulatory force acting on the first mass is proportional to the displacement of the second one.
+    '''
+    x1, x2 = dynamicsymbols('x_1 x_2')
+
+    N = ReferenceFrame('N')
+    P1 = Point('P1')
+    P1.set_vel(N, x1.diff(t) * N.x)
+    P2 = Point('P2')
+    P2.set_vel(N, x2.diff(t) * N.x)
+
+    L = m / 2 * x1.diff(t)**2 + m / 2 * x2.diff(t)**2 - k / 2 * x1**2 - k / 2 * (x2 - x1)**2
+
+    forcelist = [(P2, (F * cos(Omega * t) + G) * N.x)] if forced else []
+    if circulatory:
+        forcelist.append((P1, -a * x2 * N.x))
+
+    return LinearDynamicSystem(L, qs=[x1, x2], forcelist=forcelist, frame=N, ivar=t)
+
+
+PENDULUM_VALUES = {m: 1.0, l: 1.0, g: 9.81, F: 2.0, F1: 0.5, Omega: 3.0}
+
+
+def static_solution(system, values, x0):
+    '''
+    Returns the equilibrium found with scipy.optimize.root of the governing equations without accelerations, velocities and excitation.
+    '''
+    coords = symbols(f'q_0:{len(system.q)}')
+
+    static_eqs = system.governing_equations.subs({q.diff(t, 2): 0 for q in system.q}).subs({q.diff(t): 0 for q in system.q})
+    static_eqs = static_eqs.subs(F1, 0).subs(values).subs(dict(zip(system.q, coords)))
+
+    residual = lambdify([coords], list(static_eqs))
+
+    return root(residual, x0, tol=1e-12).x
+
+
+def eager_system(system):
+    '''
+    Returns the system of the same Lagrangian and forces with the equations of motion formed at the initialization.
+    '''
+    return LagrangesDynamicSystem(system.lagrangian(), qs=system.q, forcelist=system.forcelist, frame=system.frame, ivar=system.ivar)
+
+
+def test_lazy_equations_of_composed_system_equal_eager_ones():
+
+    system = SpringDamperMassSystem()
+
+    assert system._eom is None
+    assert system.governing_equations == eager_system(system).governing_equations
+    assert system.eom == eager_system(system).eom
+
+
+def test_partial_sums_of_elements_do_not_form_equations():
+
+    elements = list(SpringDamperMassSystem().components.values())
+    partial_sum = elements[0] + elements[1]
+    systems_sum = partial_sum + elements[2]
+
+    assert partial_sum._eom is None and systems_sum._eom is None
+    assert systems_sum.governing_equations == eager_system(systems_sum).governing_equations
+    assert partial_sum._eom is None
+
+
+def test_components_are_built_once_per_instance():
+
+    system = SpringDamperMassSystem()
+    components = system.components
+
+    assert all(system.components[name] is element for name, element in components.items())
+    assert system._invalidate_components().components['spring'] is not components['spring']
+
+
+def test_substituted_and_copied_systems_have_their_own_components():
+
+    system = SpringDamperMassSystem()
+    spring = system.components['spring']
+
+    assert system.copy().components['spring'] is not spring
+    assert system.subs({system.k: 2}).components['spring'] is not spring
+
+
+def test_composed_system_round_trips_through_pickle_and_deepcopy():
+
+    system = SpringDamperMassSystem()
+    components = system.components
+
+    for restored in [pickle.loads(pickle.dumps(system)), copy.deepcopy(system)]:
+        assert restored._eoms == system._eoms
+        assert list(restored.components) == list(components)
+        assert restored.components['spring'] is not components['spring']
+
+
+def test_linearization_of_model_with_attribute_u():
+
+    system = TrolleyWithElasticPendulum()
+    values = {par: 1.0 + no / 10 for no, par in enumerate(sorted(system.governing_equations.free_symbols - {t}, key=str))}
+
+    velocities = [coord.diff(t) for coord in system.q]
+    accelerations = [vel.diff(t) for vel in velocities]
+    static = {**{acc: 0 for acc in accelerations}, **{vel: 0 for vel in velocities}, **{coord: 0 for coord in system.q}, t: 0}
+
+    def reference(variables):
+        return np.array(system.governing_equations.jacobian(variables).subs(static).subs(values).doit(), dtype=float)
+
+    M, C, K = system.numerical_linearized(values)
+
+    np.testing.assert_allclose(M, reference(accelerations))
+    np.testing.assert_allclose(C, reference(velocities))
+    np.testing.assert_allclose(K, reference(list(system.q)))
+    assert system._numerical_linearization_functions() is system._numerical_linearization_functions()
+
+
+def test_op_points_of_multi_dof_system_match_scipy_root():
+
+    system = double_pendulum()
+
+    np.testing.assert_allclose(system.numerical_op_points(PENDULUM_VALUES), static_solution(system, PENDULUM_VALUES, [0.0, 0.0]), atol=1e-8)
+
+
+def test_op_points_of_batch_of_cases_match_single_cases():
+
+    system = double_pendulum()
+    forces = np.array([0.0, 2.0, 5.0])
+
+    op_points = system.numerical_op_points({**PENDULUM_VALUES, F: forces})
+
+    assert op_points.shape == (2, 3)
+    for no, force in enumerate(forces):
+        np.testing.assert_allclose(op_points[:, no], system.numerical_op_points({**PENDULUM_VALUES, F: force}), atol=1e-10)
+
+
+def test_op_points_of_singular_cases_are_nan_with_warning():
+
+    x = dynamicsymbols('x')
+    N = ReferenceFrame('N')
+    P = Point('P')
+    P.set_vel(N, x.diff(t) * N.x)
+
+    system = LagrangesDynamicSystem(m / 2 * x.diff(t)**2 - k / 2 * x**2 - x**4, qs=[x], forcelist=[(P, (F + F1 * cos(Omega * t)) * N.x)], frame=N, ivar=t)
+
+    with pytest.warns(UserWarning, match='1 of 2 cases'):
+        op_points = system.numerical_op_points({k: np.array([4.0, 0.0]), m: 1.0, F: 1.0})
+
+    assert np.isfinite(op_points[0, 0])
+    assert np.isnan(op_points[0, 1])
+    assert op_points[0, 0] * 4.0 + 4 * op_points[0, 0]**3 == pytest.approx(1.0)
+
+
+def test_fingerprint_is_carried_through_copy_and_subs(monkeypatch):
+
+    system = SpringDamperMassSystem()
+    fingerprint = system.fingerprint
+
+    calls = []
+    monkeypatch.setattr(dynamics, 'structural_fingerprint', lambda *items: calls.append(items) or str(len(calls)))
+
+    assert system.copy().fingerprint == fingerprint
+    assert system.subs({system.k: 2}).fingerprint not in (fingerprint, None)
+    assert len(calls) == 1
+
+
+def test_numerical_modes_match_generalized_eigenproblem():
+
+    system = two_masses()
+
+    frequencies, modes = system.numerical_modes({m: 1.0, k: 4.0})
+    eigenvalues, eigenvectors = scipy.linalg.eigh(np.array([[8.0, -4.0], [-4.0, 4.0]]), np.eye(2))
+
+    np.testing.assert_allclose(frequencies, np.sqrt(eigenvalues))
+    np.testing.assert_allclose(np.abs(modes), np.abs(eigenvectors), atol=1e-12)
+
+
+def test_numerical_modes_of_non_symmetric_stiffness_match_general_eigenproblem():
+
+    frequencies, modes = two_masses(circulatory=True).numerical_modes({m: 1.0, k: 4.0, a: 2.0}, normalization='max')
+
+    eigenvalues, eigenvectors = scipy.linalg.eig(np.array([[8.0, -2.0], [-4.0, 4.0]]))
+    order = np.argsort(eigenvalues.real)
+
+    np.testing.assert_allclose(frequencies, np.sqrt(eigenvalues.real[order]))
+    for no, mode in enumerate(eigenvectors[:, order].T.real):
+        np.testing.assert_allclose(modes[:, no], mode / mode[np.argmax(np.abs(mode))], atol=1e-12)
+
+
+def test_numerical_modes_as_frames_contain_frequencies_and_shapes():
+
+    system = two_masses()
+    values = {m: 1.0, k: np.array([4.0, 9.0])}
+
+    frequencies, modes = system.numerical_modes(values)
+    frequencies_frame, modes_frame = system.numerical_modes(values, as_frame=True)
+
+    np.testing.assert_allclose(frequencies_frame.to_numpy(), frequencies)
+    assert list(modes_frame.index.names) == ['case', 'coordinate']
+    np.testing.assert_allclose(modes_frame.loc[1].to_numpy(), modes[1])
+    assert list(modes_frame.loc[1].index) == list(system.q)
+
+
+def test_numerical_frf_matches_direct_solution():
+
+    system = two_masses()
+    frequencies = np.array([0.5, 1.0, 3.0])
+
+    frf = system.numerical_frf({m: 1.0, k: 4.0, F: 1.0}, frequencies, as_frame=False)
+
+    stiffness = np.array([[8.0, -4.0], [-4.0, 4.0]])
+    for no, omega in enumerate(frequencies):
+        np.testing.assert_allclose(frf[no], np.linalg.solve(stiffness - omega**2 * np.eye(2), [0.0, 1.0]))
+
+    assert system.numerical_frf({m: 1.0, k: 4.0}, frequencies, forces=None, as_frame=False).shape == (3, 2, 2)
+
+
+def test_linearization_does_not_require_static_force_and_excitation_frequency():
+
+    system = two_masses()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        M, C, K = system.numerical_linearized({m: 1.0, k: 4.0})
+
+    np.testing.assert_allclose(M, np.eye(2))
+    np.testing.assert_allclose(C, np.zeros((2, 2)))
+    np.testing.assert_allclose(K, [[8.0, -4.0], [-4.0, 4.0]])
+
+
+def test_simulations_of_parameter_sweep_numerize_the_model_once(monkeypatch):
+
+    system = SpringDamperMassSystem()
+    t_span = np.linspace(0, 1, 11)
+
+    na_df = system.numerical_analysis(parameter=system.F, param_span=[1.0, 2.0], t_span=t_span)
+    cases = list(na_df.columns.droplevel(-1).unique())
+    model = cases[0][0]
+
+    numerized = type(model).numerized
+    calls = []
+    monkeypatch.setattr(type(model), 'numerized', lambda self, *args, **kwargs: calls.append(args) or numerized(self, *args, **kwargs))
+
+    computed = na_df.perform_simulations()
+
+    assert calls == [()]
+    for case_data in cases:
+        reference = numerized(model, dict(eq.args for eq in case_data[1:])).compute_solution(t_span, [0.0, 0.0])
+        np.testing.assert_allclose(computed[case_data].to_numpy(), reference[computed[case_data].columns].to_numpy())
@@ -0,0 +1,206 @@
+"""
+Regression tests of the state space paths of FirstOrderLinearODESystem, the symbolic solutions cache and the fingerprints of ODE objects
+"""
+
+import itertools
+import os
+
+import numpy as np
+import pytest
+from sympy import Function, ImmutableMatrix, Matrix, Mul, Poly, Rational, Symbol, cos, exp, expand, factorial, sin, symbols
+
+import dynpy.solvers.linear as linear
+from dynpy.dynamics import multivariable_taylor_series
+from dynpy.solvers.linear import MultivariableTaylorSeries, ODESolution, ODESystem, SymbolicSolutionCache, taylor_derivatives
+
+t = Symbol('t')
+m, c, k, F, G = symbols('m c k F G', positive=True)
+x = Function('x')(t)
+u = Function('u')(t)
+
+VALUES = {m: 1.0, c: 0.1, k: 2.0, G: 0.5}
+
+
+def damped_oscillator(force=G):
+
+    return ODESystem(odes=Matrix([m * x.diff(t, 2) + c * x.diff(t) + k * x - force]), dvars=Matrix([x]), ode_order=2)
+
+
+def reference_taylor_series(expr, args, n, x0):
+    '''
+    Returns the Taylor series with every derivative computed from expr directly (the former multivariable_taylor_series).
+    '''
+    args_shifted = {arg: arg - arg_shift for arg, arg_shift in x0.items()}
+    diff_orders_list = sum([list(itertools.combinations_with_replacement(args, order)) for order in range(1, n + 1)], [])
+    diff_orders_dict = {comp: (Mul(*comp).subs(args_shifted) / Mul(*[factorial(elem) for elem in Poly(Mul(*comp), *args).terms()[0][0]])).doit()
+                        for comp in diff_orders_list}
+
+    return (sum([expr.diff(*args_tmp).subs(x0).doit() * poly for args_tmp, poly in diff_orders_dict.items()]) + expr.subs(x0)).doit()
+
+
+def test_taylor_derivatives_match_the_series_derived_directly():
+
+    y = Function('y')(t)
+    expr = sin(x) * cos(y) + k * x**2 * y + exp(y) / (1 + x)
+    x0 = {x: 0, y: k}
+
+    derivatives = taylor_derivatives(expr, [x, y], n=3, op_point=x0)
+    reference = reference_taylor_series(expr, [x, y], 3, x0)
+
+    assert len(derivatives) == 10
+    assert derivatives.pop(()) == expr.subs(x0)
+    assert all(derivative == expr.diff(*args_tmp).subs(x0) for args_tmp, derivative in derivatives.items())
+    assert expand(multivariable_taylor_series(expr, [x, y], n=3, x0=x0) - reference) == 0
+    assert expand(MultivariableTaylorSeries(expr, [x, y], n=3, x0=x0)._series() - reference) == 0
+
+
+def test_fingerprint_follows_changes_of_ivar():
+
+    tau = Symbol('tau')
+    solution = ODESolution.from_vars_and_rhs(Matrix([x]), Matrix([sin(t)]))
+    fingerprint = solution.fingerprint
+
+    solution.ivar = tau
+
+    assert solution.fingerprint != fingerprint
+
+
+def test_fingerprint_is_carried_through_copy_and_subs(monkeypatch):
+
+    ode = damped_oscillator()
+    fingerprint = ode.fingerprint
+
+    calls = []
+    monkeypatch.setattr(linear, 'structural_fingerprint', lambda *items: calls.append(items) or str(len(calls)))
+
+    assert ode.copy().fingerprint == fingerprint
+    assert calls == []
+
+    substituted = ode.subs({k: 2})
+
+    assert substituted.fingerprint not in (fingerprint, None)
+    assert len(calls) == 1
+
+
+def test_lti_solution_matches_numerical_integration_for_constant_input():
+
+    ode = damped_oscillator()
+    t_span = np.linspace(0, 5, 51)
+
+    lti = ode.as_first_ode_linear_system().lti_solution(t_span, [1.0, 0.0], VALUES)
+    reference = ode.numerized(VALUES).compute_solution(t_span, [1.0, 0.0], rtol=1e-10, atol=1e-12)
+
+    assert list(lti.columns) == list(reference.columns)
+    np.testing.assert_allclose(lti.to_numpy(), reference.to_numpy(), atol=1e-8)
+
+
+def test_state_space_matrices():
+
+    A, B, C, D = damped_oscillator(F * u + G).as_first_ode_linear_system().state_space({**VALUES, F: 3.0}, inputs=[u, G])
+
+    np.testing.assert_allclose(A, [[0.0, 1.0], [-2.0, -0.1]])
+    np.testing.assert_allclose(B, [[0.0, 0.0], [3.0, 1.0]])
+    np.testing.assert_allclose(C, np.eye(2))
+    np.testing.assert_allclose(D, np.zeros((2, 2)))
+
+
+def test_state_space_requires_values_of_all_parameters():
+
+    fode = damped_oscillator().as_first_ode_linear_system()
+
+    with pytest.raises(ValueError, match='not given'):
+        fode.lti_solution(np.linspace(0, 1, 11), [1.0, 0.0], {m: 1.0})
+
+
+def test_state_space_rejects_free_terms_not_covered_by_inputs():
+
+    fode = damped_oscillator(F * u + G).as_first_ode_linear_system()
+
+    with pytest.raises(ValueError, match='linear combinations'):
+        fode.state_space({**VALUES, F: 3.0}, inputs=[u])
+
+
+@pytest.mark.parametrize('t_span', [[0.5], 0.5])
+def test_lti_solution_of_single_time_instant_is_the_initial_state(t_span):
+
+    solution = damped_oscillator().as_first_ode_linear_system().lti_solution(t_span, [1.0, 0.0], VALUES)
+
+    assert list(solution.index) == [0.5]
+    np.testing.assert_allclose(solution.to_numpy(), [[1.0, 0.0, -1.5]])
+
+
+def test_lti_solution_rejects_empty_t_span():
+
+    with pytest.raises(ValueError, match='at least one'):
+        damped_oscillator().as_first_ode_linear_system().lti_solution([], [1.0, 0.0], VALUES)
+
+
+def test_state_space_parameters_are_computed_once_for_fingerprint():
+
+    fode = damped_oscillator().as_first_ode_linear_system()
+
+    assert fode._state_space_params is fode._state_space_params
+    assert fode._state_space_params == [G, c, k, m]
+
+
+def test_cache_parses_srepr_of_expressions():
+
+    tau = Function('tau', real=True)(t)
+    entry = (ImmutableMatrix([[tau**2 - Rational(3, 2) * sin(Symbol('y', positive=True)) + 1.25]]), tau, None, -2)
+
+    assert SymbolicSolutionCache._parse(SymbolicSolutionCache._repr(entry)) == entry
+
+
+@pytest.mark.parametrize('source', ["__import__('os').system('echo')",
+                                    "Symbol('x').__class__",
+                                    "sin('__import__(\"os\")')",
+                                    "Integer(**{'i': 1})",
+                                    "(lambda: 1)()"])
+def test_cache_rejects_code_other_than_srepr(source):
+
+    with pytest.raises(ValueError):
+        SymbolicSolutionCache._parse(source)
+
+
+def test_cache_parses_srepr_of_expressions():
+
+    tau = Function('tau', real=True)(t)
+    entry = (ImmutableMatrix([[tau**2 - Rational(3, 2) * sin(Symbol('y', positive=True)) + 1.25]]), tau, None, -2)
+
+    assert SymbolicSolutionCache._parse(SymbolicSolutionCache._repr(entry)) == entry
+
+
+@pytest.mark.parametrize('source', ["__import__('os').system('echo')",
+                                    "Symbol('x').__class__",
+                                    "sin('__import__(\"os\")')",
+                                    "Integer(**{'i': 1})",
+                                    "(lambda: 1)()"])
+def test_cache_rejects_code_other_than_srepr(source):
+
+    with pytest.raises(ValueError):
+        SymbolicSolutionCache._parse(source)
+
+
+def test_cache_stores_solutions_on_disk(tmp_path):
+
+    SymbolicSolutionCache.set_directory(str(tmp_path))
+    try:
+        ode = damped_oscillator(sin(2 * t))
+        solution = ode.general_solution
+
+        SymbolicSolutionCache.clear()
+        assert os.listdir(tmp_path)
+        assert damped_oscillator(sin(2 * t)).general_solution.rhs == solution.rhs
+    finally:
+        SymbolicSolutionCache._directory = None
+        SymbolicSolutionCache.clear()
+
+
+def test_numerized_cases_are_shared_for_different_parameter_values():
+
+    ode = damped_oscillator()
+    first = ode.numerized({**VALUES, k: 2.0})
+    second = ode.copy().numerized({**VALUES, k: 3.0})
+
+    assert first.odes_system == second.odes_system
+    assert first.params_values != second.params_values
@@ -0,0 +1,61 @@
+"""
+Regression tests of the compiled numerical evaluation of MultiTimeScaleMethod compared with the symbolic solution
+"""
+
+import numpy as np
+from sympy import Function, Matrix, Symbol, lambdify
+
+from dynpy.solvers.nonlinear import MultiTimeScaleMethod
+
+t = Symbol('t')
+eps = Symbol('varepsilon')
+c = Symbol('c', positive=True)
+x = Function('x')(t)
+
+ICS = [1.0, 0.0]
+T_SPAN = np.linspace(0, 10, 41)
+
+
+def damped_oscillator(params_values):
+
+    return MultiTimeScaleMethod(Matrix([x.diff(t, 2) + eps * c * x.diff(t) + x]), ivar=t, dvars=Matrix([x]), ics=ICS, eps=eps, omega=1, order=1, params_values=params_values)
+
+
+def symbolic_solution(method, order=1):
+    '''
+    Returns the solution with the integration constants found for the initial conditions (the reference path of the symbolic substitution).
+    '''
+    solution = method.nth_order_solution(order).rhs.subs(method.params_values)
+    ics_dict = method._ic_from_sol(order=order, formula=False)
+
+    return solution.subs(ics_dict).subs(dict(zip(method.ics_symbols, ICS)))[0]
+
+
+def test_compiled_solution_matches_symbolic_solution():
+
+    method = damped_oscillator({c: 0.5, eps: 0.1})
+
+    numerical = method(T_SPAN, order=1)
+    reference = symbolic_solution(method)
+
+    assert list(numerical.columns) == [x, x.diff(t), x.diff(t, 2)]
+    for column, order in zip(numerical.columns, range(3)):
+        np.testing.assert_allclose(numerical[column].to_numpy(), lambdify(t, reference.diff(t, order))(T_SPAN), atol=1e-10)
+
+
+def test_compiled_solution_is_reused_for_new_values(monkeypatch):
+
+    damped_oscillator({c: 0.5, eps: 0.1})(T_SPAN, order=1)
+    compiled_no = len(MultiTimeScaleMethod._saved_numerized)
+
+    method = damped_oscillator({c: 0.3, eps: 0.2})
+    reference = symbolic_solution(method)
+
+    def rederived(*args, **kwargs):
+        raise AssertionError('The solution was derived again')
+
+    monkeypatch.setattr(method, 'nth_order_solution', rederived)
+    numerical = method(T_SPAN, order=1)
+
+    assert len(MultiTimeScaleMethod._saved_numerized) == compiled_no
+    np.testing.assert_allclose(numerical[x].to_numpy(), lambdify(t, reference)(T_SPAN), atol=1e-10)
@@ -0,0 +1,231 @@
+"""
+Regression tests of the fast paths of OdeComputationalCase compared with the reference solve_ivp integration of a single case
+"""
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from sympy import Function, Matrix, Symbol, symbols
+
+from dynpy.solvers.numerical import NumericalRhsCache, OdeComputationalCase, solve_portable_case
+
+t = Symbol('t')
+m, k, c = symbols('m k c', positive=True)
+x = Function('x')(t)
+v = Function('v')(t)
+
+T_SPAN = np.linspace(0, 2, 41)
+PARAMS_VALUES = {m: 1.0, k: 4.0, c: 0.1}
+TOLERANCES = {'rtol': 1e-10, 'atol': 1e-12}
+
+
+def oscillator_case(backend='numpy'):
+    '''
+    Returns the case of the Duffing oscillator x'' + c/m x' + k/m x + x**3 = 0 in the first order form.
+    '''
+    odes = Matrix([v, -k / m * x - c / m * v - x**3])
+
+    return OdeComputationalCase(odes, t, [x, v], params=[m, k, c], params_values=PARAMS_VALUES, t_span=T_SPAN, backend=backend)
+
+
+def reference_solution(case, params_values, ic_list=(1.0, 0.0), method='RK45'):
+
+    return case.compute_solution(T_SPAN, list(ic_list), params_values=params_values, method=method, **TOLERANCES)
+
+
+def test_disk_cache_of_right_hand_sides(tmp_path):
+
+    NumericalRhsCache.set_directory(str(tmp_path))
+    OdeComputationalCase._cached_odes.clear()
+    try:
+        reference = reference_solution(oscillator_case(), PARAMS_VALUES).to_numpy()
+        assert any(tmp_path.iterdir())
+
+        OdeComputationalCase._cached_odes.clear()
+        np.testing.assert_array_equal(reference_solution(oscillator_case(), PARAMS_VALUES).to_numpy(), reference)
+    finally:
+        NumericalRhsCache._directory = None
+
+
+def test_tampered_source_in_disk_cache_is_not_executed(tmp_path):
+
+    NumericalRhsCache.set_directory(str(tmp_path))
+    OdeComputationalCase._cached_odes.clear()
+    try:
+        reference = reference_solution(oscillator_case(), PARAMS_VALUES).to_numpy()
+
+        (source_path, ) = tmp_path.glob('*/rhs.py')
+        source_path.write_text("raise RuntimeError('tampered entry executed')\n")
+
+        OdeComputationalCase._cached_odes.clear()
+        np.testing.assert_array_equal(reference_solution(oscillator_case(), PARAMS_VALUES).to_numpy(), reference)
+        assert 'tampered' not in source_path.read_text()
+    finally:
+        NumericalRhsCache._directory = None
+
+
+@pytest.mark.parametrize('method', ['RK4', 'RK45'])
+def test_batch_solution_matches_single_cases(method):
+
+    case = oscillator_case()
+    sweep = {m: [1.0, 2.0, 0.5], k: 4.0, c: [0.1, 0.2, 0.3]}
+
+    batch = case.compute_batch_solution(T_SPAN, [1.0, 0.0], params_values=sweep, method=method, max_step=1e-3, **TOLERANCES)
+
+    for no in range(3):
+        params_values = {m: sweep[m][no], k: 4.0, c: sweep[c][no]}
+        single = reference_solution(case, params_values)
+
+        assert list(batch[no].columns) == list(single.columns)
+        np.testing.assert_allclose(batch[no].to_numpy(), single.to_numpy(), atol=1e-7)
+
+
+
+def test_batch_params_have_the_same_order_for_dict_and_array():
+
+    case = oscillator_case()
+    sweep = {m: [1.0, 2.0], k: [4.0, 5.0], c: [0.1, 0.2]}
+    array = np.array([[sweep[par][no] for par in case.params] for no in range(2)])
+
+    from_dict = case.compute_batch_solution(T_SPAN, [1.0, 0.0], params_values=sweep, method='RK45')
+    from_array = case.compute_batch_solution(T_SPAN, [1.0, 0.0], params_values=array, method='RK45')
+
+    np.testing.assert_array_equal(from_dict.to_numpy(), from_array.to_numpy())
+
+
+
+def test_failed_batch_integration_raises():
+
+    y = Function('y')(t)
+    case = OdeComputationalCase(Matrix([k * y**2]), t, [y], params=[k], params_values={k: 1.0}, t_span=np.linspace(0, 2, 5))
+
+    with pytest.raises(RuntimeError):
+        case.compute_batch_solution(params_values={k: [1.0, 1.0]}, ic_list=[1.0], method='RK45')
+
+
+@pytest.mark.parametrize('method', ['Radau', 'BDF', 'LSODA', 'auto'])
+def test_implicit_and_auto_methods_match_the_explicit_integration(method):
+
+    case = oscillator_case()
+
+    np.testing.assert_allclose(reference_solution(case, PARAMS_VALUES, method=method).to_numpy(),
+                               reference_solution(case, PARAMS_VALUES).to_numpy(), atol=1e-6)
+
+
+def test_auto_method_selects_implicit_integrator_for_stiff_system():
+
+    case = oscillator_case()
+    stiff_values = {m: 1.0, k: 1e6, c: 1e5}
+
+    ivp_input = case.solve_ivp_input(T_SPAN, [1.0, 0.0], params_values=stiff_values)
+
+    assert case.select_method(ivp_input) == 'Radau'
+    assert case.select_method(case.solve_ivp_input(T_SPAN, [1.0, 0.0], params_values=PARAMS_VALUES)) == 'RK45'
+
+
+def test_analytical_jacobian_matches_finite_differences():
+
+    case = oscillator_case()
+    jac = case.form_numerical_jacobian()
+    rhs = case.form_numerical_rhs()
+
+    y = np.array([0.3, -0.2])
+    params = tuple(case.solve_plan.params_vector(PARAMS_VALUES))
+    step = 1e-7
+    finite_differences = np.column_stack([(rhs(0.0, y + step * direction, *params) - rhs(0.0, y, *params)) / step
+                                          for direction in np.eye(2)])
+
+    np.testing.assert_allclose(jac(0.0, y, *params), finite_differences, atol=1e-5)
+    np.testing.assert_allclose(case.form_numerical_jacobian(sparse=True)(0.0, y, *params).toarray(), jac(0.0, y, *params))
+
+
+def test_cse_backend_matches_numpy_backend():
+
+    np.testing.assert_allclose(reference_solution(oscillator_case('cse'), PARAMS_VALUES).to_numpy(),
+                               reference_solution(oscillator_case(), PARAMS_VALUES).to_numpy(), atol=1e-12)
+
+
+def test_numba_backend_matches_numpy_backend():
+    pytest.importorskip('numba')
+
+    reference = reference_solution(oscillator_case(), PARAMS_VALUES).to_numpy()
+
+    for method in ['RK4', 'RK45']:
+        solution = oscillator_case('numba').compute_solution(T_SPAN, [1.0, 0.0], params_values=PARAMS_VALUES, method=method, max_step=1e-3, **TOLERANCES)
+        np.testing.assert_allclose(solution.to_numpy(), reference, atol=1e-6)
+
+
+def test_numba_adaptive_loop_stops_on_blow_up():
+    numba = pytest.importorskip('numba')
+    jit = pytest.importorskip('dynpy.solvers.jit')
+
+    solution, status, t_fail = jit.dopri45_integration(numba.njit(lambda t, y, p: y**2), np.linspace(0, 2, 21), np.array([1.0]), np.array([]), 1e-6, 1e-3, 0.1)
+
+    assert status == -1
+    assert t_fail == pytest.approx(1.0, abs=1e-3)
+    assert np.isnan(solution[0, -1])
+
+
+@pytest.mark.parametrize('method', ['RK45', 'Radau'])
+def test_portable_cases_computed_in_worker_processes(method):
+
+    case = oscillator_case()
+    portable_input = case.portable_input(T_SPAN, [1.0, 0.0], params_values=PARAMS_VALUES, method=method, **TOLERANCES)
+
+    assert (portable_input['jac_source'] is not None) == (method == 'Radau')
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        output = list(executor.map(solve_portable_case, [pickle.loads(pickle.dumps(portable_input))]))[0]
+
+    np.testing.assert_allclose(case.solution_from_portable(output, T_SPAN).to_numpy(),
+                               reference_solution(case, PARAMS_VALUES, method=method).to_numpy(), atol=1e-12)
+
+
+def test_batch_solution_columns_of_second_order_states_are_not_duplicated():
+
+    odes = Matrix([x.diff(t), -k / m * x])
+    case = OdeComputationalCase(odes, t, [x, x.diff(t)], params=[m, k], params_values={m: 1.0, k: 4.0}, t_span=T_SPAN)
+
+    batch = case.compute_batch_solution(T_SPAN, [1.0, 0.0], params_values={m: [1.0, 2.0], k: 4.0}, method='RK45')
+    single = case.compute_solution(T_SPAN, [1.0, 0.0], params_values={m: 1.0, k: 4.0})
+
+    assert list(batch[0].columns) == list(single.columns) == [x, x.diff(t), x.diff(t, 2)]
+
+
+def test_dense_solution_and_events():
+
+    odes = Matrix([v, -k / m * x])
+    case = OdeComputationalCase(odes, t, [x, v], params=[m, k], params_values={m: 1.0, k: 4.0}, t_span=T_SPAN)
+
+    dense = case.compute_dense_solution(T_SPAN, [1.0, 0.0], events=[x], **TOLERANCES)
+
+    np.testing.assert_allclose(dense(T_SPAN)[0], np.cos(2 * T_SPAN), atol=1e-8)
+    np.testing.assert_allclose(dense.to_tdf(T_SPAN).to_numpy(), case.compute_solution(T_SPAN, [1.0, 0.0], **TOLERANCES).to_numpy(), atol=1e-8)
+    np.testing.assert_allclose(dense.event_records()[t], [np.pi / 4], atol=1e-8)
+
+    terminated = case.compute_dense_solution(T_SPAN, [1.0, 0.0], events=[x], terminal=True, **TOLERANCES)
+
+    assert terminated.terminated
+    assert terminated.t_max == pytest.approx(np.pi / 4)
+
+
+def test_solve_ivp_input_matches_symbolic_substitution_without_sympy_operations(monkeypatch):
+
+    case = oscillator_case()
+    params_values = {c: 0.3, k: 5.0, m: 2.0}
+    ics = {v: 0.5, x: 1.5}
+
+    case.solve_ivp_input(T_SPAN, [1.0, 0.0])
+
+    monkeypatch.setattr(Matrix, 'subs', lambda *args, **kwargs: pytest.fail('symbolic substitution in solve_ivp_input'))
+    ivp_input = case.solve_ivp_input(T_SPAN, ics, params_values=params_values)
+    monkeypatch.undo()
+
+    assert ivp_input['args'] == tuple(float(value) for value in Matrix(case.params).subs(params_values))
+    np.testing.assert_array_equal(ivp_input['y0'], [float(value) for value in Matrix(case.dvars).subs(ics)])
+    assert case.solve_ivp_input(T_SPAN, [1.5, 0.5], params_values={k: 5.0})['args'] == (1.0, 5.0, 0.1)
+
+    with pytest.raises(IndexError):
+        case.solve_ivp_input(T_SPAN, [1.0], params_values=params_values)
@@ -0,0 +1,53 @@
+"""
+Regression tests of the series expansion and the cache of orders of MultiTimeScaleSolution compared with the solutions derived from scratch
+"""
+
+import os
+
+import pytest
+from sympy import Function, Rational, S, Symbol, cos, exp, factorial, simplify, sin, sqrt
+
+from dynpy.solvers.perturbational import MultiTimeScaleSolution, PerturbationOrderCache, eps_series_coefficients
+
+t = Symbol('t')
+eps = Symbol('varepsilon')
+a, b, delta = Symbol('a'), Symbol('b'), Symbol('delta')
+z = Function('z')(t)
+
+
+@pytest.mark.parametrize('expr', [(1 + eps * a)**Rational(-1, 2) * sin(b + eps * a) + exp(eps) * a,
+                                  cos(eps * a)**2 / (1 + eps) + sqrt(1 + eps * b) * eps,
+                                  (a + eps * b + eps**2)**3 * Function('f')(eps * t)])
+def test_series_coefficients_match_derivatives(expr):
+
+    max_order = 3
+    coefficients = eps_series_coefficients(expr, eps, max_order)
+
+    assert len(coefficients) == max_order + 1
+    for order, coeff in enumerate(coefficients):
+        assert simplify((coeff - expr.diff(eps, order).subs(eps, 0) / factorial(order)).doit()) == 0
+
+
+def mathieu_solution():
+
+    return MultiTimeScaleSolution(z.diff(t, 2) + z * (1 + delta * eps + eps * sin(t)), z, ivar=t, omega=S.One, order=1, eps=eps).solution
+
+
+def test_cached_orders_give_the_same_solution(tmp_path):
+
+    PerturbationOrderCache.clear()
+    reference = mathieu_solution()
+
+    PerturbationOrderCache.set_directory(str(tmp_path))
+    try:
+        PerturbationOrderCache.clear()
+        stored = mathieu_solution()
+
+        assert os.listdir(tmp_path)
+        assert mathieu_solution() == stored
+
+        PerturbationOrderCache.clear()
+        assert mathieu_solution() == stored == reference
+    finally:
+        PerturbationOrderCache._directory = None
+        PerturbationOrderCache.clear()
@@ -0,0 +1,120 @@
+"""
+Regression tests of NumericalReliability and MonteCarloReliability compared with the symbolic Reliability iterations and the exact results of the linear limit state
+"""
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+from sympy import Eq, symbols
+
+import dynpy.solvers.reliability as reliability
+from dynpy.solvers.reliability import MonteCarloReliability, NumericalReliability, Reliability
+
+g, R, S, x1, x2 = symbols('g R S x1 x2')
+
+LINEAR = (Eq(g, R - S), {R: 10, S: 5}, {R: 1, S: 1}, [R, S])
+LINEAR_BETA = 5 / np.sqrt(2)
+
+
+def test_form_matches_symbolic_iterations():
+
+    arguments = (Eq(g, R**2 - 3 * S), {R: 10, S: 20}, {R: 1, S: 4}, [R, S])
+
+    symbolic = Reliability(*arguments)
+    for step in range(8):
+        beta = symbolic.estimate_reliability_index().rhs
+        symbolic = symbolic.next_step()
+
+    result = NumericalReliability(*arguments).compute()
+
+    assert result['converged'][0]
+    assert result['beta'][0] == pytest.approx(float(beta), abs=1e-6)
+
+
+def test_form_and_sorm_of_linear_limit_state_are_exact():
+
+    result = NumericalReliability(*LINEAR).compute(sorm=True)
+
+    assert result['beta'][0] == pytest.approx(LINEAR_BETA)
+    assert result['pf_FORM'][0] == pytest.approx(norm.cdf(-LINEAR_BETA))
+    assert result['pf_SORM'][0] == pytest.approx(norm.cdf(-LINEAR_BETA))
+    np.testing.assert_allclose(result[['R', 'S']].to_numpy()[0], [7.5, 7.5])
+
+
+def test_batch_of_cases_matches_single_cases():
+
+    form = NumericalReliability(*LINEAR)
+    means = np.array([8.0, 10.0, 12.0])
+
+    batch = form.compute(mean_values_dict={R: means})
+
+    for no, mean in enumerate(means):
+        assert batch['beta'][no] == pytest.approx(form.compute(mean_values_dict={R: mean})['beta'][0])
+
+
+def test_inverse_gives_assumed_reliability_index():
+
+    result = NumericalReliability(*LINEAR).inverse(3.0, R)
+
+    assert result['converged'][0]
+    assert result['mu_R'][0] == pytest.approx(5 + 3 * np.sqrt(2), abs=1e-6)
+
+
+def test_importance_sampling_matches_form_of_linear_limit_state():
+
+    result = MonteCarloReliability(*LINEAR).compute(samples_no=10**5, importance_sampling=True, seed=0)
+
+    assert result['pf'] == pytest.approx(norm.cdf(-LINEAR_BETA), rel=0.05)
+
+
+def test_limit_state_is_lambdified_once_per_worker(monkeypatch):
+
+    monkeypatch.setattr(reliability, '_worker_forms', {})
+
+    form = MonteCarloReliability(Eq(g, x1 * x2 - 10), {x1: 5, x2: 4}, {x1: 1, x2: 0.5}, [x1, x2]).form
+    reference = reliability._WorkerLimitState(form.fingerprint, form=form)
+    coords = np.array([[5.0, 4.0], [1.0, 2.0]])
+
+    first, second = [pickle.loads(pickle.dumps(reference)) for no in range(2)]
+
+    np.testing.assert_allclose(first(coords), [10.0, -8.0])
+    np.testing.assert_allclose(second(coords), [10.0, -8.0])
+
+    assert reliability._worker_forms[form.fingerprint] is first.form
+    assert '_limit_state_numerized' not in second.form.__dict__
+    assert len(pickle.dumps(reliability._WorkerLimitState(form.fingerprint))) < len(pickle.dumps(reference))
+
+
+def test_parallel_sampling_gives_the_same_result_as_serial():
+
+    mc = MonteCarloReliability(Eq(g, x1 * x2 - 10), {x1: 5, x2: 4}, {x1: 1, x2: 0.5}, [x1, x2])
+
+    serial = mc.compute(samples_no=10**5, seed=1)
+    parallel = mc.compute(samples_no=10**5, seed=1, n_jobs=2)
+
+    assert parallel.equals(serial)
+
+
+class CountingExecutor(ProcessPoolExecutor):
+
+    submitted_no = 0
+
+    def submit(self, *args, **kwargs):
+        CountingExecutor.submitted_no += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_target_cov_stops_submitting_chunks():
+
+    mc = MonteCarloReliability(Eq(g, x1 * x2 - 10), {x1: 5, x2: 4}, {x1: 1, x2: 0.5}, [x1, x2])
+
+    with CountingExecutor(max_workers=2) as executor:
+        result = mc.compute(samples_no=10**6, chunk_size=10**3, seed=0, target_cov=0.05, executor=executor)
+
+    chunks_no = int(result['samples_no']) // 10**3
+
+    assert chunks_no < 1000
+    assert CountingExecutor.submitted_no <= chunks_no + 2
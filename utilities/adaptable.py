@@ -17,6 +17,7 @@ import pandas as pd
 
 import matplotlib.pyplot as plt
 import copy
+from concurrent.futures import ProcessPoolExecutor
 
 
 from dynpy.utilities.templates import tikz
@@ -3021,10 +3022,14 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
                             ics=None,
                             backend=None,
                             dependencies=None,
-                            expand = False):
+                            expand = False,
+                            n_jobs=None,
+                            executor=None):
         """
         A method that allows you to perform numerical simulations on the created DataFrame.
 
+        The cases can be computed in parallel - n_jobs sets the number of worker processes (-1 uses all the cores) or the executor (e.g. concurrent.futures.ProcessPoolExecutor) can be given. The workers receive the generated source of right-hand sides instead of the symbolic models and the results are gathered in the order of columns.
+
         Example
         =======
 
@@ -3033,6 +3038,8 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
         >>>display(sym_num)
         >>>display(sym_num.plot())
 
+        >>>sym_num = num_df.perform_simulations(n_jobs=4)
+
         """
 
         #display(self.columns.droplevel(coord_level_name).unique())
@@ -3042,6 +3049,13 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
         computed_data._comp_time = AdaptableDataFrame(
             columns=self.columns.droplevel(coord_level_name).unique())
 
+        t_span = np.asarray((self.index))
+
+        t0 = t_span[0]
+
+        simulations = {}
+        numerized_models = {}
+
         for case_data in self.columns.droplevel(coord_level_name).unique():
             
 
@@ -3054,13 +3068,14 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
 
                 params_dict[param_eq.lhs] = param_eq.rhs
 
-            #numerized_model = model.numerized(params_dict, backend=backend,expand=expand)
-            #try
-            numerized_model = model.subs(params_dict).numerized(backend=backend,expand=expand)
-
-            t_span = np.asarray((self.index))
+            # every model is numerized once with the parameters left symbolic and the values of the case are only bound to the copy of the case (the models without such a case, e.g. analytical solutions, are numerized for every case)
+            if model not in numerized_models:
+                numerized_models[model] = model.numerized(backend=backend,expand=expand)
 
-            t0 = t_span[0]
+            if hasattr(numerized_models[model], 'with_params_values'):
+                numerized_model = numerized_models[model].with_params_values(params_dict)
+            else:
+                numerized_model = model.numerized(params_dict, backend=backend,expand=expand)
 
             ics_series = (self[case_data].T[t0])
 
@@ -3088,7 +3103,13 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
 
             # print('ics list \n',ics_list)
 
-            result = numerized_model.compute_solution(t_span, ics_list,params_values=params_dict)
+            simulations[case_data] = (numerized_model, ics_list, params_dict)
+
+        results = self._run_simulations(simulations, t_span, n_jobs=n_jobs, executor=executor)
+
+        for case_data, result in zip(simulations, results):
+
+            params_dict = simulations[case_data][2]
             result_array = result.T.to_numpy()
             
             
@@ -3112,6 +3133,44 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
 
         return (computed_data)
 
+    @staticmethod
+    def _run_simulations(simulations, t_span, n_jobs=None, executor=None):
+        """
+        Computes the prepared simulations (numerized model, ics and parameters of every case) and returns the list of results in the order of cases. The cases with the portable input (generated source of right-hand sides) are sent to the worker processes if n_jobs or executor is given, the remaining ones are computed in the current process.
+        """
+
+        results = {}
+
+        if executor is not None or n_jobs not in (None, 1):
+            from ..solvers.numerical import solve_portable_case
+
+            portable_cases = {}
+            for case_data, (numerized_model, ics_list, params_dict) in simulations.items():
+                if hasattr(numerized_model, 'portable_input'):
+                    portable_input = numerized_model.portable_input(t_span, ics_list, params_values=params_dict)
+                    if portable_input is not None:
+                        portable_cases[case_data] = portable_input
+
+            if portable_cases:
+                own_executor = executor is None
+                if own_executor:
+                    executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs)
+
+                try:
+                    outputs = list(executor.map(solve_portable_case, portable_cases.values()))
+                finally:
+                    if own_executor:
+                        executor.shutdown()
+
+                for case_data, output in zip(portable_cases, outputs):
+                    results[case_data] = simulations[case_data][0].solution_from_portable(output, t_span)
+
+        for case_data, (numerized_model, ics_list, params_dict) in simulations.items():
+            if case_data not in results:
+                results[case_data] = numerized_model.compute_solution(t_span, ics_list,params_values=params_dict)
+
+        return [results[case_data] for case_data in simulations]
+
     def compute_solution(
         self,
         t_span=None,
@@ -3126,6 +3185,8 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
         dependencies=None,
         output=None,
         expand = False,
+        n_jobs=None,
+        executor=None,
     ):
 
         computed_data = self.copy()
@@ -3139,7 +3200,9 @@ class NumericalAnalysisDataFrame(AdaptableDataFrame):
             ics=ic_list,
             backend=backend,
             dependencies=dependencies,
-            expand = expand
+            expand = expand,
+            n_jobs=n_jobs,
+            executor=executor,
             )
 
         if output == "NA":